@@ -1,7 +1,20 @@
+from .Utils.CLIDict import CLI_Dict, TFTP_Dict
+from .Utils.ChainCompiler import ChainDirective, compileChain, expandCommand
+from .Utils.CommandHistory import CommandHistory, CommandStatusError, CommandStatusOk, CommandStatusSanity, CommandStatusSkipped
+from .Utils.ConfigTree import ConfigTree
+from .Utils.ErrorClassifier import ErrorSession
+from .Utils.Logger import Lazy
+from .Utils.ModeTracker import ModeTracker
+from .Utils.PreferenceStore import PreferenceStore
 from .Utils.Regex import RegexContextPatterns, RegexExitInstance
+from .Utils.WarpBuffer import WarpBuffer
+from .Utils.WarpOptimizer import WarpOptimizer
 
+import difflib
 import os
 import re
+import tempfile
+import time
 
 class CLI(object):
     """
@@ -12,18 +25,40 @@ class CLI(object):
     batching commands via TFTP.
     """
 
-    CommandHistory = []
     Indent = 3
-    WarpBuffer = []
+    TFTPRoot = "/tftpboot"
+    PreferenceFile = os.path.join(tempfile.gettempdir(), 'xiqse_cli_preferences.json')
 
-    def __init__(self, context):
+    def __init__(self, context, emc_cli=None, family=None, ipAddress=None, firmware=None):
         """
         Initialize the CLI object.
 
+        Each CLI object keeps its own command history, warp buffer and last
+        error, so several objects can drive different devices side by side.
+        With ContainErrors set, a chain '#error fail' directive fails the
+        chain of this object instead of aborting the whole script.
+
         Args:
             context: The XIQSE context object.
+            emc_cli (optional): The CLI session to use. Defaults to the context emc_cli.
+            family (str, optional): The device family. Defaults to the context family.
+            ipAddress (str, optional): The device IP address. Defaults to the deviceIP variable.
+            firmware (str, optional): The device firmware version. Defaults to the deviceSoftwareVer variable.
         """
         self.ctx = context
+        self.emc_cli = emc_cli or context.emc_cli
+        self.family = family
+        self.ipAddress = ipAddress
+        self.firmware = firmware
+        self.CommandHistory = CommandHistory()
+        self.WarpBuffer = None
+        self.WarpOptimizer = None
+        self.WarpOptimize = False
+        self.LastError = None
+        self.LastErrorCode = None
+        self.LastOutputBytes = 0
+        self.ModeTracker = None
+        self.ContainErrors = False
 
     def configChain(self, chainStr):
         """
@@ -35,11 +70,15 @@ class CLI(object):
         Returns:
             list: A list of individual commands.
         """
-        chainStr = re.sub(r'\n(\w)(\x0d?\n|\s*;|$)', chr(0) + r'\1\2', chainStr)
-        cmdList = map(str.strip, re.split(r'[;\n]', chainStr))
-        cmdList = filter(None, cmdList)
-        cmdList = [re.sub(r'\x00(\w)(\x0d?\n|$)', r'\n\1\2', x) for x in cmdList]
-        return cmdList
+        return [node.raw for node in compileChain(chainStr)]
+    
+    def flushMode(self):
+        """
+        Send the context exits held back by the mode tracker.
+        """
+        if self.ModeTracker:
+            for cmd in self.ModeTracker.flush():
+                self.sendCommandDevice(cmd, True)
     
     def formatOutputData(self, data, mode):
         """
@@ -76,6 +115,33 @@ class CLI(object):
             RuntimeError("formatOutputData: invalid scheme type '{}'".format(mode))
         return value
     
+    def getFamily(self):
+        """
+        Get the family of the device driven by this CLI object.
+
+        Returns:
+            str: The device family.
+        """
+        return self.family or self.ctx.getFamily()
+    
+    def getFirmware(self):
+        """
+        Get the firmware version of the device driven by this CLI object.
+
+        Returns:
+            str: The firmware version, or 'unknown'.
+        """
+        return self.firmware or self.ctx.getVar("deviceSoftwareVer") or 'unknown'
+    
+    def getIpAddress(self):
+        """
+        Get the IP address of the device driven by this CLI object.
+
+        Returns:
+            str: The device IP address.
+        """
+        return self.ipAddress or self.ctx.getVar("deviceIP")
+    
     def parseRegexInput(self, cmdRegexStr):
         """
         Parse a regex command string.
@@ -96,18 +162,23 @@ class CLI(object):
     
     def printSummary(self):
         """
-        Print a summary of the executed commands.
+        Print a summary of the executed commands, with latency percentiles and the slowest commands.
+
+        Only the commands sent and successful are listed; the commands skipped
+        by the mode tracker or logged in sanity mode are only counted.
         """
         Family = "Fabric Engine"
-        if not len(self.CommandHistory):
+        commands = self.CommandHistory.commands(statuses=(CommandStatusOk,))
+        notSent = len(self.CommandHistory.commands(statuses=(CommandStatusSkipped, CommandStatusSanity)))
+        if not len(commands):
             self.ctx.log("No command was performed")
-            return
-        self.ctx.log("The following command was successfully performed on switch :")
+        else:
+            self.ctx.log("The following command was successfully performed on switch :")
         indent = ''
         level = 0
         if Family in RegexContextPatterns:
             maxLevel = len(RegexContextPatterns[Family])
-        for cmd in self.CommandHistory:
+        for cmd in commands:
             if Family in RegexContextPatterns:
                 if level < maxLevel and RegexContextPatterns[Family][level].match(cmd):
                     print("-> {}{}".format(indent, cmd))
@@ -119,8 +190,60 @@ class CLI(object):
                         level -= 1
                     indent = ' ' * self.Indent * level
             print("          |-> {}{}".format(indent, cmd))
-        self.CommandHistory = []
+        if notSent:
+            self.ctx.log("{} command(s) not sent (skipped by the mode tracker or sanity mode)".format(notSent))
+        percentiles = self.CommandHistory.percentiles()
+        if percentiles:
+            self.ctx.log("Command latency : p50 {:.3f}s, p90 {:.3f}s, p99 {:.3f}s".format(percentiles[50], percentiles[90], percentiles[99]))
+            self.ctx.log("Slowest commands :")
+            for record in self.CommandHistory.slowest():
+                print("          |-> {:>8.3f}s {:>9} bytes  {}  {}".format(record.latency, record.outputBytes, record.device, record.command))
+        self.CommandHistory.clear()
+
+    def sendConfigDelta(self, chainStr, dryRun=False, useWarp=False, returnCliError=False, msgOnError=None):
+        """
+        Push only the part of a configuration that is not already in the running configuration.
+
+        The running configuration is read once and both configurations are
+        normalized into nested contexts (see ConfigTree), so only the missing
+        lines are pushed, each within its context. Lines present on the device
+        but absent from the intended configuration are not removed.
 
+        Args:
+            chainStr (str): The intended configuration, as a command chain.
+            dryRun (bool, optional): Whether to only compute the delta without pushing it. Defaults to False.
+            useWarp (bool, optional): Whether to push the delta via the warp buffer instead of command by command. Defaults to False.
+            returnCliError (bool, optional): Whether to return None on error instead of aborting. Defaults to False.
+            msgOnError (str, optional): Message to log if an error occurs. Defaults to None.
+
+        Returns:
+            list: The pushed (or, in dry run, the computed) command lines, or None if the push failed.
+        """
+        cliDict = CLI_Dict.get(self.getFamily(), {})
+        if 'show_running_config' not in cliDict:
+            self.ctx.exitError("sendConfigDelta: no running configuration command for family '{}'".format(self.getFamily()))
+        if 'disable_more_paging' in cliDict:
+            self.sendCommand(cliDict['disable_more_paging'], returnCliError, msgOnError)
+        runningStr = self.sendCommandShow(cliDict['show_running_config'], returnCliError, msgOnError)
+        if runningStr is None:
+            return None
+
+        intended = ConfigTree(self.getFamily(), self.configChain(chainStr))
+        running = ConfigTree(self.getFamily(), runningStr.splitlines())
+        deltaList = intended.delta(running)
+        self.ctx.log("sendConfigDelta: {} command lines to push".format(len(deltaList)))
+        if dryRun or not deltaList:
+            for cmd in deltaList:
+                self.ctx.debug("sendConfigDelta > %s", cmd)
+            return deltaList
+
+        if useWarp:
+            success = self.warpBufferExecute("\n".join(deltaList), returnCliError, msgOnError)
+        else:
+            modeList = [cliDict[x] for x in ('enable_context', 'config_context') if x in cliDict]
+            success = self.sendCommandChain("\n".join(modeList + deltaList), returnCliError, msgOnError)
+        return deltaList if success else None
+    
     def sendCommand(self, cmd, returnCliError=False, msgOnError=None, waitForPrompt=True):
         """
         Send a command to the device.
@@ -131,37 +254,52 @@ class CLI(object):
             msgOnError (str, optional): Message to log if an error occurs (when returnCliError is True). Defaults to None.
             waitForPrompt (bool, optional): Whether to wait for the command prompt. Defaults to True.
 
+        Returns:
+            bool: True if the command was successful, False otherwise.
+        """
+        cmd, cmdStore = expandCommand(cmd)
+        return self.sendCommandExpanded(cmd, cmdStore, returnCliError, msgOnError, waitForPrompt)
+    
+    def sendCommandExpanded(self, cmd, cmdStore, returnCliError=False, msgOnError=None, waitForPrompt=True):
+        """
+        Send a command whose ' // ' inline newlines are already expanded.
+
+        Args:
+            cmd (str): The command to send.
+            cmdStore (str): The first line of the command, kept in the command history.
+            returnCliError (bool, optional): Whether to return False on error instead of aborting. Defaults to False.
+            msgOnError (str, optional): Message to log if an error occurs (when returnCliError is True). Defaults to None.
+            waitForPrompt (bool, optional): Whether to wait for the command prompt. Defaults to True.
+
         Returns:
             bool: True if the command was successful, False otherwise.
         """
         global LastError
-        cmd = re.sub(r':\/\/', ':' + chr(0) + chr(0), cmd)
-        cmd = re.sub(r' *\/\/ *', r'\n', cmd)
-        cmd = re.sub(r':\x00\x00', r'://', cmd)
-        cmdStore = re.sub(r'\n.+$', '', cmd, flags=re.DOTALL)
-
-        if self.ctx.sanity:
-            self.ctx.log("SANITY > {}".format(cmd))
-            self.CommandHistory.append(cmdStore)
-            LastError = None
-            return True
-        else:
-            self.ctx.debug("Execute command : {}".format(cmd))
-            resultObj = self.ctx.emc_cli.send(cmd, waitForPrompt)
-            if resultObj.isSuccess():
-                outputStr = self.ctx.cleanOutput(resultObj.getOutput())
-                if outputStr and self.ctx.cliError("\n".join(outputStr.split("\n")[:4])):
-                    if returnCliError:
-                        LastError = outputStr
-                        if msgOnError:
-                            self.ctx.error("Ignoring above error: {}".format(msgOnError))
-                        return False
-                    self.ctx.abortError(cmd, outputStr)
-                self.CommandHistory.append(cmdStore)
-                LastError = None
+        startTime = time.time()
+        status = CommandStatusError
+        outputBytes = 0
+        try:
+            if self.ctx.sanity:
+                self.ctx.log("SANITY > {}".format(cmd))
+                status = CommandStatusSanity
+                LastError = self.LastError = None
                 return True
-            else:
-                self.ctx.exitError(resultObj.getError())
+            cmdList = self.ModeTracker.plan(cmd) if self.ModeTracker else [cmd]
+            if cmd not in cmdList:
+                self.ctx.debug("Mode tracker skipped command : %s", cmd)
+                LastError = self.LastError = None
+            for sendCmd in cmdList:
+                success = self.sendCommandDevice(sendCmd, returnCliError, msgOnError, waitForPrompt if sendCmd is cmd else True)
+                outputBytes += self.LastOutputBytes
+                if not success:
+                    return False
+            status = CommandStatusOk if cmd in cmdList else CommandStatusSkipped
+            return True
+        finally:
+            self.CommandHistory.add(
+                cmdStore, self.getIpAddress(), startTime, time.time() - startTime, outputBytes, status,
+                self.LastErrorCode if status == CommandStatusError else None
+            )
     
     def sendCommandChain(self, chainStr, returnCliError=False, msgOnError=None, waitForPrompt=True, abortOnError=True):
         """
@@ -177,24 +315,27 @@ class CLI(object):
         Returns:
             bool: True if all commands were successful (or handled), False otherwise.
         """
-        cmdList = self.configChain(chainStr)
+        nodes = compileChain(chainStr)
+        lastCommand = None
+        for node in nodes:
+            if not isinstance(node, ChainDirective):
+                lastCommand = node
         successStatus = True
-        for cmd in cmdList[:-1]: # All but last
-            embedded = re.match(r'^#error +(fail|stop|continue) *$', cmd)
-            if embedded:
-                errorMode = embedded.group(1)
-                returnCliError = False if errorMode == 'fail' else True
-                abortOnError = True if errorMode == 'stop' else False
-                continue
-            success = self.sendCommand(cmd, returnCliError, msgOnError)
-            if not success:
-                successStatus = False
-                if abortOnError:
-                    return False
-        success = self.sendCommand(cmdList[-1], returnCliError, msgOnError, waitForPrompt)
-        if not success:
-            return False
-        return successStatus
+        try:
+            for node in nodes:
+                if isinstance(node, ChainDirective):
+                    returnCliError = node.returnCliError or self.ContainErrors
+                    abortOnError = node.abortOnError or (self.ContainErrors and not node.returnCliError)
+                    continue
+                isLast = node is lastCommand
+                success = self.sendCommandExpanded(node.cmd, node.store, returnCliError, msgOnError, waitForPrompt if isLast else True)
+                if not success:
+                    successStatus = False
+                    if abortOnError or isLast:
+                        return False
+            return successStatus
+        finally:
+            self.flushMode()
     
     def sendCommandShow(self, cmd, returnCliError=False, msgOnError=None):
         """
@@ -208,20 +349,51 @@ class CLI(object):
         Returns:
             str: The command output if successful, else None.
         """
+        outputView = self.sendCommandView(cmd, returnCliError, msgOnError)
+        if outputView is None:
+            return None
+        return outputView.text()
+    
+    def sendCommandDevice(self, cmd, returnCliError=False, msgOnError=None, waitForPrompt=True):
+        """
+        Send a single command line to the device, without history or mode tracking.
+
+        Args:
+            cmd (str): The command to send.
+            returnCliError (bool, optional): Whether to return False on error instead of aborting. Defaults to False.
+            msgOnError (str, optional): Message to log if an error occurs (when returnCliError is True). Defaults to None.
+            waitForPrompt (bool, optional): Whether to wait for the command prompt. Defaults to True.
+
+        Returns:
+            bool: True if the command was successful, False otherwise.
+        """
         global LastError
-        resultObj = self.ctx.emc_cli.send(cmd)
+        self.ctx.debug("Execute command : %s", cmd)
+        self.LastOutputBytes = 0
+        resultObj = self.emc_cli.send(cmd, waitForPrompt)
         if resultObj.isSuccess():
-            outputStr = self.ctx.cleanOutput(resultObj.getOutput())
-            if outputStr and self.ctx.cliError("\n".join(outputStr.split("\n")[:4])):
+            outputView = self.ctx.outputView(resultObj.getOutput())
+            self.LastOutputBytes = len(outputView)
+            errorMatch = self.ctx.cliErrorCode(outputView.head(4), self.getFamily()) if outputView else None
+            self.LastErrorCode = errorMatch.code if errorMatch else None
+            if errorMatch:
+                outputStr = outputView.text()
+                if self.ModeTracker:
+                    self.ModeTracker.reset()
                 if returnCliError:
-                    LastError = outputStr
+                    LastError = self.LastError = outputStr
                     if msgOnError:
-                        print "==> Ignoring above error: {}\n\n".format(msgOnError)
-                    return None
+                        self.ctx.error("Ignoring above error: {}".format(msgOnError))
+                    return False
                 self.ctx.abortError(cmd, outputStr)
-            LastError = None
-            return outputStr
+            LastError = self.LastError = None
+            return True
         else:
+            if self.ModeTracker:
+                self.ModeTracker.reset()
+            if returnCliError:
+                self.sessionError(resultObj.getError(), msgOnError)
+                return False
             self.ctx.exitError(resultObj.getError())
     
     def sendCommandRegex(self, cmdRegexStr, debugKey=None, returnCliError=False, msgOnError=None):
@@ -238,18 +410,116 @@ class CLI(object):
             any: The parsed and formatted data.
         """
         mode, cmdList, regex = self.parseRegexInput(cmdRegexStr)
+        if len(cmdList) > 1:
+            preferenceKey = "{}|{}|{}".format(self.getFamily(), self.getFirmware(), ' & '.join(cmdList))
+            preferredCmd = PreferenceStore.open(self.PreferenceFile).get(preferenceKey)
+            if preferredCmd in cmdList:
+                cmdList = [preferredCmd] + [x for x in cmdList if x != preferredCmd]
         for cmd in cmdList:
             ignoreCliError = True if len(cmdList) > 1 and cmd != cmdList[-1] else returnCliError
-            outputStr = self.sendCommandShow(cmd, ignoreCliError, msgOnError)
-            if outputStr:
+            outputView = self.sendCommandView(cmd, ignoreCliError, msgOnError)
+            if outputView:
                 break
-        if not outputStr:
+        if not outputView:
             return None
-        data = re.findall(regex, outputStr, re.MULTILINE)
-        self.ctx.debug("sendCommandRegex() raw data = {}".format(data))
+        if len(cmdList) > 1 and cmd != cmdList[0]:
+            self.ctx.debug("sendCommandRegex() remember '%s' for %s", cmd, preferenceKey)
+            PreferenceStore.open(self.PreferenceFile).set(preferenceKey, cmd)
+        data = outputView.findall(re.compile(regex, re.MULTILINE))
+        self.ctx.debug("sendCommandRegex() raw data = %s", data)
         value = self.formatOutputData(data, mode)
         return value
     
+    def sendCommandView(self, cmd, returnCliError=False, msgOnError=None):
+        """
+        Send a show command and return a view of the output.
+
+        The view avoids copying the output when trimming the prompt and
+        checking the output head for errors.
+
+        Args:
+            cmd (str): The show command.
+            returnCliError (bool, optional): Whether to return None on error instead of aborting. Defaults to False.
+            msgOnError (str, optional): Message to log if an error occurs. Defaults to None.
+
+        Returns:
+            OutputView: The command output view if successful, else None.
+        """
+        global LastError
+        self.flushMode()
+        startTime = time.time()
+        status = CommandStatusError
+        outputView = None
+        try:
+            resultObj = self.emc_cli.send(cmd)
+            if resultObj.isSuccess():
+                outputView = self.ctx.outputView(resultObj.getOutput())
+                errorMatch = self.ctx.cliErrorCode(outputView.head(4), self.getFamily()) if outputView else None
+                self.LastErrorCode = errorMatch.code if errorMatch else None
+                if errorMatch:
+                    outputStr = outputView.text()
+                    if returnCliError:
+                        LastError = self.LastError = outputStr
+                        if msgOnError:
+                            print "==> Ignoring above error: {}\n\n".format(msgOnError)
+                        return None
+                    self.ctx.abortError(cmd, outputStr)
+                LastError = self.LastError = None
+                status = CommandStatusOk
+                return outputView
+            else:
+                if returnCliError:
+                    self.sessionError(resultObj.getError(), msgOnError)
+                    return None
+                self.ctx.exitError(resultObj.getError())
+        finally:
+            self.CommandHistory.add(
+                cmd, self.getIpAddress(), startTime, time.time() - startTime, len(outputView) if outputView else 0, status,
+                self.LastErrorCode if status == CommandStatusError else None, 'show'
+            )
+    
+    def sessionError(self, errorOutput, msgOnError=None):
+        """
+        Record a session failure (e.g. lost connection) as the last error, instead of aborting.
+
+        Args:
+            errorOutput (str): The session error.
+            msgOnError (str, optional): Message to log. Defaults to None.
+        """
+        global LastError
+        LastError = self.LastError = errorOutput
+        self.LastErrorCode = ErrorSession
+        self.ctx.error("Session error on {}: {}".format(self.getIpAddress(), errorOutput))
+        if msgOnError:
+            self.ctx.error("Ignoring above error: {}".format(msgOnError))
+
+    def setModeTracking(self, enabled=True):
+        """
+        Enable or disable the CLI mode tracker.
+
+        When enabled, commands that would not change the session mode (a
+        second 'enable', 'configure terminal' or 'terminal more disable') are
+        skipped, and a context exit followed by a re-enter of the same context
+        is not sent at all.
+
+        Args:
+            enabled (bool, optional): Whether to track the CLI mode. Defaults to True.
+        """
+        self.ModeTracker = ModeTracker(self.getFamily()) if enabled else None
+    
+    def setWarpOptimize(self, enabled=True):
+        """
+        Enable or disable the warp script optimizer for the next warp buffers.
+
+        The optimizer drops context exits followed by a re-enter of the same
+        context, and folds consecutive port interface contexts with identical
+        settings into port ranges. Use warpBufferDryRun() to review its output.
+
+        Args:
+            enabled (bool, optional): Whether to optimize warp scripts. Defaults to True.
+        """
+        self.WarpOptimize = enabled
+    
     def test(self):
         """
         Test the CLI module.
@@ -263,20 +533,162 @@ class CLI(object):
         print("Test Debug")
         print(self.ctx.emc_vars)
         print("============================")
-        print(self.ctx.emc_cli.getUser())
+        print(self.emc_cli.getUser())
+    
+    def tftpEnable(self, returnCliError=False, msgOnError=None):
+        """
+        Make sure the TFTP service used to fetch warp scripts is running on the device.
+
+        Args:
+            returnCliError (bool, optional): Whether to carry on after an error instead of aborting. Defaults to False.
+            msgOnError (str, optional): Message to log on error. Defaults to None.
+
+        Returns:
+            bool: True if the service had to be activated (and should be deactivated afterwards), False otherwise.
+        """
+        TFTPCheck = TFTP_Dict[self.getFamily()]['check']
+        if TFTPCheck is True or self.sendCommandRegex(TFTPCheck, None, returnCliError, msgOnError):
+            return False
+        self.sendCommand(TFTP_Dict[self.getFamily()]['activate'], returnCliError, msgOnError)
+        return True
+    
+    def tftpExecute(self, TFTPFileName, returnCliError=False, msgOnError=None, waitForPrompt=True):
+        """
+        Fetch a script from the XIQ-SE TFTP server and run it on the device.
+
+        Args:
+            TFTPFileName (str): The script file name, relative to the TFTP root.
+            returnCliError (bool, optional): Whether to return False on error. Defaults to False.
+            msgOnError (str, optional): Message to log on error. Defaults to None.
+            waitForPrompt (bool, optional): Whether to wait for prompt. Defaults to True.
+
+        Returns:
+            bool: True if execution was successful, False otherwise.
+        """
+        TFTPExecute = TFTP_Dict[self.getFamily()]['execute']
+        success = self.sendCommandChain(TFTPExecute.format(self.ctx.getVar("serverIP"), TFTPFileName), returnCliError, msgOnError, waitForPrompt)
+        if self.ModeTracker:
+            self.ModeTracker.reset()
+        return success
+    
+    def waitFor(self, cmd, regex, timeout=60, interval=1, maxInterval=10, backoff=1.5, returnCliError=True):
+        """
+        Re-run a command until its output matches a regex or the timeout is reached.
+
+        Args:
+            cmd (str): The command to poll.
+            regex (str or re.Pattern): The regex to match (compiled with re.MULTILINE if a string).
+            timeout (int, optional): Maximum time to wait in seconds. Defaults to 60.
+            interval (int, optional): First delay between two polls in seconds. Defaults to 1.
+            maxInterval (int, optional): Maximum delay between two polls in seconds. Defaults to 10.
+            backoff (float, optional): Factor applied to the delay after each unsuccessful poll. Defaults to 1.5.
+            returnCliError (bool, optional): Whether to keep polling when the command returns a CLI error. Defaults to True.
+
+        Returns:
+            list: The re.findall() data of the matching output, or None if the timeout was reached.
+        """
+        return self.waitForAll({cmd: (cmd, regex)}, timeout, interval, maxInterval, backoff, returnCliError)[cmd]
+    
+    def waitForAll(self, conditions, timeout=60, interval=1, maxInterval=10, backoff=1.5, returnCliError=True):
+        """
+        Poll several conditions on the device until all of them hold or the timeout is reached.
+
+        Conditions sharing the same command are checked against a single
+        output, so each round sends every distinct command once. A condition
+        that matched once is considered satisfied.
+
+        Args:
+            conditions (dict): Dictionary of condition name to a (cmd, regex) tuple.
+            timeout (int, optional): Maximum time to wait in seconds. Defaults to 60.
+            interval (int, optional): First delay between two rounds in seconds. Defaults to 1.
+            maxInterval (int, optional): Maximum delay between two rounds in seconds. Defaults to 10.
+            backoff (float, optional): Factor applied to the delay after each unsuccessful round. Defaults to 1.5.
+            returnCliError (bool, optional): Whether to keep polling when a command returns a CLI error. Defaults to True.
+
+        Returns:
+            dict: Dictionary of condition name to the re.findall() data of the matching output, or None if not satisfied.
+        """
+        pending = {}
+        for name, (cmd, regex) in conditions.items():
+            if not hasattr(regex, 'search'):
+                regex = re.compile(regex, re.MULTILINE)
+            pending.setdefault(cmd, []).append((name, regex))
+        results = dict((name, None) for name in conditions)
+
+        startTime = time.time()
+        rounds = 0
+        while True:
+            roundTime = time.time()
+            rounds += 1
+            for cmd in list(pending):
+                outputView = self.sendCommandView(cmd, returnCliError)
+                if not outputView:
+                    continue
+                for name, regex in list(pending[cmd]):
+                    if outputView.search(regex):
+                        results[name] = outputView.findall(regex)
+                        pending[cmd].remove((name, regex))
+                        self.ctx.debug("waitFor() condition '%s' met after %.1fs", name, time.time() - startTime)
+                if not pending[cmd]:
+                    del pending[cmd]
+            if not pending:
+                return results
+
+            remainingTime = timeout - (time.time() - startTime)
+            if remainingTime <= 0:
+                self.ctx.debug("waitFor() timeout after %d rounds, conditions not met: %s", rounds, Lazy(lambda: [name for cmd in pending for name, regex in pending[cmd]]))
+                return results
+            sleepTime = min(interval - (time.time() - roundTime), remainingTime)
+            if sleepTime > 0:
+                time.sleep(sleepTime)
+            interval = min(interval * backoff, maxInterval)
     
     def warpBufferAdd(self, chainStr):
         """
         Add commands to the warp buffer.
 
+        The commands are streamed to the TFTP script file of the session as
+        they are added, so the warp buffer does not grow in memory.
+
         Args:
             chainStr (str): The command chain string to add.
         """
-        global WarpBuffer
         cmdList = self.configChain(chainStr)
-        for cmd in cmdList:
-            cmdAdd = re.sub(r'\n.+$', '', cmd)
-            self.WarpBuffer.append(cmdAdd)
+        warpBuffer = self.warpBufferStart()
+        if self.WarpOptimizer:
+            warpBuffer = self.WarpOptimizer
+        try:
+            for cmd in cmdList:
+                cmdAdd = re.sub(r'\n.+$', '', cmd)
+                warpBuffer.add(cmdAdd)
+        except Exception as e:
+            print "{}: {}".format(type(e).__name__, str(e))
+            self.warpBufferClose()
+            self.ctx.exitError("Unable to write to TFTP file '{}'".format(self.warpBufferPath()))
+    
+    def warpBufferClose(self):
+        """
+        Abandon the warp buffer of this session, deleting its TFTP script file if not executed.
+        """
+        if self.WarpBuffer is not None:
+            self.WarpBuffer.close()
+        self.WarpBuffer = self.WarpOptimizer = None
+
+    def warpBufferDryRun(self, chainStr):
+        """
+        Show how the warp script optimizer would rewrite a command chain.
+
+        Args:
+            chainStr (str): The command chain string.
+
+        Returns:
+            str: A unified diff between the original and the optimized script.
+        """
+        cmdList = [re.sub(r'\n.+$', '', cmd) for cmd in self.configChain(chainStr)]
+        optimizedList = WarpOptimizer(self.getFamily(), None).optimize(cmdList)
+        report = "\n".join(difflib.unified_diff(cmdList, optimizedList, 'original', 'optimized', lineterm=''))
+        self.ctx.log("warpBuffer dry run: {} lines optimized to {} lines".format(len(cmdList), len(optimizedList)))
+        return report
     
     def warpBufferExecute(self, chainStr=None, returnCliError=False, msgOnError=None, waitForPrompt=True):
         """
@@ -292,59 +704,60 @@ class CLI(object):
             bool: True if execution was successful, False otherwise.
         """
         global LastError
-        global WarpBuffer
-        xiqseTFTPRoot = '/tftpboot'
-        xiqseServerIP = self.ctx.getVar("serverIP")
-        switchIP = self.ctx.getVar("deviceIP")
-        userName = self.ctx.getVar("userName").replace('.', '_')
-        TFTPCheck = {
-            'Fabric Engine': 'bool://show boot config flags||^flags tftpd true',
-            'Summit Series': 'bool://show process tftpd||Ready',
-            'ERS Series':    True,
-        }
-        TFTPActivate = {
-            'Fabric Engine': 'boot config flags tftpd',
-            'Summit Series': 'start process tftpd',
-        }
-        TFTPDeactivate = {
-            'Fabric Engine': 'no boot config flags tftpd',
-            'Summit Series': 'terminate process tftpd graceful',
-        }
-        TFTPExecute = {
-            'Fabric Engine': 'copy "{0}:{1}" /intflash/.script.src -y; source .script.src debug',
-            'Summit Series': 'tftp get {0} "{1}" .script.xsf; run script .script.xsf',
-            'ERS Series':    'configure network address {0} filename "{1}"',
-        }
-
-        if chainStr:
-            self.warpBufferAdd(chainStr)
-        
-        TFTPEnabled = self.sendCommandRegex(TFTPCheck[self.ctx.getFamily()])
-        if not TFTPEnabled:
-            self.sendCommand(TFTPActivate[self.ctx.getFamily()])
-            self.warpBufferAdd(TFTPDeactivate[self.ctx.getFamily()])
+        try:
+            if chainStr:
+                self.warpBufferAdd(chainStr)
+            if self.tftpEnable():
+                self.warpBufferAdd(TFTP_Dict[self.getFamily()]['deactivate'])
+        except Exception:
+            self.warpBufferClose()
+            raise
         
-        TFTPFileName = userName + '.' + self.ctx.scriptName().replace(' ', '_') + '.' + switchIP.replace('.', '_')
-        TFTPFilePath = xiqseTFTPRoot + '/' + TFTPFileName
+        warpBuffer = self.warpBufferStart()
         try:
-            with open(TFTPFilePath, 'w') as f:
-                if self.ctx.getFamily() == "Fabric Engine":
-                    f.write("enable\n")
-                    f.write("config term\n")
-                for cmd in self.WarpBuffer:
-                    f.write(cmd + "\n")
-                f.write("\n")
-                self.ctx.debug("warpBuffer - write of TFTP config file: {}".format(TFTPFilePath))
+            if self.WarpOptimizer:
+                self.WarpOptimizer.finish()
+                self.ctx.debug("warpBuffer - optimizer reduced %d lines to %d", self.WarpOptimizer.linesIn, self.WarpOptimizer.linesOut)
+                self.WarpOptimizer = None
+            TFTPFilePath = warpBuffer.commit()
+            self.ctx.debug("warpBuffer - write of TFTP config file: %s (%d lines, %d bytes)", TFTPFilePath, warpBuffer.lines, warpBuffer.bytes)
         except Exception as e:
             print "{}: {}".format(type(e).__name__, str(e))
-            self.ctx.exitError("Unable to write to TFTP file '{}'".format(TFTPFilePath))
+            self.warpBufferClose()
+            self.ctx.exitError("Unable to write to TFTP file '{}'".format(self.warpBufferPath()))
+        self.WarpBuffer = None
         
-        success = self.sendCommandChain(TFTPExecute[self.ctx.getFamily()].format(xiqseServerIP, TFTPFileName), returnCliError, msgOnError, waitForPrompt)
-        os.remove(TFTPFilePath)
-        self.ctx.debug("warpBuffer - delete of TFTP config file : {}".format(TFTPFilePath))
+        try:
+            success = self.tftpExecute(os.path.basename(TFTPFilePath), returnCliError, msgOnError, waitForPrompt)
+        finally:
+            os.remove(TFTPFilePath)
+            self.ctx.debug("warpBuffer - delete of TFTP config file : %s", TFTPFilePath)
 
-        WarpBuffer = []
         if not success:
             return False
-        LastError = None
+        LastError = self.LastError = None
         return True
+    
+    def warpBufferStart(self):
+        """
+        Get the warp buffer of this session, creating it if needed.
+
+        Returns:
+            WarpBuffer: The warp buffer.
+        """
+        if self.WarpBuffer is None:
+            self.WarpBuffer = WarpBuffer(self.warpBufferPath(), TFTP_Dict[self.getFamily()]['header'])
+            if self.WarpOptimize:
+                self.WarpOptimizer = WarpOptimizer(self.getFamily(), self.WarpBuffer.add)
+        return self.WarpBuffer
+    
+    def warpBufferPath(self):
+        """
+        Get the path of the TFTP script file of this session.
+
+        Returns:
+            str: The TFTP script file path.
+        """
+        userName = self.ctx.getVar("userName").replace('.', '_')
+        TFTPFileName = userName + '.' + self.ctx.scriptName().replace(' ', '_') + '.' + self.getIpAddress().replace('.', '_')
+        return self.TFTPRoot + '/' + TFTPFileName
@@ -2,6 +2,20 @@ import csv
 import os.path
 import re
 import json
+import threading
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+from .Utils.CSVCache import CSVCache
+from .Utils.CSVIndex import CSVIndex
+from .Utils.CSVRow import CSVSchema
+from .Utils.CSVTable import CSVTable
+from .Utils.CSVTemplate import CSVTemplate
+from .Utils.CSVWriter import CSVWriter
+from .Utils.Logger import Lazy
 
 class CSV(object):
     """
@@ -20,14 +34,29 @@ class CSV(object):
         """
         self.ctx = context
     
-    def read(self, csvFilePath, lookup=None, delimiter=','):
+    def read(self, csvFilePath, lookup=None, delimiter=',', indexed=False, compact=False, cached=False):
         """
         Read a CSV file into a dictionary.
 
+        With indexed=True and a lookup key, the row is found through a sidecar
+        index of the CSV file (see CSVIndex), so only that row is read. The
+        index is built on first use and rebuilt when the CSV file changes.
+
+        With compact=True, rows are CSVRow views over a tuple of interned
+        values sharing one column schema, instead of one dictionary per row.
+        They support the read-only dictionary interface used by varLookup.
+
+        With cached=True, the parsed file is taken from a persistent cache
+        shared by the workflow activities (see CSVCache), and is only parsed
+        again when the CSV file changes.
+
         Args:
             csvFilePath (str): The path to the CSV file.
             lookup (str, optional): A specific key to filter the results. Defaults to None.
             delimiter (str, optional): The CSV delimiter. Defaults to ','.
+            indexed (bool, optional): Whether to use the sidecar index for the lookup. Defaults to False.
+            compact (bool, optional): Whether to store rows as compact CSVRow objects. Defaults to False.
+            cached (bool, optional): Whether to use the persistent parsed-CSV cache. Defaults to False.
 
         Returns:
             dict: A dictionary representing the CSV data.
@@ -38,6 +67,12 @@ class CSV(object):
         if not os.path.exists(csvFilePath):
             self.ctx.exitError("readCsvToDict: CSV file {} not found!".format(csvFilePath))
         
+        if indexed and lookup:
+            return self.readIndexed(csvFilePath, lookup, delimiter)
+
+        if cached:
+            return self.readCached(csvFilePath, lookup, delimiter, compact)
+
         csvVarDict = {}
         with open(csvFilePath, mode='r') as csv_file:
             csv_reader = csv.reader(csv_file, delimiter=delimiter)
@@ -47,25 +82,250 @@ class CSV(object):
                     if firstRow:
                         indexKey = re.sub(r'^\\ufeff', '', row.pop(0)) 
                         valueKeys = list(map(str.strip, row))
+                        schema = CSVSchema([indexKey] + valueKeys) if compact else None
                         firstRow = False
                     else:
                         key = row.pop(0)
                         if not lookup or key == lookup:
-                            rowData = dict(zip(valueKeys, map(str.strip, row)))
-                            rowData[indexKey] = key
+                            if schema:
+                                rowData = schema.row(key, list(map(str.strip, row)))
+                            else:
+                                rowData = dict(zip(valueKeys, map(str.strip, row)))
+                                rowData[indexKey] = key
                             csvVarDict[key] = rowData
                             if lookup:
                                 csvVarDict['__LOOKUP__'] = key
         
         csvVarDict['__INDEX__'] = indexKey
         csvVarDict['__PATH__'] = csvFilePath
-        self.ctx.debug("\n" + json.dumps(csvVarDict, indent=4, sort_keys=True).replace('{', '{{').replace('}', '}}'))
+        self.ctx.debug("\n%s", Lazy(json.dumps, csvVarDict, indent=4, sort_keys=True, default=dict))
+        return csvVarDict
+
+    def iterRows(self, csvFilePath, delimiter=','):
+        """
+        Stream the rows of a CSV file without loading the whole file.
+
+        Args:
+            csvFilePath (str): The path to the CSV file.
+            delimiter (str, optional): The CSV delimiter. Defaults to ','.
+
+        Returns:
+            generator: The rows, as compact CSVRow objects.
+        """
+        if not os.path.exists(csvFilePath):
+            self.ctx.exitError("readCsvToDict: CSV file {} not found!".format(csvFilePath))
+        schema = None
+        with open(csvFilePath, mode='r') as csv_file:
+            for row in csv.reader(csv_file, delimiter=delimiter):
+                if not row:
+                    continue
+                if schema is None:
+                    schema = CSVSchema([re.sub(r'^\\ufeff', '', row[0])] + list(map(str.strip, row[1:])))
+                    continue
+                yield schema.row(row[0], list(map(str.strip, row[1:])))
+
+    def readCached(self, csvFilePath, lookup=None, delimiter=',', compact=False):
+        """
+        Read a CSV file into a dictionary using the persistent parsed-CSV cache.
+
+        Args:
+            csvFilePath (str): The path to the CSV file.
+            lookup (str, optional): A specific key to filter the results. Defaults to None.
+            delimiter (str, optional): The CSV delimiter. Defaults to ','.
+            compact (bool, optional): Whether to store rows as compact CSVRow objects. Defaults to False.
+
+        Returns:
+            dict: A dictionary representing the CSV data, as returned by read().
+        """
+        header, rows = CSVCache(csvFilePath, delimiter).get()
+        if header is None:
+            self.ctx.exitError("readCsvToDict: CSV file {} is empty!".format(csvFilePath))
+        indexKey, valueKeys = header[0], header[1:]
+        schema = CSVSchema(header) if compact else None
+        csvVarDict = {}
+        for row in rows:
+            key = row[0]
+            if not lookup or key == lookup:
+                if schema:
+                    rowData = schema.row(key, row[1:])
+                else:
+                    rowData = dict(zip(valueKeys, row[1:]))
+                    rowData[indexKey] = key
+                csvVarDict[key] = rowData
+                if lookup:
+                    csvVarDict['__LOOKUP__'] = key
+        csvVarDict['__INDEX__'] = indexKey
+        csvVarDict['__PATH__'] = csvFilePath
+        self.ctx.debug("\n%s", Lazy(json.dumps, csvVarDict, indent=4, sort_keys=True, default=dict))
+        return csvVarDict
+
+    def readIndexed(self, csvFilePath, lookup, delimiter=','):
+        """
+        Read the row of a lookup key using the sidecar index of the CSV file.
+
+        Args:
+            csvFilePath (str): The path to the CSV file.
+            lookup (str): The lookup key.
+            delimiter (str, optional): The CSV delimiter. Defaults to ','.
+
+        Returns:
+            dict: A dictionary representing the CSV data, as returned by read().
+        """
+        index = CSVIndex.open(csvFilePath, delimiter)
+        if index.header is None:
+            self.ctx.exitError("readCsvToDict: CSV file {} is empty!".format(csvFilePath))
+        indexKey = re.sub(r'^\\ufeff', '', index.header[0])
+        valueKeys = list(map(str.strip, index.header[1:]))
+        csvVarDict = {}
+        row = index.get(lookup)
+        if row:
+            rowData = dict(zip(valueKeys, map(str.strip, row[1:])))
+            rowData[indexKey] = row[0]
+            csvVarDict[lookup] = rowData
+            csvVarDict['__LOOKUP__'] = lookup
+        csvVarDict['__INDEX__'] = indexKey
+        csvVarDict['__PATH__'] = csvFilePath
+        self.ctx.debug("\n%s", Lazy(json.dumps, csvVarDict, indent=4, sort_keys=True, default=dict))
         return csvVarDict
 
+    def render(self, csvFilePath, templates, outputDir=None, sink=None, fileName=None, maxWorkers=1, delimiter=','):
+        """
+        Render templates for every row of a CSV file, streaming rows and results.
+
+        Rows are read one at a time and each rendered config is written to
+        outputDir and/or handed to sink right away, so memory does not grow
+        with the CSV size. Rows with missing variables or failing sinks are
+        recorded in the result errors and do not stop the rendering.
+
+        Example:
+            XIQSE.CSV.render('/root/inventory.csv', configStr, outputDir='/tftpboot/configs')
+            XIQSE.CSV.render('/root/inventory.csv', configStr, sink=lambda key, name, text: XIQSE.CLI.warpBufferAdd(text))
+
+        Args:
+            csvFilePath (str): The path to the CSV file.
+            templates (str, list or dict): The template, a list of templates rendered into one config,
+                                           or a dictionary of named templates rendered into one config each.
+            outputDir (str, optional): Directory where each config is written. Defaults to None.
+            sink (callable, optional): Function called with (key, name, text) for each config; name is None
+                                       unless templates is a dictionary. Calls are serialized. Defaults to None.
+            fileName (str, optional): The config file name format, with {key} and {name} fields.
+                                      Defaults to '{key}.cfg', or '{key}.{name}.cfg' for named templates.
+            maxWorkers (int, optional): The number of rendering threads; with more than one, rows
+                                        are rendered out of order. Defaults to 1.
+            delimiter (str, optional): The CSV delimiter. Defaults to ','.
+
+        Returns:
+            dict: The number of 'rows' read and 'rendered', and the 'errors' as (key, message) tuples.
+        """
+        if isinstance(templates, dict):
+            templateList = [(name, CSVTemplate.compile(x)) for name, x in sorted(templates.items())]
+            joinOutputs = False
+        else:
+            templateList = [(None, CSVTemplate.compile(x)) for x in (templates if isinstance(templates, (list, tuple)) else [templates])]
+            joinOutputs = True
+        if fileName is None:
+            fileName = '{key}.cfg' if joinOutputs else '{key}.{name}.cfg'
+        if outputDir and not os.path.isdir(outputDir):
+            os.makedirs(outputDir)
+        result = {'rows': 0, 'rendered': 0, 'errors': []}
+        lock = threading.Lock()
+
+        def renderRow(row):
+            key = row.data[0]
+            try:
+                outputs = []
+                for name, template in templateList:
+                    missingVarList = template.missing(row)
+                    if missingVarList:
+                        raise ValueError("variables not found in the CSV file: {}".format(missingVarList))
+                    outputs.append((name, template.render(row)))
+                if joinOutputs:
+                    outputs = [(None, '\n'.join(x[1] for x in outputs))]
+                for name, text in outputs:
+                    if outputDir:
+                        safeKey = re.sub(r'[^\w.-]', '_', key)
+                        with open(os.path.join(outputDir, fileName.format(key=safeKey, name=name)), 'w') as f:
+                            f.write(text)
+                    if sink:
+                        with lock:
+                            sink(key, name, text)
+                with lock:
+                    result['rendered'] += 1
+            except Exception as e:
+                with lock:
+                    result['errors'].append((key, "{}: {}".format(type(e).__name__, e)))
+
+        if maxWorkers <= 1:
+            for row in self.iterRows(csvFilePath, delimiter):
+                result['rows'] += 1
+                renderRow(row)
+        else:
+            queue = Queue(maxWorkers * 2)
+
+            def worker():
+                while True:
+                    row = queue.get()
+                    if row is None:
+                        return
+                    renderRow(row)
+
+            threads = [threading.Thread(target=worker, name='xiqse-render-{}'.format(x)) for x in range(maxWorkers)]
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            try:
+                for row in self.iterRows(csvFilePath, delimiter):
+                    result['rows'] += 1
+                    queue.put(row)
+            finally:
+                for thread in threads:
+                    queue.put(None)
+                for thread in threads:
+                    thread.join()
+
+        self.ctx.debug("CSV render %s: %d rows, %d rendered, %d errors", csvFilePath, result['rows'], result['rendered'], len(result['errors']))
+        for key, error in result['errors'][:10]:
+            self.ctx.error("CSV render %s: %s", key, error)
+        if len(result['errors']) > 10:
+            self.ctx.error("CSV render: %d more errors", len(result['errors']) - 10)
+        return result
+
+    def table(self, csvFilePath, delimiter=',', indexes=None, compact=False):
+        """
+        Load a CSV file as a table with secondary indexes.
+
+        Example:
+            table = XIQSE.CSV.table('/root/inventory.csv', indexes=['ip_oob', ('site', 'role')])
+            row = table.first('ip_oob', '10.201.100.141')
+            rows = table.ipRange('ip_oob', '10.201.100.0/24')
+
+        Args:
+            csvFilePath (str): The path to the CSV file.
+            delimiter (str, optional): The CSV delimiter. Defaults to ','.
+            indexes (list, optional): Columns, or tuples of columns for composite keys, indexed at load time. Defaults to None.
+            compact (bool, optional): Whether to store rows as compact CSVRow objects. Defaults to False.
+
+        Returns:
+            CSVTable: The table.
+        """
+        if not os.path.exists(csvFilePath):
+            self.ctx.exitError("readCsvToDict: CSV file {} not found!".format(csvFilePath))
+        table = CSVTable.load(csvFilePath, delimiter, compact)
+        for columns in indexes or []:
+            if isinstance(columns, (list, tuple)):
+                table.addIndex(*columns)
+            else:
+                table.addIndex(columns)
+        self.ctx.debug("CSV table %s: %d rows, columns %s", csvFilePath, len(table), table.columns)
+        return table
+
     def varLookup(self, inputStr, csvVarDict, lookup):
         """
         Replace variables in a string with values from the CSV dictionary.
 
+        The string is compiled once into a CSVTemplate (cached by text), and
+        values are inserted as is.
+
         Args:
             inputStr (str): The input string containing variables (e.g., $<var> or $(var)).
             csvVarDict (dict): The dictionary containing CSV data.
@@ -77,11 +337,11 @@ class CSV(object):
         Raises:
             RuntimeError: If a variable is not found in the CSV data.
         """
-        csvVarsUsed = {x.group(1):1 for x in list(re.finditer(r'\$<([\w -]+)>', inputStr)) + list(re.finditer(r'\$\(([\w -]+)\)', inputStr))}
+        template = CSVTemplate.compile(inputStr)
         outputStr = inputStr
         
-        if csvVarsUsed:
-            missingVarList = [x for x in csvVarsUsed if lookup not in csvVarDict or x not in csvVarDict[lookup]]
+        if template.variables:
+            missingVarList = template.missing(csvVarDict.get(lookup) if csvVarDict else None)
             
             if missingVarList:
                 if csvVarDict:
@@ -89,20 +349,58 @@ class CSV(object):
                 else:
                     self.ctx.exitError("varLookup: no CSV file provided but the following variables were found requiring CSV lookup {}:\n{}".format(lookup, missingVarList))
             
-            for csvVar in csvVarsUsed:
-                outputStr = re.sub(r'(?:\$<' + csvVar + '>|\$\(' + csvVar + '\))', csvVarDict[lookup][csvVar], outputStr)
+            outputStr = template.render(csvVarDict[lookup])
             
             if "\n" in inputStr:
-                debug_input = "varLookup input: " + str(type(inputStr)) + "\n" + inputStr + "\n"
-                debug_output = "varLookup output: " + str(type(outputStr)) + "\n" + outputStr + "\n"
-                self.ctx.debug(debug_input)
-                self.ctx.debug(debug_output)
+                self.ctx.debug("varLookup input: %s\n%s\n", type(inputStr), inputStr)
+                self.ctx.debug("varLookup output: %s\n%s\n", type(outputStr), outputStr)
             else:
-                debug_msg = "varLookup " + str(type(inputStr)) + " " + inputStr + " = " + str(type(outputStr)) + " " + outputStr
-                self.ctx.debug(debug_msg)
+                self.ctx.debug("varLookup %s %s = %s %s", type(inputStr), inputStr, type(outputStr), outputStr)
         
         return outputStr
     
+    def template(self, templateStr):
+        """
+        Compile a template with $<var> / $(var) variables, to render it for many rows.
+
+        Example:
+            template = XIQSE.CSV.template(configStr)
+            for row in XIQSE.CSV.table(csvFilePath):
+                cli.sendCommandChain(template.render(row))
+
+        Args:
+            templateStr (str): The template text.
+
+        Returns:
+            CSVTemplate: The compiled template.
+        """
+        return CSVTemplate.compile(templateStr)
+    
+    def write(self, csvFilePath, rows, columns, delimiter=None, compress=None):
+        """
+        Write rows to a CSV or TSV file, streaming them from an iterable.
+
+        Example:
+            devices = XIQSE.Netbox.iterate('dcim/devices', status='active')
+            XIQSE.CSV.write('/tmp/devices.csv.gz', devices, ['name', 'serial', ('site', 'site.name')])
+
+        Args:
+            csvFilePath (str): The path to the output file.
+            rows (iterable): The rows: dictionaries, or lists of fields in column order.
+            columns (list): The columns: dotted paths, used as header, or (header, path) tuples.
+            delimiter (str, optional): The delimiter. Defaults to None ('\t' for .tsv files, ',' otherwise).
+            compress (bool, optional): Whether to gzip the output. Defaults to None (when the path ends with '.gz').
+
+        Returns:
+            int: The number of rows written.
+        """
+        if delimiter is None:
+            delimiter = '\t' if re.search(r'\.tsv(\.gz)?$', csvFilePath) else ','
+        with CSVWriter(csvFilePath, columns, delimiter, compress) as writer:
+            count = writer.writeRows(rows)
+        self.ctx.debug("CSV write %s: %d rows", csvFilePath, count)
+        return count
+
     def test(self):
         """
         Test the CSV module.
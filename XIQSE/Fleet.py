@@ -0,0 +1,394 @@
+import re
+import threading
+import time
+
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+
+from .CLI import CLI
+from .Utils.CLIDict import TFTP_Dict
+from .Utils.ScriptStore import ScriptStore
+
+
+class SessionPool(object):
+    """
+    Pool of per-device CLI sessions.
+
+    Sessions are created on demand by a factory, reused for the same device
+    and closed once they have been idle for longer than the idle timeout.
+    """
+
+    def __init__(self, factory, idleTimeout=300):
+        """
+        Initialize the session pool.
+
+        Args:
+            factory (callable): Function taking an IP address and returning an emc_cli-like session.
+            idleTimeout (int, optional): Seconds after which an unused session is closed. Defaults to 300.
+        """
+        self.factory = factory
+        self.idleTimeout = idleTimeout
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, ip):
+        """
+        Get a session for a device, reusing an idle one when available.
+
+        Args:
+            ip (str): The device IP address.
+
+        Returns:
+            object: The CLI session.
+        """
+        self.evictIdle()
+        with self.lock:
+            entry = self.sessions.get(ip)
+            if entry and not entry[2]:
+                entry[2] = True
+                return entry[0]
+        session = self.factory(ip)
+        with self.lock:
+            if ip not in self.sessions:
+                self.sessions[ip] = [session, time.time(), True]
+        return session
+
+    def release(self, ip, session):
+        """
+        Return a session to the pool.
+
+        Args:
+            ip (str): The device IP address.
+            session (object): The CLI session returned by acquire().
+        """
+        with self.lock:
+            entry = self.sessions.get(ip)
+            if entry and entry[0] is session:
+                entry[1] = time.time()
+                entry[2] = False
+                return
+        self.closeSession(session)
+
+    def evictIdle(self):
+        """
+        Close the sessions that have been idle for longer than the idle timeout.
+        """
+        expired = []
+        now = time.time()
+        with self.lock:
+            for ip, entry in list(self.sessions.items()):
+                if not entry[2] and now - entry[1] > self.idleTimeout:
+                    expired.append(entry[0])
+                    del self.sessions[ip]
+        for session in expired:
+            self.closeSession(session)
+
+    def close(self):
+        """
+        Close all idle sessions of the pool.
+        """
+        with self.lock:
+            sessions = [entry[0] for entry in self.sessions.values() if not entry[2]]
+            self.sessions = dict((ip, entry) for ip, entry in self.sessions.items() if entry[2])
+        for session in sessions:
+            self.closeSession(session)
+
+    def closeSession(self, session):
+        """
+        Close a session, ignoring errors from already closed sessions.
+
+        Args:
+            session (object): The CLI session.
+        """
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
+class Fleet(object):
+    """
+    Class for running CLI command chains across many devices.
+
+    Each device is driven by its own CLI object, with its own command history
+    and error state, on a session taken from a per-device session pool.
+    """
+
+    def __init__(self, context):
+        """
+        Initialize the Fleet object.
+
+        Args:
+            context: The XIQSE context object.
+        """
+        self.ctx = context
+        self.pool = None
+
+    def close(self):
+        """
+        Close the pooled device sessions.
+        """
+        if self.pool:
+            self.pool.close()
+
+    def run(self, devices, chainStr=None, families=None, maxWorkers=8, msgOnError=None, abortOnError=True):
+        """
+        Run a command chain on several devices with bounded concurrency.
+
+        Without a session factory (see setSessionFactory) the devices share
+        the context emc_cli session and are processed one after the other.
+
+        Args:
+            devices (list or dict): List of device IP addresses, or dictionary of IP address to per-device chain.
+            chainStr (str, optional): The chain to run on every device of a list. Defaults to None.
+            families (dict, optional): Dictionary of IP address to device family. Defaults to the context family.
+            maxWorkers (int, optional): Maximum number of devices handled at the same time. Defaults to 8.
+            msgOnError (str, optional): Message to log if an error occurs. Defaults to None.
+            abortOnError (bool, optional): Whether to stop a device chain on error. Defaults to True.
+
+        Returns:
+            list: One result dictionary per device, in input order, with the keys
+                  'ip', 'success', 'error', 'errorCode', 'elapsed', 'commands', 'history'
+                  and 'records' (the CommandRecord telemetry of the device).
+        """
+        def action(cli, chain):
+            return cli.sendCommandChain(chain, True, msgOnError, abortOnError=abortOnError)
+
+        return self.runJobs(self.jobs(devices, chainStr), families, maxWorkers, action)
+
+    def jobs(self, devices, chainStr=None):
+        """
+        Get the (IP address, chain) pairs of a run.
+
+        Args:
+            devices (list or dict): List of device IP addresses, or dictionary of IP address to per-device chain.
+            chainStr (str, optional): The chain to run on every device of a list. Defaults to None.
+
+        Returns:
+            list: The (IP address, chain) pairs.
+        """
+        if isinstance(devices, dict):
+            return list(devices.items())
+        return [(ip, chainStr) for ip in devices]
+
+    def runJobs(self, jobs, families, maxWorkers, action):
+        """
+        Run an action on several devices with bounded concurrency.
+
+        Args:
+            jobs (list): The (IP address, chain) pairs.
+            families (dict): Dictionary of IP address to device family, or None.
+            maxWorkers (int): Maximum number of devices handled at the same time.
+            action (callable): Function taking a CLI object and a chain, and returning the device success status.
+
+        Returns:
+            list: One result dictionary per device, in input order.
+        """
+        families = families or {}
+        results = [None] * len(jobs)
+
+        if self.pool:
+            workers = max(1, min(maxWorkers, len(jobs)))
+        else:
+            workers = 1
+            self.pool = SessionPool(self.sharedSession)
+
+        queue = Queue()
+        for i, job in enumerate(jobs):
+            queue.put((i, job))
+
+        def worker():
+            while True:
+                try:
+                    i, (ip, chain) = queue.get_nowait()
+                except Empty:
+                    return
+                results[i] = self.runDevice(ip, chain, families.get(ip), action)
+
+        self.ctx.log("Fleet: running on {} devices with {} workers".format(len(jobs), workers))
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self.pool.factory == self.sharedSession:
+            self.pool = None
+            if SharedSession.current and self.ctx.getVar("deviceIP"):
+                self.ctx.setIpAddress(self.ctx.getVar("deviceIP"))
+            SharedSession.current = None
+        return results
+
+    def runDevice(self, ip, chainStr, family, action):
+        """
+        Run an action on a single device of the fleet.
+
+        Errors are kept in the device result: the action runs its commands
+        with returnCliError, and a chain '#error fail' directive fails this
+        device only, so the global workflow status is not touched.
+
+        Args:
+            ip (str): The device IP address.
+            chainStr (str): The command chain.
+            family (str): The device family, or None for the context family.
+            action (callable): Function taking a CLI object and a chain, and returning the success status.
+
+        Returns:
+            dict: The device result.
+        """
+        result = {'ip': ip, 'success': False, 'error': None, 'errorCode': None, 'elapsed': 0.0, 'commands': 0, 'history': [], 'records': []}
+        startTime = time.time()
+        session = cli = None
+        try:
+            session = self.pool.acquire(ip)
+            cli = CLI(self.ctx, emc_cli=session, family=family, ipAddress=ip)
+            cli.ContainErrors = True
+            result['success'] = bool(action(cli, chainStr))
+            result['error'] = cli.LastError
+            result['errorCode'] = cli.LastErrorCode
+        except Exception as e:
+            result['error'] = "{}: {}".format(type(e).__name__, str(e))
+        finally:
+            if cli is not None:
+                cli.warpBufferClose()
+                result['history'] = cli.CommandHistory.commands()
+                result['commands'] = len(result['history'])
+                result['records'] = list(cli.CommandHistory)
+            if session is not None:
+                self.pool.release(ip, session)
+        result['elapsed'] = time.time() - startTime
+        self.ctx.debug("Fleet: %s done in %.2fs (success=%s)", ip, result['elapsed'], result['success'])
+        return result
+
+    def printResults(self, results):
+        """
+        Print a per-device result table.
+
+        Args:
+            results (list): The results returned by run().
+        """
+        line_width = 80
+        print("=" * line_width)
+        print("{:<18}{:<10}{:>10}{:>10}  {}".format("Device", "Status", "Commands", "Time (s)", "Error"))
+        print("-" * line_width)
+        for result in results:
+            error = (result['error'] or '').strip().split("\n")[0][:30]
+            status = "OK" if result['success'] else "FAILED"
+            print("{:<18}{:<10}{:>10}{:>10.2f}  {}".format(result['ip'], status, result['commands'], result['elapsed'], error))
+        print("=" * line_width)
+        failed = len([x for x in results if not x['success']])
+        self.ctx.log("Fleet: {} devices, {} succeeded, {} failed".format(len(results), len(results) - failed, failed))
+
+    def setSessionFactory(self, factory, idleTimeout=300):
+        """
+        Set the factory used to open one CLI session per device.
+
+        With a factory, run() drives up to maxWorkers devices in parallel.
+
+        Args:
+            factory (callable): Function taking an IP address and returning an emc_cli-like session.
+            idleTimeout (int, optional): Seconds after which an unused session is closed. Defaults to 300.
+        """
+        self.close()
+        if self.ctx.Metrics.enabled:
+            sessionFactory = factory
+            factory = lambda ip: self.ctx.Metrics.wrap(sessionFactory(ip), 'cli')
+        self.pool = SessionPool(factory, idleTimeout)
+
+    def sharedSession(self, ip):
+        """
+        Get a view of the context emc_cli session bound to a device.
+
+        Args:
+            ip (str): The device IP address.
+
+        Returns:
+            SharedSession: The session bound to the device.
+        """
+        return SharedSession(self.ctx, ip)
+
+    def warpPush(self, devices, chainStr=None, families=None, maxWorkers=8, msgOnError=None):
+        """
+        Push warp scripts to several devices through shared, content-addressed TFTP scripts.
+
+        Devices receiving the same script (same family and chain) share a
+        single file in the TFTP root, named after its content hash. Each
+        file is written once and deleted at the end of the push, unless a
+        concurrent activity still references it.
+
+        Args:
+            devices (list or dict): List of device IP addresses, or dictionary of IP address to per-device chain.
+            chainStr (str, optional): The chain to push to every device of a list. Defaults to None.
+            families (dict, optional): Dictionary of IP address to device family. Defaults to the context family.
+            maxWorkers (int, optional): Maximum number of devices handled at the same time. Defaults to 8.
+            msgOnError (str, optional): Message to log if an error occurs. Defaults to None.
+
+        Returns:
+            list: One result dictionary per device, in input order, with the keys of run() plus 'script'.
+        """
+        jobs = self.jobs(devices, chainStr)
+        families = families or {}
+        store = ScriptStore(CLI.TFTPRoot)
+        scripts = {}
+        deviceScripts = {}
+
+        def action(cli, chain):
+            ip = cli.getIpAddress()
+            activated = cli.tftpEnable(True, msgOnError)
+            success = cli.tftpExecute(deviceScripts[ip], True, msgOnError)
+            if activated:
+                cli.sendCommand(TFTP_Dict[cli.getFamily()]['deactivate'], True, msgOnError)
+            return success
+
+        try:
+            for ip, chain in jobs:
+                family = families.get(ip) or self.ctx.getFamily()
+                if (family, chain) not in scripts:
+                    cmdList = [re.sub(r'\n.+$', '', cmd) for cmd in CLI(self.ctx, family=family).configChain(chain)]
+                    scripts[(family, chain)] = store.put(TFTP_Dict[family]['header'] + cmdList, ip)
+                else:
+                    store.acquire(scripts[(family, chain)], ip)
+                deviceScripts[ip] = scripts[(family, chain)]
+            self.ctx.log("Fleet: {} scripts for {} devices".format(len(scripts), len(jobs)))
+            results = self.runJobs(jobs, families, maxWorkers, action)
+        finally:
+            for ip, name in deviceScripts.items():
+                store.release(name, ip)
+        for result in results:
+            result['script'] = deviceScripts[result['ip']]
+        return results
+
+    def test(self):
+        """
+        Test the Fleet module.
+        """
+        self.ctx.log("XIQSE.Fleet.test => OK")
+
+
+class SharedSession(object):
+    """
+    Context emc_cli session bound to one device.
+
+    The emc_cli session is pointed at the device before each command when
+    another device used it in between. The pool never closes it.
+    """
+
+    current = None
+
+    def __init__(self, context, ip):
+        self.ctx = context
+        self.ip = ip
+
+    def __getattr__(self, name):
+        return getattr(self.ctx.emc_cli, name)
+
+    def close(self):
+        pass
+
+    def send(self, *args):
+        if SharedSession.current != self.ip:
+            self.ctx.setIpAddress(self.ip)
+            SharedSession.current = self.ip
+        return self.ctx.emc_cli.send(*args)
@@ -170,7 +170,10 @@ class GraphQL(object):
             'Pragma': 'no-cache',
         })
         try:
-            response = session.post(self.nbiUrl, json={'operationName': None, 'query': jsonQuery, 'variables': None})
+            with self.ctx.Metrics.span('nbi.post') as span:
+                response = session.post(self.nbiUrl, json={'operationName': None, 'query': jsonQuery, 'variables': None})
+                if self.ctx.Metrics.enabled:
+                    span.bytes = len(response.content)
             response.raise_for_status()
         except requests.exceptions.RequestException as error:
             if returnKeyError:
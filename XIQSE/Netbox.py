@@ -32,6 +32,8 @@ class Netbox(object):
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         })
+        if self.ctx.Metrics.enabled:
+            self.session.hooks['response'].append(self.recordMetrics)
         
         try:
             # Simple check to verify connectivity
@@ -44,6 +46,59 @@ class Netbox(object):
             self.session = None
             return False
 
+    def recordMetrics(self, response, *args, **kwargs):
+        """
+        Record the latency of a Netbox HTTP call (requests response hook).
+        
+        Args:
+            response (requests.Response): The HTTP response.
+        """
+        self.ctx.Metrics.record('netbox.' + response.request.method.lower(), response.elapsed.total_seconds(), len(response.content))
+
+    def iterate(self, endpoint, page_size=1000, **filters):
+        """
+        Iterate over the objects of an API endpoint, one page at a time.
+        
+        Pages are requested as the objects are consumed, following the 'next'
+        links, so large exports (e.g. with XIQSE.CSV.write) use constant memory.
+        
+        Args:
+            endpoint (str): The API endpoint, e.g. 'dcim/devices'.
+            page_size (int): The number of objects per page. Defaults to 1000.
+            **filters: The API filters, e.g. status='active'.
+            
+        Yields:
+            dict: The objects.
+            
+        Raises:
+            RuntimeError: If the session is not initialized.
+            requests.exceptions.RequestException: If a page request fails, so a partial export cannot pass as complete.
+            ValueError: If a page is not valid JSON.
+        """
+        if not self.session:
+            self.ctx.log("Netbox session not initialized. Please call connect() first.")
+            raise RuntimeError("Netbox session not initialized")
+            
+        api_url = "{}/api/{}/".format(self.url, endpoint.strip('/'))
+        params = dict(filters, limit=page_size)
+        while api_url:
+            try:
+                self.ctx.debug("Querying Netbox: %s %s", api_url, params)
+                response = self.session.get(api_url, params=params)
+                response.raise_for_status()
+                data = response.json()
+            except requests.exceptions.RequestException as e:
+                self.ctx.log("Error iterating over {}: {}".format(endpoint, e))
+                raise
+            except ValueError as e:
+                self.ctx.log("Error decoding JSON response: {}".format(e))
+                raise
+            for item in data.get('results', []):
+                yield item
+            # The next link already carries the filters and the offset
+            api_url = data.get('next')
+            params = None
+
     def getDeviceBySerial(self, serial_number):
         """
         Retrieve device information by serial number.
@@ -1,8 +1,14 @@
+from .Utils.Reachability import ReachabilitySweeper, TcpPorts
+
+
 class OS(object):
     """
-    Class for handling OS-level interactions (placeholder).
-    
-    This class is currently a placeholder for OS-related functionality.
+    Class for handling OS-level interactions.
+
+    Provides a concurrent reachability sweeper: thousands of IP addresses
+    are probed at once with ICMP when the system permits it, TCP connects
+    as a fallback and batched ping processes otherwise (see
+    ReachabilitySweeper).
     """
 
     def __init__(self, context):
@@ -13,7 +19,45 @@ class OS(object):
             context: The XIQSE context object.
         """
         self.ctx = context
-    
+
+    def sweep(self, ips, timeout=2.0, interval=1.0, methods=('icmp', 'tcp', 'subprocess'), ports=TcpPorts, maxSockets=256, maxProcesses=64):
+        """
+        Check the reachability of IP addresses concurrently.
+
+        Each IP address is probed every interval until it replies or its
+        deadline (timeout seconds after the start) passes.
+
+        Example:
+            results = XIQSE.OS.sweep(deviceIps, timeout=5)
+            down = [ip for ip, result in results.items() if not result['reachable']]
+
+        Args:
+            ips (str or list): The IP address, or list of IP addresses.
+            timeout (float, optional): Per-IP deadline in seconds. Defaults to 2.0.
+            interval (float, optional): Seconds between two probes of an IP address. Defaults to 1.0.
+            methods (tuple, optional): The probe methods allowed: 'icmp', 'tcp' and 'subprocess'.
+                                       Defaults to ('icmp', 'tcp', 'subprocess').
+            ports (tuple, optional): The TCP ports probed by the 'tcp' method. Defaults to (22, 23, 443).
+            maxSockets (int, optional): Maximum number of TCP connects in progress. Defaults to 256.
+            maxProcesses (int, optional): Maximum number of ping processes running. Defaults to 64.
+
+        Returns:
+            dict: Per IP address, a dictionary with the keys 'ip', 'reachable', 'method',
+                  'port' (for 'tcp'), 'rtt', 'firstReply' (seconds from the start), 'attempts'
+                  and 'error' (why an unreachable IP address could not be probed, or None).
+
+        Raises:
+            RuntimeError: If none of the allowed methods can be used.
+        """
+        if not isinstance(ips, (list, tuple, set)):
+            ips = [ips]
+        sweeper = ReachabilitySweeper(methods, ports, maxSockets, maxProcesses)
+        with self.ctx.Metrics.span('os.sweep'):
+            results = sweeper.sweep(ips, timeout, interval)
+        reachable = len([x for x in results.values() if x['reachable']])
+        self.ctx.debug("OS sweep: %d of %d IPs reachable", reachable, len(results))
+        return results
+
     def test(self):
         """
         Test the OS module.
@@ -1,8 +1,26 @@
+import time
+from collections import deque
+
+from .Utils import BER
+from .Utils.SNMPEngine import SNMPEngine, SNMPTarget
+from .Utils.SNMPTable import TableWalk
+
+try:
+    StringTypes = basestring
+except NameError:
+    StringTypes = str
+
+
 class SNMP(object):
     """
-    Class for handling SNMP interactions (placeholder).
-    
-    This class is currently a placeholder for SNMP-related functionality.
+    Class for handling SNMP interactions.
+
+    SNMP v1/v2c/v3 (noAuthNoPriv and authNoPriv) client built on a
+    non-blocking UDP engine: GET, GETNEXT, GETBULK and walks run against
+    many devices at once, with per-request timeouts and retries. Results
+    are returned per host, with OIDs as dotted strings. SNMPv3 privacy
+    (authPriv) is not supported: the privProtocol and privPassword options
+    raise ValueError.
     """
 
     def __init__(self, context):
@@ -13,7 +31,292 @@ class SNMP(object):
             context: The XIQSE context object.
         """
         self.ctx = context
-    
+        self.defaults = {'version': '2c', 'community': 'public', 'timeout': 1.0, 'retries': 2}
+        self.LastStats = None
+        self.LastTableResults = None
+
+    def setDefaults(self, **options):
+        """
+        Set the default target options, e.g. the community or the v3 credentials.
+
+        Args:
+            **options: SNMPTarget options: version, community, user, authProtocol, authPassword,
+                       contextName, port, timeout and retries. privProtocol and privPassword
+                       raise ValueError, as authPriv is not supported.
+        """
+        self.defaults.update(options)
+
+    def target(self, host, **options):
+        """
+        Build the target of a host with the default options.
+
+        Args:
+            host (str or SNMPTarget): The host, or an already built target.
+            **options: SNMPTarget options overriding the defaults, e.g. the per-request timeout and retries.
+
+        Returns:
+            SNMPTarget: The target.
+        """
+        if isinstance(host, SNMPTarget):
+            return host
+        targetOptions = dict(self.defaults)
+        targetOptions.update(options)
+        return SNMPTarget(host, **targetOptions)
+
+    def targets(self, hosts, options):
+        """
+        Build the targets of one or several hosts.
+
+        Args:
+            hosts (str, SNMPTarget or list): The hosts.
+            options (dict): SNMPTarget options overriding the defaults.
+
+        Returns:
+            list: The targets.
+        """
+        if isinstance(hosts, (StringTypes, SNMPTarget)) or not hasattr(hosts, '__iter__'):
+            hosts = [hosts]
+        return [self.target(host, **options) for host in hosts]
+
+    def newResult(self, target):
+        """
+        Build the empty result of a target.
+
+        Args:
+            target (SNMPTarget): The target.
+
+        Returns:
+            dict: The result, with the keys 'host', 'success', 'error', 'varbinds', 'elapsed' and 'requests'.
+        """
+        return {'host': target.host, 'success': False, 'error': None, 'varbinds': [], 'elapsed': 0.0, 'requests': 0, 'start': time.time()}
+
+    def execute(self, name, engine, results, deadline=None):
+        """
+        Run an engine and finalize the results.
+
+        Args:
+            name (str): The operation name, for metrics and logs.
+            engine (SNMPEngine): The engine, with its requests submitted.
+            results (dict): The results by host.
+            deadline (float, optional): Overall deadline in seconds. Defaults to None.
+
+        Returns:
+            dict: The results by host.
+        """
+        with self.ctx.Metrics.span('snmp.' + name):
+            try:
+                engine.run(deadline)
+            finally:
+                engine.close()
+        for result in results.values():
+            result.pop('start', None)
+        self.LastStats = engine.stats
+        failed = len([x for x in results.values() if not x['success']])
+        self.ctx.debug("SNMP %s: %d hosts, %d failed, stats %s", name, len(results), failed, engine.stats)
+        return results
+
+    def request(self, name, pduType, hosts, oids, nonRepeaters=0, maxRepetitions=0, maxInFlight=256, deadline=None, **options):
+        """
+        Send one request to each host.
+
+        Args:
+            name (str): The operation name.
+            pduType (int): The PDU type.
+            hosts (str or list): The hosts or SNMPTarget objects.
+            oids (list): The OIDs.
+            nonRepeaters (int, optional): The GETBULK non-repeaters. Defaults to 0.
+            maxRepetitions (int, optional): The GETBULK max-repetitions. Defaults to 0.
+            maxInFlight (int, optional): Maximum number of outstanding requests. Defaults to 256.
+            deadline (float, optional): Overall deadline in seconds; requests still pending then fail. Defaults to None.
+            **options: SNMPTarget options overriding the defaults, e.g. the per-request timeout and retries.
+
+        Returns:
+            dict: The results by host.
+        """
+        oids = [BER.parseOid(oid) for oid in ([oids] if isinstance(oids, StringTypes) else oids)]
+        engine = SNMPEngine(maxInFlight)
+        results = {}
+
+        def onResponse(request, error, varbinds):
+            result = request.context
+            result['requests'] += 1
+            result['elapsed'] = time.time() - result['start']
+            result['error'] = error
+            result['success'] = error is None
+            result['varbinds'] = [(BER.formatOid(oid), value) for oid, value in varbinds or []]
+
+        for target in self.targets(hosts, options):
+            results[target.host] = result = self.newResult(target)
+            engine.submit(target, pduType, oids, onResponse, nonRepeaters, maxRepetitions, result)
+        return self.execute(name, engine, results, deadline)
+
+    def get(self, hosts, oids, **options):
+        """
+        Send a GET request to one or several hosts.
+
+        Example:
+            results = XIQSE.SNMP.get(['10.0.0.1', '10.0.0.2'], ['1.3.6.1.2.1.1.5.0'], community='private')
+
+        Args:
+            hosts (str or list): The hosts or SNMPTarget objects.
+            oids (str or list): The OIDs.
+            **options: maxInFlight, deadline (overall, in seconds) and SNMPTarget options, e.g. timeout.
+
+        Returns:
+            dict: The results by host: dictionaries with the keys 'host', 'success', 'error',
+                  'varbinds' (the (oid, value) tuples), 'elapsed' and 'requests'.
+        """
+        return self.request('get', BER.PduGet, hosts, oids, **options)
+
+    def getNext(self, hosts, oids, **options):
+        """
+        Send a GETNEXT request to one or several hosts.
+
+        Args:
+            hosts (str or list): The hosts or SNMPTarget objects.
+            oids (str or list): The OIDs.
+            **options: maxInFlight, deadline (overall, in seconds) and SNMPTarget options, e.g. timeout.
+
+        Returns:
+            dict: The results by host, as returned by get().
+        """
+        return self.request('getNext', BER.PduGetNext, hosts, oids, **options)
+
+    def getBulk(self, hosts, oids, nonRepeaters=0, maxRepetitions=10, **options):
+        """
+        Send a GETBULK request to one or several hosts (v2c/v3).
+
+        Args:
+            hosts (str or list): The hosts or SNMPTarget objects.
+            oids (str or list): The OIDs.
+            nonRepeaters (int, optional): The number of leading OIDs fetched once. Defaults to 0.
+            maxRepetitions (int, optional): The number of successors fetched for the other OIDs. Defaults to 10.
+            **options: maxInFlight, deadline (overall, in seconds) and SNMPTarget options, e.g. timeout.
+
+        Returns:
+            dict: The results by host, as returned by get().
+        """
+        return self.request('getBulk', BER.PduGetBulk, hosts, oids, nonRepeaters, maxRepetitions, **options)
+
+    def walk(self, hosts, oid, maxRepetitions=25, maxInFlight=256, deadline=None, **options):
+        """
+        Walk a subtree on one or several hosts at once.
+
+        The walk uses GETBULK (GETNEXT for v1) and stops at the end of the
+        subtree, at the end of the MIB view or if the agent returns an OID
+        out of order.
+
+        Example:
+            results = XIQSE.SNMP.walk(fabricIps, '1.3.6.1.2.1.2.2.1.10')
+
+        Args:
+            hosts (str or list): The hosts or SNMPTarget objects.
+            oid (str): The subtree root OID.
+            maxRepetitions (int, optional): The GETBULK max-repetitions. Defaults to 25.
+            maxInFlight (int, optional): Maximum number of outstanding requests. Defaults to 256.
+            deadline (float, optional): Overall deadline in seconds; requests still pending then fail. Defaults to None.
+            **options: SNMPTarget options overriding the defaults, e.g. the per-request timeout and retries.
+
+        Returns:
+            dict: The results by host, as returned by get(), with the subtree varbinds.
+        """
+        root = BER.parseOid(oid)
+        engine = SNMPEngine(maxInFlight)
+        results = {}
+
+        def submitNext(target, result, lastOid):
+            if target.version == '1':
+                engine.submit(target, BER.PduGetNext, [lastOid], onResponse, context=result)
+            else:
+                engine.submit(target, BER.PduGetBulk, [lastOid], onResponse, 0, maxRepetitions, result)
+
+        def onResponse(request, error, varbinds):
+            result = request.context
+            result['requests'] += 1
+            result['elapsed'] = time.time() - result['start']
+            if error:
+                # v1 agents signal the end of the MIB view with noSuchName
+                endOfMib = request.target.version == '1' and error.startswith('noSuchName')
+                result['success'] = endOfMib
+                result['error'] = None if endOfMib else error
+                return
+            lastOid = request.oids[0]
+            for vbOid, value in varbinds:
+                if value is BER.EndOfMibView or vbOid[:len(root)] != root or vbOid <= lastOid:
+                    result['success'] = True
+                    return
+                result['varbinds'].append((BER.formatOid(vbOid), value))
+                lastOid = vbOid
+            if not varbinds:
+                result['success'] = True
+                return
+            submitNext(request.target, result, lastOid)
+
+        for target in self.targets(hosts, options):
+            results[target.host] = result = self.newResult(target)
+            submitNext(target, result, root)
+        return self.execute('walk', engine, results, deadline)
+
+    def walkTable(self, hosts, columns, maxRepetitions=10, maxInFlight=256, deadline=None, **options):
+        """
+        Walk table columns on one or several hosts, streaming the rows.
+
+        Each GETBULK fetches all the unfinished columns at once, and
+        max-repetitions adapts per host to truncated responses and timeouts
+        (see TableWalk). Rows are yielded as soon as they are complete, in
+        index order per host, without building the tables in memory. The
+        per-host outcome is in LastTableResults once the generator is done.
+
+        Example:
+            columns = {'ifDescr': '1.3.6.1.2.1.2.2.1.2', 'ifInOctets': '1.3.6.1.2.1.2.2.1.10'}
+            for row in XIQSE.SNMP.walkTable(fabricIps, columns):
+                print(row.host, row.indexStr, row['ifDescr'], row['ifInOctets'])
+
+        Args:
+            hosts (str or list): The hosts or SNMPTarget objects.
+            columns (dict or list): The column OIDs by name, or a list of column OIDs (named by OID).
+            maxRepetitions (int, optional): The initial GETBULK max-repetitions. Defaults to 10.
+            maxInFlight (int, optional): Maximum number of outstanding requests. Defaults to 256.
+            deadline (float, optional): Overall deadline in seconds; requests still pending then fail. Defaults to None.
+            **options: SNMPTarget options overriding the defaults, e.g. the per-request timeout and retries.
+
+        Yields:
+            SNMPRow: The rows, with the 'host', 'index' and 'values' attributes.
+        """
+        if isinstance(columns, dict):
+            columns = sorted(((BER.parseOid(oid), name) for name, oid in columns.items()))
+        else:
+            columns = [(BER.parseOid(oid), oid) for oid in columns]
+        columnOids = [x[0] for x in columns]
+        positions = dict((name, pos) for pos, (oid, name) in enumerate(columns))
+        engine = SNMPEngine(maxInFlight)
+        ready = deque()
+        walks = []
+        for target in self.targets(hosts, options):
+            walk = TableWalk(engine, target, columnOids, positions, ready.append, maxRepetitions)
+            walk.submit()
+            walks.append(walk)
+
+        endTime = time.time() + deadline if deadline else None
+        try:
+            with self.ctx.Metrics.span('snmp.walkTable'):
+                while engine.step(endTime):
+                    while ready:
+                        yield ready.popleft()
+                while ready:
+                    yield ready.popleft()
+        finally:
+            engine.close()
+            self.LastStats = engine.stats
+            self.LastTableResults = dict((walk.target.host, {
+                'success'        : walk.done and walk.error is None,
+                'error'          : walk.error if walk.done else 'walk interrupted',
+                'rows'           : walk.rowCount,
+                'requests'       : walk.requests,
+                'maxRepetitions' : walk.maxRepetitions,
+            }) for walk in walks)
+            self.ctx.debug("SNMP walkTable: %d hosts, stats %s", len(walks), engine.stats)
+
     def test(self):
         """
         Test the SNMP module.
@@ -0,0 +1,481 @@
+"""
+BER codec for SNMP messages (the subset of ASN.1 used by SNMP v1/v2c/v3).
+
+Messages are built and parsed as bytearrays, which index to integers on
+Python 2, Jython and Python 3 alike. OIDs are tuples of integers inside
+the codec; parseOid() and formatOid() convert from and to dotted strings.
+"""
+
+try:
+    IntegerTypes = (int, long)
+except NameError:
+    IntegerTypes = (int,)
+
+# Universal types
+TagInteger = 0x02
+TagOctetString = 0x04
+TagNull = 0x05
+TagOid = 0x06
+TagSequence = 0x30
+
+# SNMP application types
+TagIpAddress = 0x40
+TagCounter32 = 0x41
+TagGauge32 = 0x42
+TagTimeTicks = 0x43
+TagOpaque = 0x44
+TagCounter64 = 0x46
+
+# Varbind exceptions
+TagNoSuchObject = 0x80
+TagNoSuchInstance = 0x81
+TagEndOfMibView = 0x82
+
+# PDU types
+PduGet = 0xA0
+PduGetNext = 0xA1
+PduResponse = 0xA2
+PduSet = 0xA3
+PduGetBulk = 0xA5
+PduTrap = 0xA7
+PduReport = 0xA8
+
+ErrorStatusNames = (
+    'noError', 'tooBig', 'noSuchName', 'badValue', 'readOnly', 'genErr', 'noAccess', 'wrongType',
+    'wrongLength', 'wrongEncoding', 'wrongValue', 'noCreation', 'inconsistentValue', 'resourceUnavailable',
+    'commitFailed', 'undoFailed', 'authorizationError', 'notWritable', 'inconsistentName',
+)
+ErrorTooBig = 1
+
+UnsignedTags = (TagCounter32, TagGauge32, TagTimeTicks, TagCounter64)
+
+
+class BERError(ValueError):
+    """
+    Raised when a message cannot be decoded.
+    """
+
+
+class VarBindException(object):
+    """
+    Varbind exception value (noSuchObject, noSuchInstance, endOfMibView).
+    """
+
+    __slots__ = ('name', 'tag')
+
+    def __init__(self, name, tag):
+        self.name = name
+        self.tag = tag
+
+    def __repr__(self):
+        return self.name
+
+
+NoSuchObject = VarBindException('noSuchObject', TagNoSuchObject)
+NoSuchInstance = VarBindException('noSuchInstance', TagNoSuchInstance)
+EndOfMibView = VarBindException('endOfMibView', TagEndOfMibView)
+VarBindExceptions = dict((x.tag, x) for x in (NoSuchObject, NoSuchInstance, EndOfMibView))
+
+
+def toBytes(value):
+    """
+    Convert a string to a bytearray, encoding unicode text as UTF-8.
+
+    Args:
+        value (str, bytes or bytearray): The value.
+
+    Returns:
+        bytearray: The bytes.
+    """
+    if isinstance(value, bytearray):
+        return value
+    if not isinstance(value, bytes):
+        value = value.encode('utf-8')
+    return bytearray(value)
+
+
+def parseOid(oid):
+    """
+    Convert an OID to a tuple of integers.
+
+    Args:
+        oid (str or tuple): The OID, e.g. '1.3.6.1.2.1.1.5.0' or '.1.3.6.1.2.1.1.5.0'.
+
+    Returns:
+        tuple: The OID sub-identifiers.
+    """
+    if isinstance(oid, tuple):
+        return oid
+    if isinstance(oid, list):
+        return tuple(oid)
+    try:
+        return tuple(int(x) for x in oid.strip('.').split('.'))
+    except ValueError:
+        raise BERError("invalid OID '{}'".format(oid))
+
+
+def formatOid(oid):
+    """
+    Convert an OID to a dotted string.
+
+    Args:
+        oid (tuple): The OID sub-identifiers.
+
+    Returns:
+        str: The dotted OID.
+    """
+    return '.'.join(map(str, oid))
+
+
+def encodeLength(length):
+    """
+    Encode a BER length.
+
+    Args:
+        length (int): The length.
+
+    Returns:
+        bytearray: The length octets.
+    """
+    if length < 0x80:
+        return bytearray((length,))
+    out = bytearray()
+    while length:
+        out.insert(0, length & 0xff)
+        length >>= 8
+    return bytearray((0x80 | len(out),)) + out
+
+
+def encodeTlv(tag, payload):
+    """
+    Encode a tag-length-value element.
+
+    Args:
+        tag (int): The tag.
+        payload (bytearray): The encoded value.
+
+    Returns:
+        bytearray: The element.
+    """
+    return bytearray((tag,)) + encodeLength(len(payload)) + payload
+
+
+def encodeInteger(value, tag=TagInteger):
+    """
+    Encode an integer in minimal two's complement form.
+
+    Args:
+        value (int): The value.
+        tag (int, optional): The tag, e.g. TagCounter32. Defaults to TagInteger.
+
+    Returns:
+        bytearray: The element.
+    """
+    out = bytearray()
+    while True:
+        out.insert(0, value & 0xff)
+        value >>= 8
+        if (value == 0 and not out[0] & 0x80) or (value == -1 and out[0] & 0x80):
+            break
+    return encodeTlv(tag, out)
+
+
+def encodeOid(oid):
+    """
+    Encode an OBJECT IDENTIFIER.
+
+    Args:
+        oid (str or tuple): The OID.
+
+    Returns:
+        bytearray: The element.
+    """
+    oid = parseOid(oid)
+    if len(oid) < 2:
+        raise BERError("OID {} is too short".format(oid))
+    out = bytearray()
+    for subId in (oid[0] * 40 + oid[1],) + oid[2:]:
+        chunk = bytearray((subId & 0x7f,))
+        subId >>= 7
+        while subId:
+            chunk.insert(0, 0x80 | (subId & 0x7f))
+            subId >>= 7
+        out += chunk
+    return encodeTlv(TagOid, out)
+
+
+def encodeValue(value, tag=None):
+    """
+    Encode a varbind value.
+
+    Args:
+        value: The value: None, an integer, a string, an OID tuple or a VarBindException.
+        tag (int, optional): The type tag. Defaults to None (inferred from the value type).
+
+    Returns:
+        bytearray: The element.
+    """
+    if isinstance(value, VarBindException):
+        return encodeTlv(value.tag, bytearray())
+    if tag is None:
+        if value is None:
+            tag = TagNull
+        elif isinstance(value, IntegerTypes):
+            tag = TagInteger
+        else:
+            tag = TagOid if isinstance(value, tuple) else TagOctetString
+    if tag == TagNull:
+        return encodeTlv(TagNull, bytearray())
+    if tag == TagOid:
+        return encodeOid(value)
+    if tag == TagIpAddress:
+        return encodeTlv(TagIpAddress, bytearray(int(x) for x in value.split('.')))
+    if tag in (TagInteger,) + UnsignedTags:
+        return encodeInteger(value, tag)
+    return encodeTlv(tag, toBytes(value))
+
+
+def encodeVarbinds(varbinds):
+    """
+    Encode a varbind list.
+
+    Args:
+        varbinds (list): The (oid, value) or (oid, value, tag) tuples.
+
+    Returns:
+        bytearray: The SEQUENCE element.
+    """
+    out = bytearray()
+    for varbind in varbinds:
+        out += encodeTlv(TagSequence, encodeOid(varbind[0]) + encodeValue(varbind[1], varbind[2] if len(varbind) > 2 else None))
+    return encodeTlv(TagSequence, out)
+
+
+def encodePdu(pduType, requestId, varbinds, errorStatus=0, errorIndex=0):
+    """
+    Encode a PDU. For GETBULK, errorStatus and errorIndex carry non-repeaters and max-repetitions.
+
+    Args:
+        pduType (int): The PDU type, e.g. PduGet.
+        requestId (int): The request ID.
+        varbinds (list): The (oid, value) or (oid, value, tag) tuples.
+        errorStatus (int, optional): The error status. Defaults to 0.
+        errorIndex (int, optional): The error index. Defaults to 0.
+
+    Returns:
+        bytearray: The PDU element.
+    """
+    return encodeTlv(pduType, encodeInteger(requestId) + encodeInteger(errorStatus) + encodeInteger(errorIndex) + encodeVarbinds(varbinds))
+
+
+def encodeMessage(version, community, pdu):
+    """
+    Encode a community-based (v1/v2c) message.
+
+    Args:
+        version (int): The message version: 0 for v1, 1 for v2c.
+        community (str): The community.
+        pdu (bytearray): The encoded PDU.
+
+    Returns:
+        bytes: The message.
+    """
+    return bytes(encodeTlv(TagSequence, encodeInteger(version) + encodeTlv(TagOctetString, toBytes(community)) + pdu))
+
+
+def decodeTlv(data, pos, end=None):
+    """
+    Decode the header of a tag-length-value element.
+
+    Args:
+        data (bytearray): The data.
+        pos (int): The element position.
+        end (int, optional): The end of the enclosing element. Defaults to the end of the data.
+
+    Returns:
+        tuple: The tag, the value start and the value end positions.
+    """
+    if end is None:
+        end = len(data)
+    if pos + 2 > end:
+        raise BERError("truncated element at {}".format(pos))
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        count = length & 0x7f
+        if not count or count > 4 or pos + count > end:
+            raise BERError("invalid length at {}".format(pos))
+        length = 0
+        for i in range(pos, pos + count):
+            length = (length << 8) | data[i]
+        pos += count
+    if pos + length > end:
+        raise BERError("truncated element at {}".format(pos))
+    return tag, pos, pos + length
+
+
+def decodeInteger(data, start, end, signed=True):
+    """
+    Decode the value of an integer element.
+
+    Args:
+        data (bytearray): The data.
+        start (int): The value start position.
+        end (int): The value end position.
+        signed (bool, optional): Whether the integer is signed. Defaults to True.
+
+    Returns:
+        int: The value.
+    """
+    value = 0
+    for i in range(start, end):
+        value = (value << 8) | data[i]
+    if signed and end > start and data[start] & 0x80:
+        value -= 1 << (8 * (end - start))
+    return value
+
+
+def decodeOid(data, start, end):
+    """
+    Decode the value of an OBJECT IDENTIFIER element.
+
+    Args:
+        data (bytearray): The data.
+        start (int): The value start position.
+        end (int): The value end position.
+
+    Returns:
+        tuple: The OID sub-identifiers.
+    """
+    subIds = []
+    value = 0
+    for i in range(start, end):
+        value = (value << 7) | (data[i] & 0x7f)
+        if not data[i] & 0x80:
+            subIds.append(value)
+            value = 0
+    if not subIds:
+        return ()
+    first = subIds[0]
+    head = (first // 40, first % 40) if first < 80 else (2, first - 80)
+    return head + tuple(subIds[1:])
+
+
+def decodeValue(tag, data, start, end):
+    """
+    Decode a varbind value.
+
+    Args:
+        tag (int): The tag.
+        data (bytearray): The data.
+        start (int): The value start position.
+        end (int): The value end position.
+
+    Returns:
+        The value: an integer, bytes, a dotted string for OIDs and IP addresses,
+        None for NULL, or a VarBindException.
+    """
+    if tag == TagInteger:
+        return decodeInteger(data, start, end)
+    if tag in UnsignedTags:
+        return decodeInteger(data, start, end, signed=False)
+    if tag == TagOctetString or tag == TagOpaque:
+        return bytes(data[start:end])
+    if tag == TagNull:
+        return None
+    if tag == TagOid:
+        return formatOid(decodeOid(data, start, end))
+    if tag == TagIpAddress:
+        return '.'.join(str(x) for x in data[start:end])
+    if tag in VarBindExceptions:
+        return VarBindExceptions[tag]
+    return bytes(data[start:end])
+
+
+def decodeVarbinds(data, start, end):
+    """
+    Decode the content of a varbind list.
+
+    Args:
+        data (bytearray): The data.
+        start (int): The list value start position.
+        end (int): The list value end position.
+
+    Returns:
+        list: The (oid, value) tuples, with OIDs as tuples of integers.
+    """
+    varbinds = []
+    pos = start
+    while pos < end:
+        tag, vbStart, vbEnd = decodeTlv(data, pos, end)
+        oidTag, oidStart, oidEnd = decodeTlv(data, vbStart, vbEnd)
+        valueTag, valueStart, valueEnd = decodeTlv(data, oidEnd, vbEnd)
+        if tag != TagSequence or oidTag != TagOid:
+            raise BERError("invalid varbind at {}".format(pos))
+        varbinds.append((decodeOid(data, oidStart, oidEnd), decodeValue(valueTag, data, valueStart, valueEnd)))
+        pos = vbEnd
+    return varbinds
+
+
+def decodePdu(data, pos, end=None):
+    """
+    Decode a PDU.
+
+    Args:
+        data (bytearray): The data.
+        pos (int): The PDU position.
+        end (int, optional): The end of the enclosing element. Defaults to the end of the data.
+
+    Returns:
+        tuple: The PDU type, request ID, error status, error index and varbinds.
+    """
+    pduType, start, end = decodeTlv(data, pos, end)
+    fields = []
+    for _ in range(3):
+        tag, valueStart, start = decodeTlv(data, start, end)
+        if tag != TagInteger:
+            raise BERError("invalid PDU header at {}".format(valueStart))
+        fields.append(decodeInteger(data, valueStart, start))
+    tag, listStart, listEnd = decodeTlv(data, start, end)
+    if tag != TagSequence:
+        raise BERError("invalid varbind list at {}".format(start))
+    return (pduType, fields[0], fields[1], fields[2], decodeVarbinds(data, listStart, listEnd))
+
+
+def decodeMessage(data):
+    """
+    Decode the header of a message.
+
+    Args:
+        data (bytes or bytearray): The message.
+
+    Returns:
+        tuple: The version, the message data as a bytearray and the position and end of the
+               field after the version (the community for v1/v2c, the global data for v3).
+    """
+    data = bytearray(data)
+    tag, start, end = decodeTlv(data, 0)
+    if tag != TagSequence:
+        raise BERError("message is not a SEQUENCE")
+    tag, valueStart, valueEnd = decodeTlv(data, start, end)
+    if tag != TagInteger:
+        raise BERError("invalid message version")
+    return decodeInteger(data, valueStart, valueEnd), data, valueEnd, end
+
+
+def decodeCommunityMessage(data):
+    """
+    Decode a community-based (v1/v2c) message.
+
+    Args:
+        data (bytes or bytearray): The message.
+
+    Returns:
+        tuple: The version, the community (bytes) and the decoded PDU (see decodePdu).
+    """
+    version, data, pos, end = decodeMessage(data)
+    tag, start, pos = decodeTlv(data, pos, end)
+    if tag != TagOctetString:
+        raise BERError("invalid community")
+    return version, bytes(data[start:pos]), decodePdu(data, pos, end)
@@ -1,6 +1,42 @@
 CLI_Dict = {
     'Fabric Engine': {
         'disable_more_paging'   : 'terminal more disable',
-        'enable_context'        : 'enable'
-    }
-}
\ No newline at end of file
+        'enable_context'        : 'enable',
+        'config_context'        : 'configure terminal',
+        'show_running_config'   : 'show running-config',
+    },
+    'ERS Series': {
+        'disable_more_paging'   : 'terminal length 0',
+        'enable_context'        : 'enable',
+        'config_context'        : 'configure terminal',
+        'show_running_config'   : 'show running-config',
+    },
+    'Switch Engine': {
+        'disable_more_paging'   : 'disable clipaging',
+        'show_running_config'   : 'show configuration',
+    },
+}
+CLI_Dict['Summit Series'] = CLI_Dict['Switch Engine']
+
+TFTP_Dict = {
+    'Fabric Engine': {
+        'check'     : 'bool://show boot config flags||^flags tftpd true',
+        'activate'  : 'boot config flags tftpd',
+        'deactivate': 'no boot config flags tftpd',
+        'execute'   : 'copy "{0}:{1}" /intflash/.script.src -y; source .script.src debug',
+        'header'    : ['enable', 'config term'],
+    },
+    'Switch Engine': {
+        'check'     : 'bool://show process tftpd||Ready',
+        'activate'  : 'start process tftpd',
+        'deactivate': 'terminate process tftpd graceful',
+        'execute'   : 'tftp get {0} "{1}" .script.xsf; run script .script.xsf',
+        'header'    : [],
+    },
+    'ERS Series': {
+        'check'     : True,
+        'execute'   : 'configure network address {0} filename "{1}"',
+        'header'    : [],
+    },
+}
+TFTP_Dict['Summit Series'] = TFTP_Dict['Switch Engine']
@@ -0,0 +1,207 @@
+import csv
+import errno
+import hashlib
+import marshal
+import os
+import re
+import tempfile
+import time
+
+
+class CSVCache(object):
+    """
+    Persistent cache of parsed CSV files, shared across workflow executions.
+
+    The parsed header and rows are saved with marshal in a cache directory,
+    keyed by the CSV path and delimiter and validated by the CSV mtime and
+    size. Concurrent script runs build an entry once: the builder holds an
+    O_EXCL lock file, the others wait for it and load the result. Entries
+    are written to a temp file and renamed, so readers never see a partial
+    entry. The oldest entries are evicted when the cache exceeds MaxSize.
+    """
+
+    Version = 1
+    Directory = os.path.join(tempfile.gettempdir(), 'xiqse_csv_cache')
+    MaxSize = 256 * 1048576
+    LockTimeout = 30
+    LockStale = 120
+
+    def __init__(self, csvFilePath, delimiter=',', directory=None):
+        """
+        Initialize the cache entry of a CSV file.
+
+        Args:
+            csvFilePath (str): The path to the CSV file.
+            delimiter (str, optional): The CSV delimiter. Defaults to ','.
+            directory (str, optional): The cache directory. Defaults to CSVCache.Directory.
+        """
+        self.path = os.path.abspath(csvFilePath)
+        self.delimiter = delimiter
+        self.directory = directory or self.Directory
+        digest = hashlib.sha1('{}\0{}'.format(self.path, delimiter).encode('utf-8')).hexdigest()
+        self.cachePath = os.path.join(self.directory, digest + '.cache')
+        self.lockPath = os.path.join(self.directory, digest + '.lock')
+
+    def evict(self):
+        """
+        Remove the least recently used entries while the cache exceeds MaxSize.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.cache'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        entries.sort()
+        for mtime, size, name in entries:
+            if total <= self.MaxSize:
+                break
+            if os.path.join(self.directory, name) == self.cachePath:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            except OSError:
+                pass
+
+    def get(self):
+        """
+        Get the parsed CSV file, from the cache when it is up to date.
+
+        Returns:
+            tuple: The header fields and the rows, each a list with the index column first.
+        """
+        stat = os.stat(self.path)
+        data = self.load(stat)
+        if data is not None:
+            return data
+        locked = self.lock()
+        try:
+            if locked:
+                data = self.load(stat)
+            if data is None:
+                data = self.parse()
+                if locked:
+                    self.save(data, stat)
+                    self.evict()
+        finally:
+            if locked:
+                self.unlock()
+        return data
+
+    def load(self, stat):
+        """
+        Load the cache entry if it matches the CSV file.
+
+        Args:
+            stat (os.stat_result): The CSV file status.
+
+        Returns:
+            tuple: The header and rows, or None if there is no valid entry.
+        """
+        try:
+            with open(self.cachePath, 'rb') as f:
+                data = marshal.load(f)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(data, dict) or data.get('version') != self.Version or data.get('path') != self.path:
+            return None
+        if data.get('mtime') != stat.st_mtime or data.get('size') != stat.st_size:
+            return None
+        try:
+            os.utime(self.cachePath, None)
+        except OSError:
+            pass
+        return data['header'], data['rows']
+
+    def lock(self):
+        """
+        Take the lock file of the entry, waiting up to LockTimeout seconds.
+
+        Returns:
+            bool: True if the lock was taken, False otherwise.
+        """
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                return False
+        deadline = time.time() + self.LockTimeout
+        while True:
+            try:
+                os.close(os.open(self.lockPath, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    return False
+            try:
+                if time.time() - os.stat(self.lockPath).st_mtime > self.LockStale:
+                    os.remove(self.lockPath)
+                    continue
+            except OSError:
+                continue
+            if time.time() > deadline:
+                return False
+            time.sleep(0.05)
+
+    def parse(self):
+        """
+        Parse the CSV file.
+
+        Returns:
+            tuple: The header and rows. Values other than the index column are stripped.
+        """
+        header = None
+        rows = []
+        with open(self.path, mode='r') as csv_file:
+            for row in csv.reader(csv_file, delimiter=self.delimiter):
+                if not row:
+                    continue
+                if header is None:
+                    header = [re.sub(r'^\\ufeff', '', row[0])] + [x.strip() for x in row[1:]]
+                else:
+                    rows.append([row[0]] + [x.strip() for x in row[1:]])
+        return header, rows
+
+    def save(self, data, stat):
+        """
+        Save a cache entry.
+
+        Args:
+            data (tuple): The header and rows.
+            stat (os.stat_result): The CSV file status.
+        """
+        entry = {
+            'version'   : self.Version,
+            'path'      : self.path,
+            'mtime'     : stat.st_mtime,
+            'size'      : stat.st_size,
+            'header'    : data[0],
+            'rows'      : data[1],
+        }
+        tmpPath = '{}.{}.tmp'.format(self.cachePath, os.getpid())
+        try:
+            with open(tmpPath, 'wb') as f:
+                marshal.dump(entry, f)
+            try:
+                os.rename(tmpPath, self.cachePath)
+            except OSError:
+                os.remove(self.cachePath)
+                os.rename(tmpPath, self.cachePath)
+        except (IOError, OSError, ValueError):
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+    def unlock(self):
+        """
+        Release the lock file of the entry.
+        """
+        try:
+            os.remove(self.lockPath)
+        except OSError:
+            pass
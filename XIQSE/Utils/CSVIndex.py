@@ -0,0 +1,189 @@
+import csv
+import hashlib
+import marshal
+import os
+import tempfile
+import threading
+
+
+class CSVIndex(object):
+    """
+    Sidecar index of a CSV file: byte offset of the row of each key.
+
+    The index is saved next to the CSV file (or in the temp directory when
+    the CSV directory is not writable) with the CSV mtime and size, and is
+    rebuilt when the CSV changes. A lookup seeks to the row and parses only
+    that row.
+    """
+
+    Version = 1
+    Indexes = {}
+    Lock = threading.Lock()
+
+    def __init__(self, csvFilePath, delimiter=','):
+        """
+        Initialize the index. Use CSVIndex.open() to get a loaded index.
+
+        Args:
+            csvFilePath (str): The path to the CSV file.
+            delimiter (str, optional): The CSV delimiter. Defaults to ','.
+        """
+        self.path = csvFilePath
+        self.delimiter = delimiter
+        self.mtime = None
+        self.size = None
+        self.header = None
+        self.offsets = {}
+        self.indexPath = csvFilePath + '.idx'
+        if not os.access(os.path.dirname(os.path.abspath(csvFilePath)), os.W_OK):
+            digest = hashlib.sha1(os.path.abspath(csvFilePath).encode('utf-8')).hexdigest()
+            self.indexPath = os.path.join(tempfile.gettempdir(), 'xiqse_csv_{}.idx'.format(digest))
+
+    @classmethod
+    def open(cls, csvFilePath, delimiter=','):
+        """
+        Get the up to date index of a CSV file, loading or building it if needed.
+
+        Args:
+            csvFilePath (str): The path to the CSV file.
+            delimiter (str, optional): The CSV delimiter. Defaults to ','.
+
+        Returns:
+            CSVIndex: The index.
+        """
+        stat = os.stat(csvFilePath)
+        with cls.Lock:
+            index = cls.Indexes.get((csvFilePath, delimiter))
+            if index is None:
+                index = cls.Indexes[(csvFilePath, delimiter)] = cls(csvFilePath, delimiter)
+            if index.mtime != stat.st_mtime or index.size != stat.st_size:
+                if not index.load(stat):
+                    index.build()
+        return index
+
+    def build(self):
+        """
+        Scan the CSV file and save the index.
+        """
+        stat = os.stat(self.path)
+        self.header = None
+        self.offsets = {}
+        with open(self.path, 'rb') as f:
+            offset = 0
+            while True:
+                rowOffset = offset
+                record = self.readRecord(f)
+                if record is None:
+                    break
+                offset += len(record)
+                row = self.parseRecord(record)
+                if not row:
+                    continue
+                if self.header is None:
+                    self.header = row
+                else:
+                    self.offsets[row[0]] = rowOffset
+        self.mtime = stat.st_mtime
+        self.size = stat.st_size
+        self.save()
+
+    def get(self, key):
+        """
+        Get the row of a key.
+
+        Args:
+            key (str): The first column value.
+
+        Returns:
+            list: The row fields, or None if the key is not in the CSV file.
+        """
+        offset = self.offsets.get(key)
+        if offset is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return self.parseRecord(self.readRecord(f))
+
+    def load(self, stat):
+        """
+        Load the saved index if it matches the CSV file.
+
+        Args:
+            stat (os.stat_result): The CSV file status.
+
+        Returns:
+            bool: True if the saved index was loaded, False otherwise.
+        """
+        try:
+            with open(self.indexPath, 'rb') as f:
+                data = marshal.load(f)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            return False
+        if not isinstance(data, dict) or data.get('version') != self.Version or data.get('delimiter') != self.delimiter:
+            return False
+        if data.get('mtime') != stat.st_mtime or data.get('size') != stat.st_size:
+            return False
+        self.header = data['header']
+        self.offsets = data['offsets']
+        self.mtime = stat.st_mtime
+        self.size = stat.st_size
+        return True
+
+    def parseRecord(self, record):
+        """
+        Parse a raw CSV record.
+
+        Args:
+            record (str): The raw record, possibly spanning several lines.
+
+        Returns:
+            list: The record fields.
+        """
+        if not isinstance(record, str):
+            record = record.decode('utf-8')
+        return next(csv.reader(record.splitlines(True), delimiter=self.delimiter), [])
+
+    def readRecord(self, f):
+        """
+        Read a raw CSV record, following quoted fields over several lines.
+
+        Args:
+            f (file): The CSV file, opened in binary mode.
+
+        Returns:
+            str: The raw record, or None at the end of the file.
+        """
+        record = f.readline()
+        if not record:
+            return None
+        while record.count(b'"') % 2:
+            line = f.readline()
+            if not line:
+                break
+            record += line
+        return record
+
+    def save(self):
+        """
+        Save the index to its sidecar file.
+        """
+        data = {
+            'version'   : self.Version,
+            'delimiter' : self.delimiter,
+            'mtime'     : self.mtime,
+            'size'      : self.size,
+            'header'    : self.header,
+            'offsets'   : self.offsets,
+        }
+        tmpPath = '{}.{}.tmp'.format(self.indexPath, os.getpid())
+        try:
+            with open(tmpPath, 'wb') as f:
+                marshal.dump(data, f)
+            try:
+                os.rename(tmpPath, self.indexPath)
+            except OSError:
+                os.remove(self.indexPath)
+                os.rename(tmpPath, self.indexPath)
+        except (IOError, OSError):
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
@@ -0,0 +1,100 @@
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+
+class CSVSchema(object):
+    """
+    Column schema shared by the rows of a compact CSV table.
+    """
+
+    __slots__ = ('columns', 'positions', 'pool')
+
+    def __init__(self, columns):
+        """
+        Initialize the schema.
+
+        Args:
+            columns (list): The column names, the index column first.
+        """
+        self.columns = tuple(columns)
+        self.positions = dict((name, pos) for pos, name in enumerate(self.columns))
+        if self.columns:
+            self.positions[self.columns[0]] = 0
+        self.pool = {}
+
+    def row(self, key, values):
+        """
+        Build a compact row, interning its values.
+
+        Args:
+            key (str): The index column value.
+            values (list): The other column values, already stripped.
+
+        Returns:
+            CSVRow: The row.
+        """
+        pool = self.pool
+        return CSVRow(self, (key,) + tuple([pool.setdefault(x, x) for x in values[:len(self.columns) - 1]]))
+
+
+class CSVRow(object):
+    """
+    Read-only dictionary view of a compact CSV row.
+
+    The row only holds its schema and a tuple of values, instead of a
+    dictionary repeating every column name.
+    """
+
+    __slots__ = ('schema', 'data')
+
+    def __init__(self, schema, data):
+        self.schema = schema
+        self.data = data
+
+    def __contains__(self, name):
+        pos = self.schema.positions.get(name)
+        return pos is not None and pos < len(self.data)
+
+    def __eq__(self, other):
+        if isinstance(other, (CSVRow, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __getitem__(self, name):
+        pos = self.schema.positions.get(name)
+        if pos is None or pos >= len(self.data):
+            raise KeyError(name)
+        return self.data[pos]
+
+    def __iter__(self):
+        return iter(self.schema.columns[:len(self.data)])
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return "CSVRow({!r})".format(dict(self.items()))
+
+    def get(self, name, default=None):
+        pos = self.schema.positions.get(name)
+        if pos is None or pos >= len(self.data):
+            return default
+        return self.data[pos]
+
+    def items(self):
+        return list(zip(self.schema.columns, self.data))
+
+    def keys(self):
+        return list(self.schema.columns[:len(self.data)])
+
+    def values(self):
+        return list(self.data)
+
+
+Mapping.register(CSVRow)
@@ -0,0 +1,224 @@
+import bisect
+import csv
+import re
+
+from .CSVRow import CSVSchema
+
+
+def ipToInt(ipStr):
+    """
+    Convert an IPv4 address, with or without mask, to an integer.
+
+    Args:
+        ipStr (str): The IPv4 address, e.g. '10.0.0.1' or '10.0.0.1/24'.
+
+    Returns:
+        int: The address as an integer, or None if it is not an IPv4 address.
+    """
+    parts = ipStr.split('/', 1)[0].strip().split('.')
+    if len(parts) != 4:
+        return None
+    value = 0
+    for part in parts:
+        if not part.isdigit() or int(part) > 255:
+            return None
+        value = (value << 8) | int(part)
+    return value
+
+
+class CSVTable(object):
+    """
+    CSV table with secondary indexes.
+
+    Rows are dictionaries, as in CSV.read(), or CSVRow views. Indexes are built once, on
+    first use or with addIndex(), and are reused by later queries:
+    - hash indexes for exact queries on one column or a composite key
+    - sorted indexes for prefix queries (bisect)
+    - sorted IPv4 indexes for address range and subnet queries (bisect)
+    """
+
+    def __init__(self, columns, rows, path=None):
+        """
+        Initialize the table.
+
+        Args:
+            columns (list): The column names; the first one is the index column.
+            rows (list): The row dictionaries or CSVRow views.
+            path (str, optional): The CSV file path. Defaults to None.
+        """
+        self.columns = columns
+        self.indexKey = columns[0] if columns else None
+        self.rows = rows
+        self.path = path
+        self.hashIndexes = {}
+        self.sortedIndexes = {}
+        self.ipIndexes = {}
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def load(cls, csvFilePath, delimiter=',', compact=False):
+        """
+        Load a CSV file.
+
+        Args:
+            csvFilePath (str): The path to the CSV file.
+            delimiter (str, optional): The CSV delimiter. Defaults to ','.
+            compact (bool, optional): Whether to store rows as compact CSVRow objects. Defaults to False.
+
+        Returns:
+            CSVTable: The table.
+        """
+        columns = None
+        rows = []
+        with open(csvFilePath, mode='r') as csv_file:
+            for row in csv.reader(csv_file, delimiter=delimiter):
+                if not row:
+                    continue
+                if columns is None:
+                    columns = [re.sub(r'^\\ufeff', '', row[0])] + [x.strip() for x in row[1:]]
+                    schema = CSVSchema(columns) if compact else None
+                    continue
+                if schema:
+                    rows.append(schema.row(row[0], [x.strip() for x in row[1:]]))
+                else:
+                    rowData = dict(zip(columns[1:], [x.strip() for x in row[1:]]))
+                    rowData[columns[0]] = row[0]
+                    rows.append(rowData)
+        return cls(columns or [], rows, csvFilePath)
+
+    def addIndex(self, *columns):
+        """
+        Build the hash index of a column or of a composite key.
+
+        Args:
+            *columns (str): The column names.
+
+        Returns:
+            dict: The index, mapping each value (a tuple for composite keys) to its row positions.
+        """
+        key = columns if len(columns) > 1 else columns[0]
+        index = self.hashIndexes.get(key)
+        if index is None:
+            index = {}
+            if len(columns) > 1:
+                for pos, row in enumerate(self.rows):
+                    index.setdefault(tuple(row.get(x) for x in columns), []).append(pos)
+            else:
+                for pos, row in enumerate(self.rows):
+                    index.setdefault(row.get(key), []).append(pos)
+            self.hashIndexes[key] = index
+        return index
+
+    def find(self, columns, value):
+        """
+        Get the rows whose column, or composite key, equals a value.
+
+        Args:
+            columns (str or tuple): The column name, or a tuple of column names.
+            value (str or tuple): The value, or a tuple of values for a composite key.
+
+        Returns:
+            list: The matching rows.
+        """
+        columns = tuple(columns) if isinstance(columns, (list, tuple)) else (columns,)
+        index = self.addIndex(*columns)
+        return [self.rows[x] for x in index.get(tuple(value) if len(columns) > 1 else value, [])]
+
+    def first(self, columns, value):
+        """
+        Get the first row whose column, or composite key, equals a value.
+
+        Args:
+            columns (str or tuple): The column name, or a tuple of column names.
+            value (str or tuple): The value, or a tuple of values for a composite key.
+
+        Returns:
+            dict: The first matching row, or None.
+        """
+        rows = self.find(columns, value)
+        return rows[0] if rows else None
+
+    def ipRange(self, column, first, last=None):
+        """
+        Get the rows whose IPv4 address column is in a range or a subnet.
+
+        Args:
+            column (str): The column name. Values may carry a mask, e.g. '10.0.0.1/24'.
+            first (str): The first address of the range, or a subnet such as '10.0.0.0/24'.
+            last (str, optional): The last address of the range. Defaults to None (first is a subnet or a single address).
+
+        Returns:
+            list: The matching rows, sorted by address.
+        """
+        index = self.ipIndexes.get(column)
+        if index is None:
+            index = []
+            for pos, row in enumerate(self.rows):
+                value = ipToInt(row.get(column) or '')
+                if value is not None:
+                    index.append((value, pos))
+            index.sort()
+            self.ipIndexes[column] = index
+        start = ipToInt(first)
+        if start is None:
+            raise ValueError("ipRange: invalid IPv4 address '{}'".format(first))
+        if last is not None:
+            end = ipToInt(last)
+            if end is None:
+                raise ValueError("ipRange: invalid IPv4 address '{}'".format(last))
+        elif '/' in first:
+            hostBits = 32 - int(first.split('/', 1)[1])
+            start = (start >> hostBits) << hostBits
+            end = start | ((1 << hostBits) - 1)
+        else:
+            end = start
+        lo = bisect.bisect_left(index, (start, -1))
+        hi = bisect.bisect_right(index, (end, len(self.rows)))
+        return [self.rows[pos] for value, pos in index[lo:hi]]
+
+    def prefix(self, column, prefix):
+        """
+        Get the rows whose column starts with a prefix.
+
+        Args:
+            column (str): The column name.
+            prefix (str): The prefix.
+
+        Returns:
+            list: The matching rows, sorted by column value.
+        """
+        index = self.sortedIndexes.get(column)
+        if index is None:
+            index = sorted((row.get(column) or '', pos) for pos, row in enumerate(self.rows))
+            self.sortedIndexes[column] = index
+        lo = bisect.bisect_left(index, (prefix, -1))
+        rows = []
+        while lo < len(index) and index[lo][0].startswith(prefix):
+            rows.append(self.rows[index[lo][1]])
+            lo += 1
+        return rows
+
+    def varDict(self, lookup=None):
+        """
+        Get the table in the dictionary format of CSV.read(), for use with CSV.varLookup().
+
+        Args:
+            lookup (str, optional): A specific key to filter the results. Defaults to None.
+
+        Returns:
+            dict: A dictionary representing the CSV data.
+        """
+        if lookup:
+            csvVarDict = dict((lookup, x) for x in self.find(self.indexKey, lookup)[-1:])
+            if csvVarDict:
+                csvVarDict['__LOOKUP__'] = lookup
+        else:
+            csvVarDict = dict((x[self.indexKey], x) for x in self.rows)
+        csvVarDict['__INDEX__'] = self.indexKey
+        csvVarDict['__PATH__'] = self.path
+        return csvVarDict
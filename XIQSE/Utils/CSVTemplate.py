@@ -0,0 +1,111 @@
+import re
+
+RegexTemplateVar = re.compile(r'\$<([\w -]+)>|\$\(([\w -]+)\)')
+
+
+class CSVTemplate(object):
+    """
+    Template with $<var> / $(var) CSV variables, parsed once.
+
+    The text is split into literal and variable segments when the template
+    is compiled; rendering a row only fills the variable slots and joins
+    the segments. Compiled templates are cached by text.
+    """
+
+    Cache = {}
+    CacheSize = 256
+
+    __slots__ = ('text', 'parts', 'slots', 'variables')
+
+    def __init__(self, text):
+        """
+        Parse a template.
+
+        Args:
+            text (str): The template text.
+        """
+        self.text = text
+        self.parts = []
+        self.slots = []
+        variables = []
+        pos = 0
+        for match in RegexTemplateVar.finditer(text):
+            name = match.group(1) or match.group(2)
+            self.parts.append(text[pos:match.start()])
+            self.slots.append((len(self.parts), name))
+            self.parts.append(None)
+            if name not in variables:
+                variables.append(name)
+            pos = match.end()
+        self.parts.append(text[pos:])
+        self.variables = tuple(variables)
+
+    @classmethod
+    def compile(cls, text):
+        """
+        Get the compiled template of a text, from the cache when possible.
+
+        Args:
+            text (str): The template text.
+
+        Returns:
+            CSVTemplate: The template.
+        """
+        template = cls.Cache.get(text)
+        if template is None:
+            template = cls(text)
+            if len(cls.Cache) >= cls.CacheSize:
+                cls.Cache.clear()
+            cls.Cache[text] = template
+        return template
+
+    def missing(self, row):
+        """
+        Get the template variables missing from a row.
+
+        Args:
+            row (dict): The row, or None.
+
+        Returns:
+            list: The missing variable names, in order of first use.
+        """
+        if row is None:
+            return list(self.variables)
+        return [x for x in self.variables if x not in row]
+
+    def render(self, row):
+        """
+        Render the template for a row.
+
+        Args:
+            row (dict): The row values by column name.
+
+        Returns:
+            str: The rendered text.
+
+        Raises:
+            KeyError: If a variable is missing from the row.
+        """
+        if not self.slots:
+            return self.text
+        parts = self.parts[:]
+        for index, name in self.slots:
+            parts[index] = row[name]
+        return ''.join(parts)
+
+    def renderAll(self, rows):
+        """
+        Render the template for each row.
+
+        Args:
+            rows (iterable): The rows.
+
+        Returns:
+            generator: The rendered texts, in row order.
+        """
+        parts = self.parts[:]
+        slots = self.slots
+        for row in rows:
+            for index, name in slots:
+                parts[index] = row[name]
+            yield ''.join(parts)
@@ -0,0 +1,150 @@
+import csv
+import gzip
+import json
+import sys
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+PY2 = sys.version_info[0] == 2
+
+
+class CSVWriter(object):
+    """
+    Streaming CSV/TSV writer with a fixed header.
+
+    Rows are taken one at a time from any iterable (a list, an NBI result,
+    a Netbox paging generator) and written in chunks of bufferRows, so the
+    memory used does not depend on the number of rows. Columns are dotted
+    paths into the row dictionaries, e.g. 'site.name'.
+    """
+
+    def __init__(self, path, columns, delimiter=',', compress=None, bufferRows=1000):
+        """
+        Open the output file and write the header.
+
+        Args:
+            path (str): The output file path.
+            columns (list): The columns: dotted paths, used as header, or (header, path) tuples
+                            where path is a dotted path or a function of the row.
+            delimiter (str, optional): The delimiter, '\\t' for TSV. Defaults to ','.
+            compress (bool, optional): Whether to gzip the output. Defaults to None (when path ends with '.gz').
+            bufferRows (int, optional): The number of rows written per chunk. Defaults to 1000.
+        """
+        self.path = path
+        self.columns = [x if isinstance(x, (list, tuple)) else (x, x) for x in columns]
+        self.getters = [self.getter(x[1]) for x in self.columns]
+        self.bufferRows = bufferRows
+        self.buffer = []
+        self.count = 0
+        if compress is None:
+            compress = path.endswith('.gz')
+        if PY2:
+            self.file = gzip.open(path, 'wb') if compress else open(path, 'wb')
+        else:
+            self.file = gzip.open(path, 'wt', newline='') if compress else open(path, 'w', newline='')
+        self.writer = csv.writer(self.file, delimiter=delimiter)
+        self.writer.writerow([self.format(x[0]) for x in self.columns])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Write the buffered rows and close the output file.
+        """
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def flush(self):
+        """
+        Write the buffered rows.
+        """
+        if self.buffer:
+            self.writer.writerows(self.buffer)
+            self.buffer = []
+
+    def format(self, value):
+        """
+        Format a value as a CSV field.
+
+        Args:
+            value: The value. None is written as an empty field, lists are joined with '|'
+                   and dictionaries are written as JSON.
+
+        Returns:
+            str: The field.
+        """
+        if value is None:
+            return ''
+        if isinstance(value, Mapping):
+            value = json.dumps(dict(value), sort_keys=True)
+        elif isinstance(value, (list, tuple)):
+            value = '|'.join(self.format(x) for x in value)
+        elif not isinstance(value, str):
+            value = value if PY2 and isinstance(value, unicode) else str(value)
+        if PY2 and isinstance(value, unicode):
+            value = value.encode('utf-8')
+        return value
+
+    def getter(self, path):
+        """
+        Build the function extracting a column from a row.
+
+        Args:
+            path (str or callable): The dotted path, or a function of the row.
+
+        Returns:
+            callable: The function, returning None when the path is missing.
+        """
+        if callable(path):
+            return path
+        keys = path.split('.')
+
+        def get(row):
+            for key in keys:
+                if isinstance(row, Mapping):
+                    row = row.get(key)
+                elif isinstance(row, (list, tuple)) and key.isdigit() and int(key) < len(row):
+                    row = row[int(key)]
+                else:
+                    return None
+            return row
+        return get
+
+    def writeRow(self, row):
+        """
+        Write a row.
+
+        Args:
+            row (dict or list): The row dictionary, or the list of its fields in column order.
+        """
+        if isinstance(row, (list, tuple)):
+            self.buffer.append([self.format(x) for x in row])
+        else:
+            self.buffer.append([self.format(get(row)) for get in self.getters])
+        self.count += 1
+        if len(self.buffer) >= self.bufferRows:
+            self.flush()
+
+    def writeRows(self, rows):
+        """
+        Write the rows of an iterable, consuming it one row at a time.
+
+        Args:
+            rows (iterable): The rows.
+
+        Returns:
+            int: The number of rows written.
+        """
+        count = self.count
+        for row in rows:
+            self.writeRow(row)
+        return self.count - count
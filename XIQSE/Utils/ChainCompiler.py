@@ -0,0 +1,141 @@
+import re
+
+ChainCache = {}
+ChainCacheSize = 256
+ChainCacheMaxLength = 65536
+CommandCache = {}
+CommandCacheSize = 4096
+
+RegexChainSplit = re.compile(r'([;\n])')
+RegexChainDirective = re.compile(r'^#error +(fail|stop|continue) *$')
+RegexChainSingleChar = re.compile(r'^\w\s*$')
+RegexCommandNewline = re.compile(r':\/\/| *\/\/ *')
+
+
+class ChainCommand(object):
+    """
+    Command of a compiled chain.
+
+    Attributes:
+        raw (str): The command as written in the chain.
+        cmd (str): The command to send, with '//' turned into newlines.
+        store (str): The first line of the command, as kept in the command history.
+    """
+
+    __slots__ = ('raw', 'cmd', 'store')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.cmd, self.store = expandCommand(raw)
+
+
+class ChainDirective(object):
+    """
+    '#error fail|stop|continue' directive of a compiled chain.
+
+    Attributes:
+        raw (str): The directive as written in the chain.
+        returnCliError (bool): Whether CLI errors are returned instead of aborting the script.
+        abortOnError (bool): Whether the chain stops on the first error.
+    """
+
+    __slots__ = ('raw', 'returnCliError', 'abortOnError')
+
+    def __init__(self, raw, errorMode):
+        self.raw = raw
+        self.returnCliError = errorMode != 'fail'
+        self.abortOnError = errorMode == 'stop'
+
+
+def compileChain(chainStr):
+    """
+    Compile a command chain into a tuple of ChainCommand and ChainDirective nodes.
+
+    Commands are separated by ';' or newlines. A line made of a single word
+    character (e.g. a 'y' confirmation) is attached to the previous command
+    with a newline. Compiled chains are cached by chain text.
+
+    Args:
+        chainStr (str): The command chain string.
+
+    Returns:
+        tuple: The chain nodes.
+    """
+    nodes = ChainCache.get(chainStr)
+    if nodes is not None:
+        return nodes
+
+    parts = RegexChainSplit.split(chainStr)
+    items = [parts[0]]
+    consumed = False
+    for i in range(1, len(parts), 2):
+        sep, segment = parts[i], parts[i + 1]
+        nextSep = parts[i + 2] if i + 2 < len(parts) else None
+        if sep == '\n' and not consumed and RegexChainSingleChar.match(segment):
+            rest = segment[1:]
+            if (nextSep == '\n' and rest in ('', '\r')) or (nextSep is None and rest == '') or chainSemicolon(parts, i + 2):
+                items[-1] += '\x00' + segment
+                consumed = nextSep == '\n' and rest in ('', '\r')
+                continue
+        consumed = False
+        items.append(segment)
+
+    nodeList = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        item = item.replace('\x00', '\n')
+        directive = RegexChainDirective.match(item)
+        if directive:
+            nodeList.append(ChainDirective(item, directive.group(1)))
+        else:
+            nodeList.append(ChainCommand(item))
+    nodes = tuple(nodeList)
+
+    if len(chainStr) <= ChainCacheMaxLength:
+        if len(ChainCache) >= ChainCacheSize:
+            ChainCache.clear()
+        ChainCache[chainStr] = nodes
+    return nodes
+
+
+def chainSemicolon(parts, index):
+    """
+    Check whether only whitespace is left before the next ';' of a split chain.
+
+    Args:
+        parts (list): The chain split on separators.
+        index (int): The index of the separator to start from.
+
+    Returns:
+        bool: True if a ';' follows, False otherwise.
+    """
+    while index < len(parts):
+        if parts[index] == ';':
+            return True
+        if parts[index + 1].strip():
+            return False
+        index += 2
+    return False
+
+
+def expandCommand(cmd):
+    """
+    Turn the ' // ' inline newlines of a command into newlines, keeping '://' as is.
+
+    Args:
+        cmd (str): The command.
+
+    Returns:
+        tuple: The command to send and its first line.
+    """
+    expanded = CommandCache.get(cmd)
+    if expanded is None:
+        cmdSend = RegexCommandNewline.sub(lambda x: x.group(0) if x.group(0) == '://' else '\n', cmd)
+        newline = cmdSend.find('\n')
+        expanded = (cmdSend, cmdSend[:newline] if 0 <= newline < len(cmdSend) - 1 else cmdSend)
+        if len(CommandCache) >= CommandCacheSize:
+            CommandCache.clear()
+        CommandCache[cmd] = expanded
+    return expanded
@@ -0,0 +1,163 @@
+import csv
+import heapq
+import json
+import math
+from collections import deque
+
+CommandStatusError = 'error'
+CommandStatusOk = 'ok'
+CommandStatusSanity = 'sanity'
+CommandStatusSkipped = 'skipped'
+
+
+class CommandRecord(object):
+    """
+    Telemetry record of one command sent to a device.
+    """
+
+    __slots__ = ('command', 'device', 'start', 'latency', 'outputBytes', 'status', 'error', 'kind')
+
+    def __init__(self, command, device, start, latency, outputBytes, status, error=None, kind='config'):
+        self.command = command
+        self.device = device
+        self.start = start
+        self.latency = latency
+        self.outputBytes = outputBytes
+        self.status = status
+        self.error = error
+        self.kind = kind
+
+    def __repr__(self):
+        return "CommandRecord({!r}, {}, {:.3f}s, {})".format(self.command, self.device, self.latency, self.status)
+
+    def toDict(self):
+        """
+        Get the record as a dictionary.
+
+        Returns:
+            dict: The record fields.
+        """
+        return dict((x, getattr(self, x)) for x in self.__slots__)
+
+
+class CommandHistory(object):
+    """
+    Bounded history of the commands sent by a CLI object.
+
+    Records are kept in a ring buffer: once maxRecords is reached, the
+    oldest records are dropped, and only counted in 'dropped'.
+    """
+
+    MaxRecords = 10000
+
+    def __init__(self, maxRecords=None):
+        """
+        Initialize the history.
+
+        Args:
+            maxRecords (int, optional): The number of records kept. Defaults to MaxRecords.
+        """
+        self.records = deque(maxlen=maxRecords or self.MaxRecords)
+        self.dropped = 0
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, command, device, start, latency, outputBytes, status, error=None, kind='config'):
+        """
+        Add a command record.
+
+        Args:
+            command (str): The command, first line only.
+            device (str): The device IP address.
+            start (float): The command start time, in seconds since the epoch.
+            latency (float): The command duration in seconds.
+            outputBytes (int): The size of the command output.
+            status (str): The command status: 'ok', 'error', 'skipped' or 'sanity'.
+            error (str, optional): The CLI error code, if any. Defaults to None.
+            kind (str, optional): 'config' for configuration commands, 'show' for show commands. Defaults to 'config'.
+
+        Returns:
+            CommandRecord: The new record.
+        """
+        if len(self.records) == self.records.maxlen:
+            self.dropped += 1
+        record = CommandRecord(command, device, start, latency, outputBytes, status, error, kind)
+        self.records.append(record)
+        return record
+
+    def clear(self):
+        """
+        Remove all records.
+        """
+        self.records.clear()
+        self.dropped = 0
+
+    def commands(self, kind='config', statuses=None):
+        """
+        Get the commands that were performed, without the failed ones.
+
+        Args:
+            kind (str, optional): The command kind, or None for all kinds. Defaults to 'config'.
+            statuses (tuple, optional): The statuses to keep, or None for all but 'error'. Defaults to None.
+
+        Returns:
+            list: The commands.
+        """
+        if statuses is None:
+            return [x.command for x in self.records if x.status != CommandStatusError and (kind is None or x.kind == kind)]
+        return [x.command for x in self.records if x.status in statuses and (kind is None or x.kind == kind)]
+
+    def exportCsv(self, path):
+        """
+        Export the records to a CSV file.
+
+        Args:
+            path (str): The CSV file path.
+        """
+        with open(path, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(CommandRecord.__slots__)
+            for record in self.records:
+                writer.writerow([getattr(record, x) for x in CommandRecord.__slots__])
+
+    def exportJson(self, path):
+        """
+        Export the records to a JSON file.
+
+        Args:
+            path (str): The JSON file path.
+        """
+        with open(path, 'w') as f:
+            json.dump([x.toDict() for x in self.records], f, indent=2)
+
+    def percentiles(self, percents=(50, 90, 99), kind=None):
+        """
+        Get latency percentiles of the commands sent to the device (nearest rank).
+
+        Args:
+            percents (tuple, optional): The percentiles to compute. Defaults to (50, 90, 99).
+            kind (str, optional): The command kind, or None for all kinds. Defaults to None.
+
+        Returns:
+            dict: The latency in seconds for each percentile, empty if no command was sent.
+        """
+        latencies = sorted(x.latency for x in self.records if x.status in (CommandStatusOk, CommandStatusError) and (kind is None or x.kind == kind))
+        if not latencies:
+            return {}
+        return dict((p, latencies[max(1, int(math.ceil(p * len(latencies) / 100.0))) - 1]) for p in percents)
+
+    def slowest(self, count=5):
+        """
+        Get the slowest commands.
+
+        Args:
+            count (int, optional): The number of records. Defaults to 5.
+
+        Returns:
+            list: The slowest records, slowest first.
+        """
+        return heapq.nlargest(count, self.records, key=lambda x: x.latency)
@@ -0,0 +1,154 @@
+import re
+
+from .Regex import RegexContextPatterns, RegexModeConfig, RegexModeEnable, RegexModeEnd, RegexModeExit, RegexModeSave
+
+# CLI keywords the devices accept in any case and store in their own case; other words (names, descriptions) keep their case
+ConfigKeywords = frozenset([
+    'access', 'add', 'address', 'admin', 'all', 'auto', 'auto-negotiate', 'boot', 'cfm', 'clip', 'config', 'configure',
+    'create', 'default', 'default-vlan-id', 'delete', 'description', 'disable', 'enable', 'encapsulation', 'ethernet',
+    'fa', 'fastethernet', 'flags', 'gigabitethernet', 'i-sid', 'interface', 'ip', 'ipv6', 'isis', 'lacp', 'loopback',
+    'mgmt', 'mlt', 'name', 'no', 'ntp', 'oob', 'port', 'port-mstprstp', 'ports', 'radius', 'route', 'route-map',
+    'router', 'server', 'shutdown', 'snmp-server', 'spanning-tree', 'spbm', 'ssh', 'sys', 'tagged', 'telnet', 'type',
+    'untagged', 'vlan', 'vlacp', 'vrf',
+])
+RegexWord = re.compile(r'\S+')
+
+
+def lowerKeyword(match):
+    word = match.group(0)
+    return word.lower() if word.lower() in ConfigKeywords else word
+
+
+def normalizeLine(line):
+    """
+    Normalize a configuration line the way the device does when storing it.
+
+    Whitespace is collapsed and the ConfigKeywords are lowercased; values,
+    such as names and descriptions, keep their case so that a case-only
+    change to them is part of the delta. Quotes around a single word are
+    dropped, as devices add them to names in their configuration.
+
+    Args:
+        line (str): The configuration line.
+
+    Returns:
+        str: The comparison key of the line.
+    """
+    parts = line.split('"')
+    for i in range(len(parts)):
+        if i % 2 == 0:
+            parts[i] = RegexWord.sub(lowerKeyword, parts[i])
+        elif i < len(parts) - 1 and (not parts[i] or len(parts[i].split()) > 1):
+            parts[i] = '"' + parts[i] + '"'
+    return ' '.join(''.join(parts).split())
+
+
+class ConfigNode(object):
+    """
+    Configuration line with the lines of the context it opens, if any.
+
+    A context entered several times is kept as several nodes, in
+    configuration order, so commands keep their relative order.
+    """
+
+    __slots__ = ('line', 'key', 'children', 'context')
+
+    def __init__(self, line, key=(), context=False):
+        self.line = line
+        self.key = key
+        self.children = []
+        self.context = context
+
+    def child(self, line, context=False):
+        node = ConfigNode(line, self.key + (normalizeLine(line),), context)
+        self.children.append(node)
+        return node
+
+
+class ConfigTree(object):
+    """
+    Configuration normalized into nested contexts.
+
+    Lines are grouped under the context they belong to, using the family
+    RegexContextPatterns for nesting and exit commands to leave a context.
+    Mode commands (enable, configure terminal, end, save) and comments are
+    ignored, and lines are compared with normalizeLine().
+    """
+
+    def __init__(self, family, lines):
+        """
+        Parse a configuration.
+
+        Args:
+            family (str): The device family.
+            lines (iterable): The configuration lines.
+        """
+        self.patterns = RegexContextPatterns.get(family, [])
+        self.root = ConfigNode(None, (), True)
+        self.keys = set()
+        stack = [self.root]
+        for line in lines:
+            line = line.strip()
+            if not line or line[0] in '#!' or RegexModeEnable.match(line) or RegexModeConfig.match(line) or RegexModeSave.match(line):
+                continue
+            if RegexModeEnd.match(line):
+                stack = [self.root]
+                continue
+            if RegexModeExit.match(line):
+                if len(stack) > 1:
+                    stack.pop()
+                continue
+            level = len(stack) - 1
+            if level < len(self.patterns) and self.patterns[level].match(line):
+                node = stack[-1].child(line, True)
+                stack.append(node)
+            elif level > 0 and self.patterns[0].match(line):
+                node = self.root.child(line, True)
+                stack = [self.root, node]
+            else:
+                node = stack[-1].child(line)
+            self.keys.add(node.key)
+
+    def delta(self, running):
+        """
+        Get the commands needed to apply this configuration on top of another one.
+
+        Only additions are computed: lines of the running configuration that
+        are not in this configuration are left untouched. The commands are in
+        the order of this configuration, so a command depending on an earlier
+        one (e.g. a port assigned to a VLAN created before) stays after it.
+
+        Args:
+            running (ConfigTree): The running configuration.
+
+        Returns:
+            list: The context-scoped command lines, in configuration order.
+        """
+        return self.deltaNode(self.root, running.keys, set())
+
+    def deltaNode(self, intended, runningKeys, pushed):
+        """
+        Get the commands needed to bring a running context to an intended one.
+
+        Args:
+            intended (ConfigNode): The intended context.
+            runningKeys (set): The line keys of the running configuration.
+            pushed (set): The line keys already in the delta, updated.
+
+        Returns:
+            list: The command lines of the context body.
+        """
+        lines = []
+        for node in intended.children:
+            missing = node.key not in runningKeys and node.key not in pushed
+            pushed.add(node.key)
+            if not node.context:
+                if missing:
+                    lines.append(node.line)
+                continue
+            body = self.deltaNode(node, runningKeys, pushed)
+            if body or missing:
+                lines.append(node.line)
+                lines.extend(body)
+                lines.append('exit')
+        return lines
@@ -0,0 +1,163 @@
+import re
+from collections import namedtuple
+
+from .OutputView import OutputView
+from .Regex import RegexError, RegexNoError
+
+ErrorAmbiguous = 'AMBIGUOUS'
+ErrorGeneric = 'GENERIC'
+ErrorIncomplete = 'INCOMPLETE'
+ErrorInvalidInput = 'INVALID_INPUT'
+ErrorNotFound = 'NOT_FOUND'
+ErrorPermission = 'PERMISSION'
+ErrorRange = 'OUT_OF_RANGE'
+ErrorSession = 'SESSION'
+
+ErrorMatch = namedtuple('ErrorMatch', ['code', 'message'])
+
+ErrorRules = {
+    'ERS Series' : {
+        'prefix' : [
+            ('% Invalid input', ErrorInvalidInput),
+            ('% Incomplete', ErrorIncomplete),
+            ('% Ambiguous', ErrorAmbiguous),
+            ('% Permission denied', ErrorPermission),
+            ('% Bad ', ErrorInvalidInput),
+            ('% Cannot ', ErrorGeneric),
+            ('%', ErrorGeneric),
+        ],
+        'literal' : [
+            ('\x07', ErrorGeneric),
+            ('Invalid input detected', ErrorInvalidInput),
+            ('out of range', ErrorRange),
+        ],
+    },
+    'Fabric Engine' : {
+        'prefix' : [
+            ('% Invalid input', ErrorInvalidInput),
+            ('% Incomplete', ErrorIncomplete),
+            ('% Ambiguous', ErrorAmbiguous),
+            ('% Permission denied', ErrorPermission),
+            ('% Not allowed', ErrorPermission),
+            ('%', ErrorGeneric),
+            ('Error:', ErrorGeneric),
+            ('ERROR:', ErrorGeneric),
+        ],
+        'literal' : [
+            ('\x07', ErrorGeneric),
+            ('Invalid input detected', ErrorInvalidInput),
+            ('does not exist', ErrorNotFound),
+            ('out of range', ErrorRange),
+        ],
+    },
+    'Switch Engine' : {
+        'prefix' : [
+            ('%% Invalid input', ErrorInvalidInput),
+            ('%% Incomplete', ErrorIncomplete),
+            ('%% Ambiguous', ErrorAmbiguous),
+            ('%% Unrecognized command', ErrorInvalidInput),
+            ('%%', ErrorGeneric),
+            ('Error:', ErrorGeneric),
+            ('ERROR:', ErrorGeneric),
+        ],
+        'literal' : [
+            ('\x07', ErrorGeneric),
+            ('Invalid input detected', ErrorInvalidInput),
+            ('does not exist', ErrorNotFound),
+            ('out of range', ErrorRange),
+            ('Permission denied', ErrorPermission),
+        ],
+    },
+}
+ErrorRules['Summit Series'] = ErrorRules['Switch Engine']
+
+
+class ErrorClassifier(object):
+    """
+    Per-family CLI error classifier.
+
+    Whether an output is an error is decided as before the classifier, by
+    the generic RegexError check (and RegexNoError for known false
+    positives), so no error the generic check catches is missed. The rules
+    of the family only name the error: the output lines are checked against
+    a tuple of anchored prefixes (e.g. '% ' on Fabric Engine, '%% ' and
+    'Error:' on Switch Engine), then searched once for the family literals
+    using a single alternation regex. Errors matching no rule, and errors
+    of families without rules, are GENERIC.
+    """
+
+    Classifiers = {}
+
+    def __init__(self, family):
+        """
+        Compile the rules of a family.
+
+        Args:
+            family (str): The device family.
+        """
+        self.family = family
+        rules = ErrorRules.get(family) or {}
+        self.prefixes = sorted(rules.get('prefix', []), key=lambda x: len(x[0]), reverse=True)
+        self.prefixTuple = tuple(x[0] for x in self.prefixes)
+        literals = sorted(rules.get('literal', []), key=lambda x: len(x[0]), reverse=True)
+        self.literalCodes = dict((x[0].lower(), x[1]) for x in literals)
+        self.literalRegex = re.compile('|'.join(re.escape(x[0]) for x in literals), re.IGNORECASE) if literals else None
+
+    @classmethod
+    def forFamily(cls, family):
+        """
+        Get the classifier of a family, compiling it on first use.
+
+        Args:
+            family (str): The device family.
+
+        Returns:
+            ErrorClassifier: The family classifier.
+        """
+        classifier = cls.Classifiers.get(family)
+        if classifier is None:
+            classifier = cls.Classifiers[family] = cls(family)
+        return classifier
+
+    def classify(self, outputStr):
+        """
+        Classify the error of a CLI output, if any.
+
+        Args:
+            outputStr (str or OutputView): The output to check, typically its first lines.
+
+        Returns:
+            ErrorMatch: The error code and the error line, or None if the output is not an error.
+        """
+        if isinstance(outputStr, OutputView):
+            outputStr = outputStr.text()
+        match = RegexError.search(outputStr)
+        if not match or RegexNoError.search(outputStr):
+            return None
+
+        if self.prefixTuple:
+            for line in outputStr.splitlines():
+                if line.startswith(self.prefixTuple):
+                    for prefix, code in self.prefixes:
+                        if line.startswith(prefix):
+                            return ErrorMatch(code, line)
+        if self.literalRegex:
+            literal = self.literalRegex.search(outputStr)
+            if literal:
+                return ErrorMatch(self.literalCodes[literal.group(0).lower()], self.line(outputStr, literal.start()))
+        return ErrorMatch(ErrorGeneric, self.line(outputStr, match.start()))
+
+    def line(self, outputStr, pos):
+        """
+        Get the output line containing a position.
+
+        Args:
+            outputStr (str): The output.
+            pos (int): The position.
+
+        Returns:
+            str: The line, without newline.
+        """
+        start = outputStr.rfind('\n', 0, pos) + 1
+        end = outputStr.find('\n', pos)
+        return outputStr[start:end if end >= 0 else len(outputStr)].strip()
@@ -1,3 +1,10 @@
+import atexit
+import json
+import sys
+import threading
+import time
+import weakref
+
 LOG_LEVELS = {
     'DEBUG'     : 10,
     'INFO'      : 20,
@@ -5,29 +12,113 @@ LOG_LEVELS = {
     'ERROR'     : 40
 }
 
+class Lazy(object):
+    """
+    Deferred log argument: the function is only called if the message is logged.
+
+    Example:
+        ctx.debug("data = %s", Lazy(json.dumps, data, indent=4))
+    """
+
+    __slots__ = ('func', 'args', 'kwargs')
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return str(self.func(*self.args, **self.kwargs))
+
+    __repr__ = __str__
+
+# Buffered loggers still alive, flushed once at interpreter exit
+BufferedLoggers = weakref.WeakSet()
+
+def flushBufferedLoggers():
+    """
+    Flush the buffered loggers, at interpreter exit.
+    """
+    for logger in list(BufferedLoggers):
+        logger.flush()
+
+atexit.register(flushBufferedLoggers)
+
 class Logger(object):
-    def __init__(self, level='INFO'):
+    def __init__(self, level='INFO', buffered=False, jsonLines=False, bufferSize=200, stream=None):
+        """
+        Initialize the logger.
+
+        Messages are formatted only when their level is enabled. When
+        buffered, lines are written in batches of bufferSize lines, and on
+        flush(). With jsonLines, each line is a JSON object with the time,
+        level and message.
+
+        Buffered lines are flushed by XIQSE close() and exitError(), and at
+        interpreter exit. Until then they are held back, so they can show
+        after output printed directly by the script in the meantime (e.g. the
+        CLI summary); call flush() before such output to keep the order.
+        Buffer appends and flushes are serialized by a lock, as log calls can
+        come from several threads (e.g. Fleet workers).
+
+        Args:
+            level (str, optional): The logging level. Defaults to 'INFO'.
+            buffered (bool, optional): Whether to buffer the log lines. Defaults to False.
+            jsonLines (bool, optional): Whether to log JSON lines. Defaults to False.
+            bufferSize (int, optional): The number of lines buffered before writing. Defaults to 200.
+            stream (file, optional): The output stream of buffered lines. Defaults to sys.stdout.
+        """
         self.level = LOG_LEVELS.get(level.upper(), 20)
+        self.buffered = buffered
+        self.jsonLines = jsonLines
+        self.bufferSize = bufferSize
+        self.stream = stream
+        self.buffer = []
+        self.lock = threading.RLock()
+        if buffered:
+            BufferedLoggers.add(self)
     
     def set_level(self, level):
         self.level = LOG_LEVELS.get(level.upper(), 20)
     
+    def isEnabledFor(self, msg_level):
+        return LOG_LEVELS.get(msg_level.upper(), 0) >= self.level
+    
+    def flush(self):
+        with self.lock:
+            buffer, self.buffer = self.buffer, []
+            if buffer:
+                stream = self.stream or sys.stdout
+                stream.write("\n".join(buffer) + "\n")
+                stream.flush()
+    
     def log(self, msg_level, msg, *args):
         msg_level = msg_level.upper()
         if LOG_LEVELS.get(msg_level, 0) >= self.level:
             if args:
-                print("[{:<7}] {}".format(msg_level, msg % args))
+                msg = msg % args
+            if self.jsonLines:
+                line = json.dumps({'time': time.time(), 'level': msg_level, 'message': msg})
+            else:
+                line = "[{:<7}] {}".format(msg_level, msg)
+            if self.buffered:
+                with self.lock:
+                    self.buffer.append(line)
+                    if len(self.buffer) >= self.bufferSize:
+                        self.flush()
             else:
-                print("[{:<7}] {}".format(msg_level, msg))
+                print(line)
     
     def debug(self, msg, *args):
-        self.log('DEBUG', msg, *args)
+        if self.level <= 10:
+            self.log('DEBUG', msg, *args)
     
     def info(self, msg, *args):
-        self.log('INFO', msg, *args)
+        if self.level <= 20:
+            self.log('INFO', msg, *args)
     
     def warning(self, msg, *args):
         self.log('WARNING', msg, *args)
     
     def error(self, msg, *args):
-        self.log('ERROR', msg, *args)
\ No newline at end of file
+        self.log('ERROR', msg, *args)
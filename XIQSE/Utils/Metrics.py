@@ -0,0 +1,245 @@
+import json
+import math
+import threading
+import time
+
+
+class Histogram(object):
+    """
+    Latency histogram with logarithmic buckets.
+
+    Each bucket is Ratio times wider than the previous one, starting at
+    MinValue seconds, so percentiles are estimated within a few percent
+    whatever the latency range, using a fixed amount of memory.
+    """
+
+    MinValue = 0.000001
+    Ratio = 1.1
+
+    __slots__ = ('count', 'total', 'bytes', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.bytes = 0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+
+    def add(self, seconds, nbytes=0):
+        """
+        Add a sample.
+
+        Args:
+            seconds (float): The duration in seconds.
+            nbytes (int, optional): The payload size. Defaults to 0.
+        """
+        self.count += 1
+        self.total += seconds
+        self.bytes += nbytes
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+        index = int(math.log(seconds / self.MinValue) / math.log(self.Ratio)) if seconds > self.MinValue else 0
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, percent):
+        """
+        Estimate a percentile.
+
+        Args:
+            percent (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The estimated duration in seconds, or None without samples.
+        """
+        if not self.count:
+            return None
+        rank = max(1, int(math.ceil(percent * self.count / 100.0)))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                value = self.MinValue * self.Ratio ** (index + 0.5)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        Get the histogram summary.
+
+        Returns:
+            dict: The count, total, bytes, min, max, p50, p95 and p99 values.
+        """
+        return {
+            'count' : self.count,
+            'total' : self.total,
+            'bytes' : self.bytes,
+            'min'   : self.min,
+            'max'   : self.max,
+            'p50'   : self.percentile(50),
+            'p95'   : self.percentile(95),
+            'p99'   : self.percentile(99),
+        }
+
+
+class Span(object):
+    """
+    Timed operation, recorded in its histogram when the with block exits.
+    """
+
+    __slots__ = ('metrics', 'name', 'start', 'bytes')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.bytes = 0
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.metrics.record(self.name, time.time() - self.start, self.bytes)
+        return False
+
+
+class NullSpan(object):
+    """
+    Span of disabled metrics: records nothing.
+    """
+
+    __slots__ = ('bytes',)
+
+    def __init__(self):
+        self.bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+
+class InstrumentedSession(object):
+    """
+    Proxy of an emc_cli or emc_nbi object timing its send or query calls.
+    """
+
+    def __init__(self, target, metrics, name):
+        self._target = target
+        self._metrics = metrics
+        self._name = name
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+    def query(self, *args):
+        start = time.time()
+        try:
+            return self._target.query(*args)
+        finally:
+            # The response is an already parsed object: its size is not known
+            self._metrics.record(self._name + '.query', time.time() - start)
+
+    def send(self, *args):
+        start = time.time()
+        resultObj = None
+        try:
+            resultObj = self._target.send(*args)
+            return resultObj
+        finally:
+            outputBytes = 0
+            if resultObj is not None and resultObj.isSuccess():
+                outputBytes = len(resultObj.getOutput() or '')
+            self._metrics.record(self._name + '.send', time.time() - start, outputBytes)
+
+
+class Metrics(object):
+    """
+    Latency metrics of the CLI, NBI and Netbox calls of a workflow.
+
+    Operations are timed with span() or record(), and kept as one histogram
+    per operation name. When disabled, span() returns a shared no-op span and
+    wrap() returns the wrapped object itself, so the cost is a method call.
+    """
+
+    def __init__(self, enabled=False):
+        """
+        Initialize the metrics.
+
+        Args:
+            enabled (bool, optional): Whether the metrics are collected. Defaults to False.
+        """
+        self.enabled = enabled
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.nullSpan = NullSpan()
+
+    def record(self, name, seconds, nbytes=0):
+        """
+        Record a timed operation.
+
+        Args:
+            name (str): The operation name, e.g. 'cli.send'.
+            seconds (float): The duration in seconds.
+            nbytes (int, optional): The payload size. Defaults to 0.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds, nbytes)
+
+    def report(self):
+        """
+        Get the summary of every operation.
+
+        Returns:
+            dict: The histogram summary of each operation name.
+        """
+        with self.lock:
+            return dict((name, histogram.summary()) for name, histogram in self.histograms.items())
+
+    def span(self, name):
+        """
+        Get a span timing a with block.
+
+        Args:
+            name (str): The operation name.
+
+        Returns:
+            Span: The span; set its 'bytes' attribute to record the payload size.
+        """
+        if not self.enabled:
+            return self.nullSpan
+        return Span(self, name)
+
+    def wrap(self, target, name):
+        """
+        Time the send/query calls of an emc_cli or emc_nbi object.
+
+        Args:
+            target (object): The object to wrap.
+            name (str): The operation name prefix, e.g. 'cli'.
+
+        Returns:
+            object: The instrumented object, or the object itself when disabled.
+        """
+        if not self.enabled or target is None or isinstance(target, InstrumentedSession):
+            return target
+        return InstrumentedSession(target, self, name)
+
+    def write(self, path):
+        """
+        Write the report to a JSON file.
+
+        Args:
+            path (str): The JSON file path.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
@@ -0,0 +1,139 @@
+from .CLIDict import CLI_Dict
+from .Regex import RegexContextPatterns, RegexExitInstance, RegexModeConfig, RegexModeEnable, RegexModeEnd, RegexModeExit, RegexModeSave
+
+
+class ModeTracker(object):
+    """
+    Track the CLI mode and context level of a device session.
+
+    The tracker follows the commands sent on a session to know whether the
+    session is privileged, in configuration mode and inside which contexts
+    (using the family RegexContextPatterns). It drops the commands that would
+    not change the session state, and holds back context exits so that an
+    exit followed by a re-enter of the same context costs no round trip.
+
+    A value of None means the state is unknown; nothing is dropped until the
+    tracker has seen a command that makes the state known again.
+    """
+
+    def __init__(self, family):
+        """
+        Initialize the tracker.
+
+        Args:
+            family (str): The device family.
+        """
+        self.family = family
+        self.patterns = RegexContextPatterns.get(family)
+        cliDict = CLI_Dict.get(family, {})
+        self.pagingCmd = self.normalize(cliDict.get('disable_more_paging', ''))
+        self.enableCmd = self.normalize(cliDict.get('enable_context', 'enable'))
+        self.reset()
+
+    def normalize(self, cmd):
+        """
+        Normalize the whitespace of a command.
+
+        Args:
+            cmd (str): The command.
+
+        Returns:
+            str: The normalized command.
+        """
+        return ' '.join(cmd.split())
+
+    def reset(self):
+        """
+        Forget the session state, e.g. after an error or an untracked script.
+        """
+        self.privileged = None
+        self.config = None
+        self.stack = None
+        self.paging = None
+        self.pendingExits = []
+
+    def flush(self):
+        """
+        Get the held back context exits that still have to be sent.
+
+        Returns:
+            list: The exit commands to send.
+        """
+        cmdList = ['exit'] * len(self.pendingExits)
+        self.pendingExits = []
+        return cmdList
+
+    def plan(self, cmd):
+        """
+        Get the commands to send for a command, and update the session state.
+
+        The state is updated as if the returned commands succeed; call reset()
+        when one of them fails.
+
+        Args:
+            cmd (str): The command.
+
+        Returns:
+            list: The commands to send, possibly empty when the command is redundant.
+        """
+        if not self.patterns or '\n' in cmd:
+            return self.flush() + [cmd]
+        norm = self.normalize(cmd)
+
+        if self.pendingExits and self.stack is not None and self.isContext(norm, len(self.stack)) and norm == self.pendingExits[-1]:
+            self.stack.append(self.pendingExits.pop())
+            return self.flush()
+        if RegexModeExit.match(norm) and self.stack:
+            self.pendingExits.append(self.stack.pop())
+            return []
+
+        if RegexModeEnd.match(norm) and self.pendingExits:
+            self.pendingExits = []
+        cmdList = self.flush()
+        if RegexModeEnable.match(norm) or (self.enableCmd and norm == self.enableCmd):
+            if self.privileged:
+                return cmdList
+            self.privileged = True
+        elif self.pagingCmd and norm == self.pagingCmd:
+            if self.paging is False:
+                return cmdList
+            self.paging = False
+        elif RegexModeConfig.match(norm):
+            if self.config and self.stack == []:
+                return cmdList
+            self.privileged = self.config = True
+            self.stack = []
+        elif RegexModeEnd.match(norm):
+            if self.config is False and self.privileged:
+                return cmdList
+            self.privileged = True
+            self.config = False
+            self.stack = []
+        elif RegexModeExit.match(norm):
+            if self.config and self.stack == []:
+                self.config = False
+            else:
+                self.reset()
+        elif RegexModeSave.match(norm):
+            pass
+        elif RegexExitInstance.match(norm):
+            self.reset()
+        elif self.config and self.stack is not None:
+            if self.isContext(norm, len(self.stack)):
+                self.stack.append(norm)
+            elif self.stack and self.isContext(norm, 0):
+                self.stack = None
+        return cmdList + [cmd]
+
+    def isContext(self, cmd, level):
+        """
+        Check if a command enters a context at a given level.
+
+        Args:
+            cmd (str): The normalized command.
+            level (int): The context level.
+
+        Returns:
+            bool: True if the command enters a context at this level.
+        """
+        return level < len(self.patterns) and bool(self.patterns[level].match(cmd))
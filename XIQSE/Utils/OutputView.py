@@ -0,0 +1,234 @@
+import re
+
+
+class OutputView(object):
+    """
+    Read-only window over a CLI output buffer.
+
+    The view keeps the original output string and a pair of offsets into it.
+    Prompt trimming and head-only checks move the offsets instead of splitting
+    and re-joining lines, and compiled regexes are run directly on the window
+    using their pos/endpos arguments where this gives the same result as on
+    the view text (see searched()).
+    """
+
+    __slots__ = ('buffer', 'start', 'end', 'cr')
+
+    def __init__(self, buffer, start=0, end=None, cr=None):
+        """
+        Initialize the view.
+
+        Lines may end with '\n', '\r\n' or '\r'. The buffer is kept as is:
+        line ends are only normalised to '\n' in the text of the view.
+
+        Args:
+            buffer (str): The raw output string.
+            start (int, optional): Start offset of the window. Defaults to 0.
+            end (int, optional): End offset of the window. Defaults to the buffer length.
+            cr (bool, optional): Whether the buffer contains '\r'. Defaults to checking the buffer.
+        """
+        self.buffer = buffer
+        self.start = start
+        self.end = len(buffer) if end is None else end
+        self.cr = '\r' in buffer if cr is None else cr
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __nonzero__(self):
+        return self.end > self.start
+
+    __bool__ = __nonzero__
+
+    def __str__(self):
+        return self.text()
+
+    def __repr__(self):
+        return "OutputView({}:{} of {})".format(self.start, self.end, len(self.buffer))
+
+    def lineEnd(self, pos, end):
+        """
+        Find the next line end of the buffer.
+
+        Args:
+            pos (int): The offset to search from.
+            end (int): The offset to search up to.
+
+        Returns:
+            int: The offset of the '\n' or '\r' ending the line, or -1.
+        """
+        found = self.buffer.find('\n', pos, end)
+        if self.cr:
+            cr = self.buffer.find('\r', pos, end if found < 0 else found)
+            if cr >= 0:
+                return cr
+        return found
+
+    def lineNext(self, pos, end):
+        """
+        Get the start of the line following a line end.
+
+        Args:
+            pos (int): The offset of the line end, as returned by lineEnd().
+            end (int): The end offset of the window.
+
+        Returns:
+            int: The offset of the next line.
+        """
+        if self.cr and self.buffer[pos] == '\r' and pos + 1 < end and self.buffer[pos + 1] == '\n':
+            return pos + 2
+        return pos + 1
+
+    def lineStartLast(self, start, end):
+        """
+        Find the start of the last line of a window.
+
+        Args:
+            start (int): The start offset of the window.
+            end (int): The end offset of the window.
+
+        Returns:
+            int: The offset of the last line.
+        """
+        last = self.buffer.rfind('\n', start, end)
+        if self.cr:
+            last = max(last, self.buffer.rfind('\r', start, end))
+        return last + 1 if last >= 0 else start
+
+    def searched(self, regex):
+        """
+        Get the string and window a regex is run on.
+
+        The buffer is searched in place, unless its line ends need to be
+        normalised, or the regex has a '\\A' or '^' anchor that would not
+        match at the view start: pos does not move the start of the string,
+        so '^' only matches there with re.MULTILINE, after a newline. The
+        view text is then searched instead.
+
+        Args:
+            regex (re.Pattern): The compiled regex.
+
+        Returns:
+            tuple: The string, start offset and end offset.
+        """
+        anchored = self.start and ('\\A' in regex.pattern or ('^' in regex.pattern and not (regex.flags & re.MULTILINE and self.buffer[self.start - 1] == '\n')))
+        if self.cr or anchored:
+            text = self.text()
+            return text, 0, len(text)
+        return self.buffer, self.start, self.end
+
+    def head(self, lines):
+        """
+        Get a view limited to the first lines of this view.
+
+        Args:
+            lines (int): The number of lines to keep.
+
+        Returns:
+            OutputView: A view over the first lines.
+        """
+        pos = self.start
+        lineEnd = self.end
+        for _ in range(lines):
+            lineEnd = self.lineEnd(pos, self.end)
+            if lineEnd < 0:
+                return OutputView(self.buffer, self.start, self.end, self.cr)
+            pos = self.lineNext(lineEnd, self.end)
+        return OutputView(self.buffer, self.start, lineEnd, self.cr)
+
+    def text(self):
+        """
+        Materialize the view.
+
+        Returns:
+            str: The output covered by the view, in the buffer's own string type, with '\n' line ends.
+        """
+        if self.start == 0 and self.end == len(self.buffer):
+            text = self.buffer
+        else:
+            text = self.buffer[self.start:self.end]
+        if self.cr:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    def trimPrompt(self, promptRegex):
+        """
+        Get a view without the echoed command line and the trailing prompt.
+
+        This is the offset-based equivalent of XIQSE.cleanOutput().
+
+        Args:
+            promptRegex (re.Pattern): The compiled prompt regex.
+
+        Returns:
+            OutputView: The trimmed view.
+        """
+        buf = self.buffer
+        end = self.end
+        if end > self.start and buf[end - 1] == '\n':
+            end -= 1
+            if self.cr and end > self.start and buf[end - 1] == '\r':
+                end -= 1
+        elif self.cr and end > self.start and buf[end - 1] == '\r':
+            end -= 1
+        first = self.lineEnd(self.start, end)
+        if first < 0:
+            return OutputView(buf, end, end, self.cr)
+        start = self.lineNext(first, end)
+        lastStart = self.lineStartLast(start, end)
+        if promptRegex.match(buf, lastStart, end):
+            if lastStart > start:
+                end = lastStart - 1
+                if self.cr and buf[end] == '\n' and end > start and buf[end - 1] == '\r':
+                    end -= 1
+            else:
+                end = start
+        return OutputView(buf, start, end, self.cr)
+
+    def startswith(self, prefix):
+        """
+        Check if the view starts with a prefix.
+
+        Args:
+            prefix (str): The prefix.
+
+        Returns:
+            bool: True if the view starts with the prefix.
+        """
+        return self.buffer.startswith(prefix, self.start, self.end)
+
+    def search(self, regex):
+        """
+        Search a compiled regex in the view.
+
+        Args:
+            regex (re.Pattern): The compiled regex.
+
+        Returns:
+            re.Match: The match object, or None. Its offsets are relative to the searched string (see searched()).
+        """
+        return regex.search(*self.searched(regex))
+
+    def findall(self, regex):
+        """
+        Find all matches of a compiled regex in the view.
+
+        Args:
+            regex (re.Pattern): The compiled regex.
+
+        Returns:
+            list: The same result as regex.findall() on the view text.
+        """
+        return regex.findall(*self.searched(regex))
+
+    def finditer(self, regex):
+        """
+        Iterate over matches of a compiled regex in the view.
+
+        Args:
+            regex (re.Pattern): The compiled regex.
+
+        Returns:
+            iterator: The match objects.
+        """
+        return regex.finditer(*self.searched(regex))
@@ -0,0 +1,144 @@
+import errno
+import json
+import os
+import threading
+import time
+
+
+class PreferenceStore(object):
+    """
+    Small JSON key/value store shared by workflow runs.
+
+    The file is loaded once per run. Each update re-reads the file and merges
+    the new value before writing it back through a temporary file and a
+    rename. The read-merge-rename is done holding an O_EXCL lock file, so
+    concurrent workflow activities, in the same or in other processes, do not
+    lose each other's keys. Use PreferenceStore.open() to share one store per
+    file within a run.
+    """
+
+    Stores = {}
+    StoresLock = threading.Lock()
+    LockTimeout = 5
+    LockStale = 30
+
+    def __init__(self, path):
+        """
+        Initialize the store.
+
+        Args:
+            path (str): The path of the JSON file.
+        """
+        self.path = path
+        self.lockPath = path + '.lock'
+        self.data = None
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Get a value from the store.
+
+        Args:
+            key (str): The key.
+            default (any, optional): The value returned when the key is missing. Defaults to None.
+
+        Returns:
+            any: The stored value.
+        """
+        if self.data is None:
+            with self.lock:
+                if self.data is None:
+                    self.data = self.load()
+        return self.data.get(key, default)
+
+    def lockFile(self):
+        """
+        Take the lock file of the store, waiting up to LockTimeout seconds.
+
+        Returns:
+            bool: True if the lock was taken, False otherwise.
+        """
+        deadline = time.time() + self.LockTimeout
+        while True:
+            try:
+                os.close(os.open(self.lockPath, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    return False
+            try:
+                if time.time() - os.stat(self.lockPath).st_mtime > self.LockStale:
+                    os.remove(self.lockPath)
+                    continue
+            except OSError:
+                continue
+            if time.time() > deadline:
+                return False
+            time.sleep(0.02)
+
+    def load(self):
+        """
+        Read the store file.
+
+        Returns:
+            dict: The stored values, or an empty dictionary if the file is missing or unreadable.
+        """
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (IOError, OSError, ValueError):
+            return {}
+
+    @classmethod
+    def open(cls, path):
+        """
+        Get the store of a file, shared by all callers of the run.
+
+        Args:
+            path (str): The path of the JSON file.
+
+        Returns:
+            PreferenceStore: The store.
+        """
+        with cls.StoresLock:
+            if path not in cls.Stores:
+                cls.Stores[path] = cls(path)
+            return cls.Stores[path]
+
+    def set(self, key, value):
+        """
+        Set a value and save the store.
+
+        Args:
+            key (str): The key.
+            value (any): The JSON serializable value.
+
+        Returns:
+            bool: True if the store was saved, False otherwise (the value is then only kept for this run).
+        """
+        with self.lock:
+            if not self.lockFile():
+                if self.data is None:
+                    self.data = self.load()
+                self.data[key] = value
+                return False
+            try:
+                data = self.load()
+                data[key] = value
+                self.data = data
+                tmpPath = "{}.{}.tmp".format(self.path, os.getpid())
+                try:
+                    with open(tmpPath, 'w') as f:
+                        json.dump(data, f, indent=1, sort_keys=True)
+                    os.rename(tmpPath, self.path)
+                    return True
+                except (IOError, OSError):
+                    if os.path.exists(tmpPath):
+                        os.remove(tmpPath)
+                    return False
+            finally:
+                try:
+                    os.remove(self.lockPath)
+                except OSError:
+                    pass
@@ -0,0 +1,179 @@
+import os
+import sys
+import threading
+import time
+
+try:
+    import cProfile
+    import pstats
+except ImportError:
+    cProfile = None
+
+
+class StackSampler(threading.Thread):
+    """
+    Sampling profiler thread.
+
+    The stack of the profiled thread is sampled at a fixed interval using
+    sys._current_frames(), and identical stacks are counted, which gives a
+    collapsed-stack profile usable by flame graph tools.
+    """
+
+    def __init__(self, threadId, interval=0.005):
+        """
+        Initialize the sampler.
+
+        Args:
+            threadId (int): The identifier of the thread to sample.
+            interval (float, optional): The sampling interval in seconds. Defaults to 0.005.
+        """
+        threading.Thread.__init__(self, name='xiqse-profiler')
+        self.daemon = True
+        self.threadId = threadId
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        labels = {}
+        while not self.stopped.is_set():
+            frame = sys._current_frames().get(self.threadId)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = "{}:{}".format(os.path.basename(code.co_filename), code.co_name)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        """
+        Stop sampling and wait for the thread to end.
+        """
+        self.stopped.set()
+        self.join()
+
+    def writeCollapsed(self, path):
+        """
+        Write the samples in collapsed-stack format ('frame;frame;frame count').
+
+        Args:
+            path (str): The output file path.
+        """
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write("{} {}\n".format(stack, count))
+
+    def writeSummary(self, path, limit=50):
+        """
+        Write the functions found most often at the top of the sampled stacks.
+
+        Args:
+            path (str): The output file path.
+            limit (int, optional): The number of functions listed. Defaults to 50.
+        """
+        selfCounts = {}
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            selfCounts[leaf] = selfCounts.get(leaf, 0) + count
+        with open(path, 'w') as f:
+            f.write("{} samples every {:.1f} ms\n\n".format(self.samples, self.interval * 1000))
+            f.write("{:>8} {:>7}  {}\n".format("samples", "%", "function"))
+            for leaf, count in sorted(selfCounts.items(), key=lambda x: x[1], reverse=True)[:limit]:
+                f.write("{:>8} {:>6.1f}%  {}\n".format(count, 100.0 * count / max(1, self.samples), leaf))
+
+
+class Profiler(object):
+    """
+    Workflow profiler.
+
+    In 'cprofile' mode the calling thread is profiled with cProfile, which
+    gives exact call counts and a call graph. In 'sample' mode, or when
+    cProfile is not available (e.g. on Jython), the stack sampler runs
+    instead, for self times and collapsed stacks. Only one of them runs, so
+    the sampler does not skew the cProfile timings.
+    """
+
+    def __init__(self, mode='cprofile', interval=0.005):
+        """
+        Initialize the profiler.
+
+        Args:
+            mode (str, optional): 'cprofile' or 'sample'. Defaults to 'cprofile'.
+            interval (float, optional): The sampling interval in seconds. Defaults to 0.005.
+        """
+        self.mode = 'cprofile' if mode == 'cprofile' and cProfile is not None else 'sample'
+        self.interval = interval
+        self.profile = None
+        self.sampler = None
+
+    def runcall(self, func, *args, **kwargs):
+        """
+        Run a function under the profiler.
+
+        Args:
+            func (callable): The function to run.
+            *args: The function positional arguments.
+            **kwargs: The function keyword arguments.
+
+        Returns:
+            any: The function return value.
+        """
+        self.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.stop()
+
+    def start(self):
+        """
+        Start profiling the calling thread.
+        """
+        if self.mode == 'cprofile':
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.sampler = StackSampler(threading.current_thread().ident, self.interval)
+            self.sampler.start()
+
+    def stop(self):
+        """
+        Stop profiling.
+        """
+        if self.profile is not None:
+            self.profile.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def write(self, basePath):
+        """
+        Write the profiling results.
+
+        Writes '<basePath>.pstats' and '<basePath>.txt' (cProfile statistics,
+        sorted by cumulative time) in 'cprofile' mode, or '<basePath>.txt'
+        (sampled self time) and '<basePath>.collapsed' in 'sample' mode.
+
+        Args:
+            basePath (str): The output path, without extension.
+
+        Returns:
+            list: The written file paths.
+        """
+        paths = []
+        if self.profile is not None:
+            self.profile.dump_stats(basePath + '.pstats')
+            with open(basePath + '.txt', 'w') as f:
+                pstats.Stats(self.profile, stream=f).sort_stats('cumulative').print_stats(50)
+            paths.extend([basePath + '.pstats', basePath + '.txt'])
+        if self.sampler is not None:
+            self.sampler.writeSummary(basePath + '.txt')
+            self.sampler.writeCollapsed(basePath + '.collapsed')
+            paths.extend([basePath + '.txt', basePath + '.collapsed'])
+        return paths
@@ -0,0 +1,389 @@
+import errno
+import heapq
+import os
+import random
+import select
+import socket
+import struct
+import subprocess
+import time
+from collections import deque
+
+IcmpEchoReply = 0
+IcmpEchoRequest = 8
+IcmpPayload = b'xiqse-sweep'
+
+TcpPorts = (22, 23, 443)
+TcpUpErrors = (0, errno.EISCONN, errno.ECONNREFUSED)
+TcpPendingErrors = (errno.EINPROGRESS, errno.EALREADY, errno.EWOULDBLOCK, getattr(errno, 'WSAEWOULDBLOCK', -1))
+
+
+def icmpChecksum(data):
+    """
+    Compute the Internet checksum of an ICMP message.
+
+    Args:
+        data (bytearray): The message, with a zero checksum field.
+
+    Returns:
+        int: The checksum.
+    """
+    if len(data) % 2:
+        data = data + bytearray(1)
+    total = 0
+    for i in range(0, len(data), 2):
+        total += (data[i] << 8) | data[i + 1]
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+class SweepTarget(object):
+    """
+    Reachability state of one IP address during a sweep.
+    """
+
+    __slots__ = ('ip', 'deadline', 'attempts', 'done', 'result', 'sockets', 'process', 'processStart')
+
+    def __init__(self, ip, deadline):
+        self.ip = ip
+        self.deadline = deadline
+        self.attempts = 0
+        self.done = False
+        self.result = {'ip': ip, 'reachable': False, 'method': None, 'port': None, 'rtt': None, 'firstReply': None, 'attempts': 0, 'error': None}
+        self.sockets = {}
+        self.process = None
+        self.processStart = None
+
+
+class ReachabilitySweeper(object):
+    """
+    Concurrent reachability checks of many IP addresses.
+
+    Every target is probed every interval until it replies or its deadline
+    passes, all targets at once from one event loop:
+    - 'icmp': echo requests on one raw socket, or one unprivileged ICMP
+      datagram socket, when the system permits either
+    - 'tcp': non-blocking connects to the TCP ports (22, 23, 443); an
+      accepted or refused connection both prove the host is up. With ICMP,
+      TCP is a fallback for the targets that did not answer the first echo
+    - 'subprocess': ping processes run in batches of maxProcesses, without
+      a shell; only used when ICMP sockets are not permitted, and for IPv6
+      targets as the ICMP socket is IPv4 only
+    """
+
+    def __init__(self, methods=('icmp', 'tcp', 'subprocess'), ports=TcpPorts, maxSockets=256, maxProcesses=64):
+        """
+        Initialize the sweeper.
+
+        Args:
+            methods (tuple, optional): The probe methods allowed. Defaults to ('icmp', 'tcp', 'subprocess').
+            ports (tuple, optional): The TCP ports probed by the 'tcp' method. Defaults to (22, 23, 443).
+            maxSockets (int, optional): Maximum number of TCP connects in progress. Defaults to 256.
+            maxProcesses (int, optional): Maximum number of ping processes running. Defaults to 64.
+        """
+        self.methods = methods
+        self.ports = ports
+        self.maxSockets = maxSockets
+        self.maxProcesses = maxProcesses
+        self.icmpSocket = None
+        self.icmpRaw = False
+        self.icmpId = os.getpid() & 0xffff
+        self.icmpSeq = random.randint(0, 0xffff)
+        self.icmpSent = {}
+        self.tcpSockets = {}
+        self.tcpWaiting = deque()
+        self.processes = []
+        self.processWaiting = deque()
+        self.remaining = 0
+        self.start = None
+        self.interval = 1.0
+
+    def openIcmp(self):
+        """
+        Open the ICMP socket: raw when permitted, otherwise an unprivileged datagram socket.
+
+        Returns:
+            bool: True if an ICMP socket is open.
+        """
+        for sockType in (getattr(socket, 'SOCK_RAW', None), socket.SOCK_DGRAM):
+            if sockType is None:
+                continue
+            try:
+                sock = socket.socket(socket.AF_INET, sockType, getattr(socket, 'IPPROTO_ICMP', 1))
+                sock.setblocking(False)
+            except (socket.error, AttributeError, ValueError, NotImplementedError):
+                continue
+            try:
+                # A sweep gets its replies in bursts: a small buffer drops them
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4194304)
+            except socket.error:
+                pass
+            self.icmpSocket = sock
+            self.icmpRaw = sockType != socket.SOCK_DGRAM
+            return True
+        return False
+
+    def close(self):
+        """
+        Close the sockets and stop the processes still in progress.
+        """
+        if self.icmpSocket:
+            self.icmpSocket.close()
+            self.icmpSocket = None
+        for sock in list(self.tcpSockets):
+            sock.close()
+        self.tcpSockets = {}
+        for target, process in self.processes:
+            self.stopProcess(process)
+        self.processes = []
+
+    def reply(self, target, method, rtt, now, port=None):
+        """
+        Record the first reply of a target.
+
+        Args:
+            target (SweepTarget): The target.
+            method (str): The method that got the reply.
+            rtt (float): The probe round-trip time, in seconds.
+            now (float): The reply time.
+            port (int, optional): The TCP port that answered. Defaults to None.
+        """
+        if target.done:
+            return
+        target.result.update({'reachable': True, 'method': method, 'port': port, 'rtt': rtt, 'firstReply': now - self.start, 'error': None})
+        self.finish(target)
+
+    def finish(self, target):
+        """
+        End the probes of a target.
+
+        Args:
+            target (SweepTarget): The target.
+        """
+        if not target.done:
+            self.remaining -= 1
+        target.done = True
+        target.result['attempts'] = target.attempts
+        for sock in list(target.sockets):
+            self.tcpSockets.pop(sock, None)
+            sock.close()
+        target.sockets = {}
+        if target.process is not None:
+            self.stopProcess(target.process)
+            self.processes = [x for x in self.processes if x[0] is not target]
+            target.process = None
+
+    def probe(self, target, now, icmp, tcp, ping):
+        """
+        Send the probes of one attempt.
+
+        Args:
+            target (SweepTarget): The target.
+            now (float): The current time.
+            icmp (bool): Whether to send an ICMP echo request.
+            tcp (bool): Whether to connect to the TCP ports (from the second attempt when icmp is set).
+            ping (bool): Whether to run a ping process.
+        """
+        target.attempts += 1
+        if ':' in target.ip and icmp:
+            # The ICMP socket is IPv4 only: IPv6 targets fall back to ping processes
+            icmp = False
+            ping = 'subprocess' in self.methods
+            if not (tcp or ping):
+                target.result['error'] = "No IPv6 probe method among {}".format(', '.join(self.methods))
+                self.finish(target)
+                return
+        if icmp:
+            self.icmpSeq = (self.icmpSeq + 1) & 0xffff
+            packet = bytearray(struct.pack('!BBHHH', IcmpEchoRequest, 0, 0, self.icmpId, self.icmpSeq)) + bytearray(IcmpPayload)
+            packet[2:4] = bytearray(struct.pack('!H', icmpChecksum(packet)))
+            try:
+                self.icmpSocket.sendto(bytes(packet), (target.ip, 0))
+                self.icmpSent[self.icmpSeq] = (target, now)
+            except socket.error as e:
+                target.result['error'] = "ICMP send failed: {}".format(e)
+        if tcp and (not icmp or target.attempts > 1):
+            for sock in list(target.sockets):
+                self.tcpSockets.pop(sock, None)
+                sock.close()
+            target.sockets = {}
+            self.tcpWaiting.append(target)
+        if ping and target.process is None:
+            self.processWaiting.append(target)
+
+    def receiveIcmp(self):
+        """
+        Read the ICMP echo replies waiting on the ICMP socket.
+        """
+        while True:
+            try:
+                data, address = self.icmpSocket.recvfrom(2048)
+            except socket.error:
+                return
+            now = time.time()
+            data = bytearray(data)
+            if data and data[0] >> 4 == 4:
+                data = data[(data[0] & 0x0f) * 4:]
+            if len(data) < 8 or data[0] != IcmpEchoReply:
+                continue
+            identifier, seq = struct.unpack('!HH', bytes(data[4:8]))
+            if self.icmpRaw and identifier != self.icmpId:
+                continue
+            sent = self.icmpSent.get(seq)
+            if sent and sent[0].ip == address[0]:
+                self.reply(sent[0], 'icmp', now - sent[1], now)
+
+    def startProcesses(self, now):
+        """
+        Start the waiting ping processes, up to maxProcesses.
+
+        Args:
+            now (float): The current time.
+        """
+        while self.processWaiting and len(self.processes) < self.maxProcesses:
+            target = self.processWaiting.popleft()
+            if target.done or target.process is not None:
+                continue
+            wait = str(max(1, int(min(target.deadline - now, self.interval) + 0.999)))
+            command = ['ping'] + (['-6'] if ':' in target.ip else []) + ['-c', '1', '-W', wait, target.ip]
+            try:
+                with open(os.devnull, 'w') as devnull:
+                    target.process = subprocess.Popen(command, stdout=devnull, stderr=devnull)
+            except (OSError, ValueError) as e:
+                # The target was never probed: report why rather than a timeout
+                target.result['error'] = "Unable to run ping: {}".format(e)
+                self.finish(target)
+                continue
+            target.processStart = now
+            self.processes.append((target, target.process))
+
+    def startTcp(self, now):
+        """
+        Start the waiting TCP connects, up to maxSockets.
+
+        Args:
+            now (float): The current time.
+        """
+        while self.tcpWaiting and len(self.tcpSockets) + len(self.ports) <= self.maxSockets:
+            target = self.tcpWaiting.popleft()
+            if target.done:
+                continue
+            family = socket.AF_INET6 if ':' in target.ip else socket.AF_INET
+            for port in self.ports:
+                try:
+                    sock = socket.socket(family, socket.SOCK_STREAM)
+                    sock.setblocking(False)
+                    code = sock.connect_ex((target.ip, port))
+                except socket.error:
+                    continue
+                if code in TcpUpErrors:
+                    sock.close()
+                    self.reply(target, 'tcp', 0.0, now, port)
+                    break
+                if code not in TcpPendingErrors:
+                    sock.close()
+                    continue
+                target.sockets[sock] = (port, now)
+                self.tcpSockets[sock] = target
+
+    def stopProcess(self, process):
+        """
+        Stop a ping process.
+
+        Args:
+            process (subprocess.Popen): The process.
+        """
+        if process.poll() is None:
+            try:
+                process.kill()
+                process.wait()
+            except OSError:
+                pass
+
+    def sweep(self, ips, timeout=2.0, interval=1.0):
+        """
+        Check the reachability of IP addresses.
+
+        Args:
+            ips (list): The IP addresses.
+            timeout (float, optional): Per-target deadline in seconds. Defaults to 2.0.
+            interval (float, optional): Seconds between two probes of a target. Defaults to 1.0.
+
+        Returns:
+            dict: Per IP address, a dictionary with the keys 'ip', 'reachable', 'method',
+                  'port' (for 'tcp'), 'rtt', 'firstReply' (seconds from the sweep start), 'attempts'
+                  and 'error' (why an unreachable target could not be probed, or None).
+
+        Raises:
+            RuntimeError: If none of the allowed methods can be used, e.g. 'icmp' alone without ICMP socket permission.
+        """
+        start = self.start = time.time()
+        self.interval = interval
+        icmp = 'icmp' in self.methods and self.openIcmp()
+        tcp = 'tcp' in self.methods
+        ping = 'subprocess' in self.methods and not icmp
+        if not (icmp or tcp or ping):
+            raise RuntimeError("No usable probe method among {}".format(', '.join(self.methods)))
+        targets = {}
+        events = []
+        for ip in ips:
+            if ip not in targets:
+                targets[ip] = SweepTarget(ip, start + timeout)
+                events.append((start, ip))
+        heapq.heapify(events)
+        self.remaining = len(targets)
+        try:
+            while self.remaining:
+                now = time.time()
+                while events and events[0][0] <= now:
+                    at, ip = heapq.heappop(events)
+                    target = targets[ip]
+                    if target.done:
+                        continue
+                    if now >= target.deadline:
+                        self.finish(target)
+                        continue
+                    self.probe(target, now, icmp, tcp, ping)
+                    # With ICMP, TCP is a fallback from the second probe, sent early enough to get a chance
+                    nextProbe = now + (min(interval, timeout / 2.0) if icmp and tcp and target.attempts == 1 else interval)
+                    heapq.heappush(events, (min(nextProbe, target.deadline), ip))
+                self.startTcp(now)
+                self.startProcesses(now)
+
+                readers = [self.icmpSocket] if icmp else []
+                writers = list(self.tcpSockets)
+                wait = max(0.0, events[0][0] - now) if events else 0.1
+                if self.processes:
+                    wait = min(wait, 0.02)
+                if readers or writers:
+                    readable, writable = select.select(readers, writers, [], wait)[:2]
+                else:
+                    readable, writable = [], []
+                    time.sleep(wait)
+                now = time.time()
+                if readable:
+                    self.receiveIcmp()
+                for sock in writable:
+                    target = self.tcpSockets.pop(sock, None)
+                    if target is None or target.done:
+                        continue
+                    port, sentAt = target.sockets.pop(sock)
+                    try:
+                        code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    except socket.error:
+                        code = sock.connect_ex((target.ip, port))
+                    sock.close()
+                    if code in TcpUpErrors:
+                        self.reply(target, 'tcp', now - sentAt, now, port)
+                for target, process in list(self.processes):
+                    code = process.poll()
+                    if code is None:
+                        continue
+                    self.processes.remove((target, process))
+                    target.process = None
+                    if code == 0:
+                        self.reply(target, 'subprocess', now - target.processStart, now)
+        finally:
+            self.close()
+        return dict((ip, target.result) for ip, target in targets.items())
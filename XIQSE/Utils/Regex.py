@@ -30,4 +30,9 @@ RegexContextPatterns = {
         re.compile('^ *(?:ringv2-group |interface )'),
     ],
 }
-RegexExitInstance = re.compile('^ *(?:exit|back|end|config|save)(?:\s|$)')
\ No newline at end of file
+RegexExitInstance = re.compile('^ *(?:exit|back|end|config|save)(?:\s|$)')
+RegexModeConfig = re.compile('^ *conf(?:ig(?:ure)?)? +t(?:erm(?:inal)?)? *$', re.IGNORECASE)
+RegexModeEnable = re.compile('^ *en(?:a(?:b(?:le?)?)?)? *$', re.IGNORECASE)
+RegexModeEnd = re.compile('^ *end *$', re.IGNORECASE)
+RegexModeExit = re.compile('^ *exit *$', re.IGNORECASE)
+RegexModeSave = re.compile('^ *save(?:\s|$)', re.IGNORECASE)
@@ -0,0 +1,453 @@
+import heapq
+import random
+import select
+import socket
+import time
+from collections import deque
+
+from . import BER
+from . import USM
+
+
+class SNMPTarget(object):
+    """
+    SNMP agent address and credentials.
+
+    For SNMPv3 targets, the authoritative engine ID, boots and time are
+    discovered on the first request and kept for the next ones.
+    """
+
+    def __init__(self, host, port=161, version='2c', community='public', user=None, authProtocol=None,
+                 authPassword=None, privProtocol=None, privPassword=None, contextName='', timeout=1.0, retries=2):
+        """
+        Initialize the target.
+
+        Args:
+            host (str): The agent IP address or host name.
+            port (int, optional): The agent UDP port. Defaults to 161.
+            version (str, optional): The SNMP version: '1', '2c' or '3'. Defaults to '2c'.
+            community (str, optional): The v1/v2c community. Defaults to 'public'.
+            user (str, optional): The v3 user name. Defaults to None.
+            authProtocol (str, optional): The v3 authentication protocol, 'MD5' or 'SHA'. Defaults to None (noAuthNoPriv).
+            authPassword (str, optional): The v3 authentication password. Defaults to None.
+            privProtocol (str, optional): The v3 privacy protocol; authPriv is not supported, any value raises ValueError.
+                                          Defaults to None.
+            privPassword (str, optional): The v3 privacy password; any value raises ValueError. Defaults to None.
+            contextName (str, optional): The v3 context name. Defaults to ''.
+            timeout (float, optional): Seconds to wait for each response. Defaults to 1.0.
+            retries (int, optional): Number of retransmissions after a timeout. Defaults to 2.
+
+        Raises:
+            ValueError: If the version or the v3 security parameters are not supported.
+        """
+        version = str(version).lower().lstrip('v')
+        if version not in ('1', '2c', '3'):
+            raise ValueError("SNMP version '{}' is not supported".format(version))
+        if privProtocol or privPassword:
+            raise ValueError("SNMPv3 privacy (authPriv) is not supported, use noAuthNoPriv or authNoPriv")
+        if authProtocol and authProtocol.upper() not in USM.AuthProtocols:
+            raise ValueError("SNMPv3 authentication protocol '{}' is not supported".format(authProtocol))
+        if version == '3' and not user:
+            raise ValueError("SNMPv3 requires a user name")
+        self.host = host
+        self.port = port
+        self.version = version
+        self.community = community
+        self.user = user
+        self.authProtocol = authProtocol.upper() if authProtocol else None
+        self.authPassword = authPassword
+        self.contextName = contextName
+        self.timeout = timeout
+        self.retries = retries
+        self.address = None
+        self.family = None
+        self.engineId = None
+        self.engineBoots = 0
+        self.engineTime = 0
+        self.timeBase = 0
+        self.authKey = None
+        self.waiting = None
+
+    def __repr__(self):
+        return "SNMPTarget({}:{}, v{})".format(self.host, self.port, self.version)
+
+    def resolve(self):
+        """
+        Resolve the agent address, once.
+
+        Returns:
+            tuple: The socket address.
+        """
+        if self.address is None:
+            info = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_DGRAM)[0]
+            self.family, self.address = info[0], info[4]
+        return self.address
+
+
+class SNMPRequest(object):
+    """
+    In-flight SNMP request.
+    """
+
+    __slots__ = ('target', 'pduType', 'oids', 'nonRepeaters', 'maxRepetitions', 'callback', 'context',
+                 'requestId', 'attempt', 'sentAt', 'discovery', 'reported', 'errorIndex')
+
+    def __init__(self, target, pduType, oids, callback, nonRepeaters=0, maxRepetitions=0, context=None):
+        self.target = target
+        self.pduType = pduType
+        self.oids = oids
+        self.callback = callback
+        self.nonRepeaters = nonRepeaters
+        self.maxRepetitions = maxRepetitions
+        self.context = context
+        self.requestId = None
+        self.attempt = 0
+        self.sentAt = None
+        self.discovery = False
+        self.reported = False
+        self.errorIndex = 0
+
+
+class SNMPEngine(object):
+    """
+    Non-blocking SNMP engine multiplexing many requests over one UDP socket.
+
+    Requests are queued with submit() and sent by run() or step(), which
+    keep up to maxInFlight requests outstanding, match responses by request
+    ID, retransmit on timeout and call each request callback once with
+    (request, error, varbinds). Callbacks may submit follow-up requests,
+    e.g. the next GETBULK of a walk.
+    """
+
+    def __init__(self, maxInFlight=256, bufferSize=65535):
+        """
+        Initialize the engine.
+
+        Args:
+            maxInFlight (int, optional): Maximum number of outstanding requests. Defaults to 256.
+            bufferSize (int, optional): The receive buffer size. Defaults to 65535.
+        """
+        self.maxInFlight = maxInFlight
+        self.bufferSize = bufferSize
+        self.sockets = {}
+        self.pending = {}
+        self.queue = deque()
+        self.timers = []
+        self.requestId = random.randint(1, 0x3fffffff)
+        self.stats = {'sent': 0, 'received': 0, 'dropped': 0, 'retries': 0, 'timeouts': 0}
+
+    def close(self):
+        """
+        Close the engine sockets.
+        """
+        for sock in self.sockets.values():
+            sock.close()
+        self.sockets = {}
+
+    def complete(self, request, error, varbinds):
+        """
+        Finish a request and call its callback.
+
+        Args:
+            request (SNMPRequest): The request.
+            error (str): The error, or None.
+            varbinds (list): The (oid, value) tuples of the response, or None.
+        """
+        self.pending.pop(request.requestId, None)
+        if request.discovery:
+            self.discovered(request, error)
+        else:
+            request.callback(request, error, varbinds)
+
+    def discovered(self, probe, error):
+        """
+        Release the requests waiting for the engine discovery of a v3 target.
+
+        Args:
+            probe (SNMPRequest): The discovery request.
+            error (str): The discovery error, or None.
+        """
+        target = probe.target
+        waiting, target.waiting = target.waiting or [], None
+        if not error and not target.engineId:
+            error = "SNMPv3 engine discovery failed"
+        if not error and target.authProtocol:
+            try:
+                target.authKey = USM.localizeKey(target.authPassword or '', target.engineId, target.authProtocol)
+            except ValueError as e:
+                error = str(e)
+        if error:
+            for request in waiting:
+                request.callback(request, error, None)
+            return
+        self.queue.extendleft(reversed(waiting))
+
+    def decode(self, data):
+        """
+        Decode a received datagram.
+
+        Args:
+            data (bytes): The datagram.
+
+        Returns:
+            tuple: The decoded SNMPv3 message (None for v1/v2c), the request ID and the PDU.
+        """
+        version = BER.decodeMessage(data)[0]
+        if version == 3:
+            message = USM.decodeMessageV3(data)
+            return message, message['msgId'], message['pdu']
+        version, community, pdu = BER.decodeCommunityMessage(data)
+        return None, pdu[1], pdu
+
+    def dispatch(self, data, address):
+        """
+        Handle a received datagram.
+
+        Args:
+            data (bytes): The datagram.
+            address (tuple): The sender address.
+        """
+        try:
+            message, requestId, pdu = self.decode(data)
+        except Exception:
+            # Malformed datagrams from one agent must not end the walks of the others
+            self.stats['dropped'] += 1
+            return
+        request = self.pending.get(requestId)
+        if request is None or address[0] != request.target.address[0]:
+            return
+        self.stats['received'] += 1
+        target = request.target
+        if message is not None:
+            if pdu[0] == BER.PduReport and message['engineId']:
+                target.engineId = message['engineId']
+                target.engineBoots = message['engineBoots']
+                target.engineTime = message['engineTime']
+                target.timeBase = time.time()
+            if request.discovery:
+                self.complete(request, None, None)
+                return
+            if target.authKey and pdu[0] != BER.PduReport:
+                if not message['flags'] & USM.FlagAuth or not USM.verify(message, target.authKey, target.authProtocol):
+                    return
+            if pdu[0] == BER.PduReport:
+                oid = pdu[4][0][0] if pdu[4] else None
+                if oid in (USM.OidNotInTimeWindows, USM.OidUnknownEngineIDs) and not request.reported:
+                    request.reported = True
+                    self.transmit(request)
+                    return
+                self.complete(request, "SNMPv3 report: {}".format(USM.reportName(oid)), None)
+                return
+        if pdu[2]:
+            name = BER.ErrorStatusNames[pdu[2]] if 0 <= pdu[2] < len(BER.ErrorStatusNames) else str(pdu[2])
+            request.errorIndex = pdu[3]
+            self.complete(request, "{} at index {}".format(name, pdu[3]), pdu[4])
+            return
+        self.complete(request, None, pdu[4])
+
+    def encode(self, request):
+        """
+        Encode the message of a request.
+
+        Args:
+            request (SNMPRequest): The request.
+
+        Returns:
+            bytes: The message.
+        """
+        target = request.target
+        varbinds = [(oid, None) for oid in request.oids]
+        if request.pduType == BER.PduGetBulk:
+            pdu = BER.encodePdu(request.pduType, request.requestId, varbinds, request.nonRepeaters, request.maxRepetitions)
+        else:
+            pdu = BER.encodePdu(request.pduType, request.requestId, varbinds)
+        if target.version != '3':
+            return BER.encodeMessage(0 if target.version == '1' else 1, target.community, pdu)
+        if request.discovery:
+            return USM.encodeMessageV3(request.requestId, USM.FlagReportable, b'', 0, 0, '', pdu)
+        flags = USM.FlagReportable | (USM.FlagAuth if target.authKey else 0)
+        engineTime = target.engineTime + int(time.time() - target.timeBase)
+        return USM.encodeMessageV3(request.requestId, flags, target.engineId, target.engineBoots, engineTime, target.user,
+                                   pdu, target.contextName, target.authKey, target.authProtocol)
+
+    def expire(self, now):
+        """
+        Retransmit or fail the requests whose response timed out.
+
+        Args:
+            now (float): The current time.
+        """
+        while self.timers and self.timers[0][0] <= now:
+            deadline, requestId, attempt = heapq.heappop(self.timers)
+            request = self.pending.get(requestId)
+            if request is None or request.attempt != attempt:
+                continue
+            if request.attempt < request.target.retries:
+                self.stats['retries'] += 1
+                self.transmit(request)
+            else:
+                self.stats['timeouts'] += 1
+                self.complete(request, "timeout", None)
+
+    def receive(self, sock):
+        """
+        Read the datagrams waiting on a socket.
+
+        Args:
+            sock (socket.socket): The socket.
+        """
+        while True:
+            try:
+                data, address = sock.recvfrom(self.bufferSize)
+            except socket.error:
+                return
+            self.dispatch(data, address)
+
+    def run(self, timeout=None):
+        """
+        Send the queued requests and process responses until all requests are complete.
+
+        Args:
+            timeout (float, optional): Overall deadline in seconds; requests still pending
+                                       then fail with a 'deadline exceeded' error. Defaults to None.
+        """
+        deadline = time.time() + timeout if timeout else None
+        while self.step(deadline):
+            pass
+
+    def step(self, deadline=None):
+        """
+        Send queued requests, then wait for responses until the next timer or the deadline.
+
+        Callers streaming results, such as table walks, run the engine with
+        step() and consume what the callbacks produced between steps.
+
+        Args:
+            deadline (float, optional): The time when all requests fail with a 'deadline exceeded' error. Defaults to None.
+
+        Returns:
+            bool: False once no request is queued or pending.
+        """
+        while self.queue and len(self.pending) < self.maxInFlight:
+            self.send(self.queue.popleft())
+        if not self.queue and not self.pending:
+            return False
+        now = time.time()
+        if deadline and now >= deadline:
+            self.abort("deadline exceeded")
+            return False
+        self.expire(now)
+        if self.pending:
+            wait = max(0.0, self.timers[0][0] - now) if self.timers else 0.1
+            if deadline:
+                wait = min(wait, deadline - now)
+            readable = select.select(list(self.sockets.values()), [], [], wait)[0]
+            for sock in readable:
+                self.receive(sock)
+        return True
+
+    def abort(self, error):
+        """
+        Fail all the queued and pending requests.
+
+        Args:
+            error (str): The error.
+        """
+        while self.queue or self.pending:
+            requests = list(self.queue) + list(self.pending.values())
+            self.queue.clear()
+            self.pending.clear()
+            for request in requests:
+                if request.discovery:
+                    self.discovered(request, error)
+                else:
+                    request.callback(request, error, None)
+        self.timers = []
+
+    def send(self, request):
+        """
+        Send a request, starting the engine discovery of its v3 target first if needed.
+
+        Args:
+            request (SNMPRequest): The request.
+        """
+        target = request.target
+        if target.version == '3' and target.engineId is None:
+            if target.waiting is None:
+                target.waiting = [request]
+                probe = SNMPRequest(target, BER.PduGet, [], None)
+                probe.discovery = True
+                self.transmit(probe)
+            else:
+                target.waiting.append(request)
+            return
+        self.transmit(request)
+
+    def socket(self, family):
+        """
+        Get the engine socket of an address family.
+
+        Args:
+            family (int): The address family.
+
+        Returns:
+            socket.socket: The non-blocking UDP socket.
+        """
+        sock = self.sockets.get(family)
+        if sock is None:
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1048576)
+            except socket.error:
+                pass
+            sock.bind(('::', 0) if family == getattr(socket, 'AF_INET6', None) else ('0.0.0.0', 0))
+            sock.setblocking(False)
+            self.sockets[family] = sock
+        return sock
+
+    def submit(self, target, pduType, oids, callback, nonRepeaters=0, maxRepetitions=0, context=None):
+        """
+        Queue a request.
+
+        Args:
+            target (SNMPTarget): The agent.
+            pduType (int): The PDU type, e.g. BER.PduGetBulk.
+            oids (list): The OIDs, as tuples of integers.
+            callback (callable): Function called with (request, error, varbinds) once the request is complete.
+            nonRepeaters (int, optional): The GETBULK non-repeaters. Defaults to 0.
+            maxRepetitions (int, optional): The GETBULK max-repetitions. Defaults to 0.
+            context (object, optional): Caller data kept on the request. Defaults to None.
+
+        Returns:
+            SNMPRequest: The request.
+        """
+        request = SNMPRequest(target, pduType, oids, callback, nonRepeaters, maxRepetitions, context)
+        self.queue.append(request)
+        return request
+
+    def transmit(self, request):
+        """
+        Send or resend the datagram of a request and arm its timer.
+
+        Args:
+            request (SNMPRequest): The request.
+        """
+        target = request.target
+        if request.requestId is None:
+            self.requestId = self.requestId % 0x7ffffffe + 1
+            request.requestId = self.requestId
+        else:
+            request.attempt += 1
+        self.pending[request.requestId] = request
+        try:
+            address = target.resolve()
+            self.socket(target.family).sendto(self.encode(request), address)
+        except (socket.error, socket.gaierror) as e:
+            self.complete(request, "{}: {}".format(type(e).__name__, e), None)
+            return
+        except ValueError as e:
+            self.complete(request, str(e), None)
+            return
+        self.stats['sent'] += 1
+        request.sentAt = time.time()
+        heapq.heappush(self.timers, (request.sentAt + target.timeout, request.requestId, request.attempt))
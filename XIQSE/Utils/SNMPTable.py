@@ -0,0 +1,213 @@
+import heapq
+import time
+
+from . import BER
+
+
+class SNMPRow(object):
+    """
+    Row of an SNMP table: the table index and one value per column.
+
+    Values are read by column name or position; columns missing from the
+    agent for this index are None.
+    """
+
+    __slots__ = ('host', 'index', 'values', 'positions')
+
+    def __init__(self, host, index, values, positions):
+        self.host = host
+        self.index = index
+        self.values = values
+        self.positions = positions
+
+    def __getitem__(self, name):
+        if isinstance(name, int):
+            return self.values[name]
+        return self.values[self.positions[name]]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return "SNMPRow({}, {}, {!r})".format(self.host, self.indexStr, self.toDict())
+
+    @property
+    def indexStr(self):
+        """
+        str: The table index as a dotted string, e.g. '1' for ifIndex 1.
+        """
+        return BER.formatOid(self.index)
+
+    def get(self, name, default=None):
+        pos = self.positions.get(name)
+        if pos is None or self.values[pos] is None:
+            return default
+        return self.values[pos]
+
+    def toDict(self):
+        """
+        Get the row as a dictionary of column name to value.
+
+        Returns:
+            dict: The values by column name.
+        """
+        return dict((name, self.values[pos]) for name, pos in self.positions.items())
+
+
+class TableWalk(object):
+    """
+    Walk of the columns of an SNMP table on one agent.
+
+    Each GETBULK carries the next OID of every unfinished column, so one
+    response returns several rows of all columns. Varbinds are decoded into
+    per-index value lists, and a row is emitted, in index order, as soon as
+    every unfinished column has gone past its index. Only the rows between
+    the slowest and the fastest column are buffered.
+
+    max-repetitions adapts to the agent: it doubles while full responses come
+    back within a quarter of the timeout, is capped to the number of repetitions of truncated
+    responses, and is halved after a timeout or a tooBig error. The cap doubles again after
+    RecoverAfter full responses in a row, so one truncated response or timeout does not
+    slow down the rest of the walk.
+    """
+
+    MaxRepetitions = 100
+    MaxRetries = 3
+    RecoverAfter = 4
+
+    def __init__(self, engine, target, columns, positions, emit, maxRepetitions=10):
+        """
+        Initialize the walk.
+
+        Args:
+            engine (SNMPEngine): The engine running the requests.
+            target (SNMPTarget): The agent.
+            columns (list): The column OIDs, as tuples of integers.
+            positions (dict): The column names to value positions.
+            emit (callable): Function called with each complete SNMPRow.
+            maxRepetitions (int, optional): The initial max-repetitions. Defaults to 10.
+        """
+        self.engine = engine
+        self.target = target
+        self.columns = columns
+        self.positions = positions
+        self.emit = emit
+        self.maxRepetitions = max(1, maxRepetitions)
+        self.limit = self.MaxRepetitions
+        self.cursors = [()] * len(columns)
+        self.active = list(range(len(columns)))
+        self.rows = {}
+        self.heap = []
+        self.retries = 0
+        self.streak = 0
+        self.requests = 0
+        self.rowCount = 0
+        self.error = None
+        self.done = False
+
+    def finish(self, error=None):
+        """
+        End the walk, emitting the buffered rows.
+
+        Args:
+            error (str, optional): The error that ended the walk. Defaults to None.
+        """
+        self.error = error
+        self.active = []
+        self.flush()
+        self.done = True
+
+    def flush(self):
+        """
+        Emit the rows that no unfinished column can still change.
+        """
+        bound = min(self.cursors[c] for c in self.active) if self.active else None
+        while self.heap and (bound is None or self.heap[0] <= bound):
+            index = heapq.heappop(self.heap)
+            self.rowCount += 1
+            self.emit(SNMPRow(self.target.host, index, tuple(self.rows.pop(index)), self.positions))
+
+    def onResponse(self, request, error, varbinds):
+        """
+        Handle a response: store its values, emit the complete rows and request the next ones.
+
+        Args:
+            request (SNMPRequest): The request.
+            error (str): The error, or None.
+            varbinds (list): The (oid, value) tuples.
+        """
+        self.requests += 1
+        if error:
+            self.streak = 0
+            retryable = error == 'timeout' or error.startswith('tooBig')
+            if retryable and self.retries < self.MaxRetries and (self.maxRepetitions > 1 or error == 'timeout'):
+                self.retries += 1
+                self.maxRepetitions = max(1, self.maxRepetitions // 2)
+                self.limit = min(self.limit, max(self.maxRepetitions, 1))
+                self.submit()
+                return
+            if self.target.version == '1' and error.startswith('noSuchName') and 0 < request.errorIndex <= len(self.active):
+                # v1 agents signal the end of the MIB view with noSuchName: only the column named ends
+                del self.active[request.errorIndex - 1]
+                self.flush()
+                if self.active:
+                    self.submit()
+                else:
+                    self.finish()
+            else:
+                self.finish(error)
+            return
+        self.retries = 0
+        active = self.active
+        count = len(active)
+        finished = set()
+        for i, (oid, value) in enumerate(varbinds):
+            col = active[i % count]
+            if col in finished:
+                continue
+            column = self.columns[col]
+            index = oid[len(column):]
+            if value is BER.EndOfMibView or oid[:len(column)] != column or index <= self.cursors[col]:
+                finished.add(col)
+                continue
+            row = self.rows.get(index)
+            if row is None:
+                row = self.rows[index] = [None] * len(self.columns)
+                heapq.heappush(self.heap, index)
+            if not isinstance(value, BER.VarBindException):
+                row[col] = value
+            self.cursors[col] = index
+        self.active = [c for c in active if c not in finished]
+        if request.pduType == BER.PduGetBulk and self.active:
+            repetitions = len(varbinds) // count
+            if repetitions < request.maxRepetitions:
+                self.limit = max(1, repetitions)
+                self.maxRepetitions = self.limit
+                self.streak = 0
+            else:
+                self.streak += 1
+                if self.streak >= self.RecoverAfter and self.limit < self.MaxRepetitions:
+                    self.limit = min(self.MaxRepetitions, self.limit * 2)
+                    self.streak = 0
+                if self.maxRepetitions < self.limit and time.time() - request.sentAt < self.target.timeout / 4.0:
+                    self.maxRepetitions = min(self.limit, self.maxRepetitions * 2)
+        self.flush()
+        if not self.active:
+            self.finish()
+        elif not varbinds:
+            self.finish("empty response")
+        else:
+            self.submit()
+
+    def submit(self):
+        """
+        Request the next rows of the unfinished columns.
+        """
+        oids = [self.columns[c] + self.cursors[c] for c in self.active]
+        if self.target.version == '1':
+            self.engine.submit(self.target, BER.PduGetNext, oids, self.onResponse)
+        else:
+            self.engine.submit(self.target, BER.PduGetBulk, oids, self.onResponse, 0, self.maxRepetitions)
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import re
+import threading
+import uuid
+
+# Shared by all the stores of the JVM, as concurrent workflow activities run in one process
+StoreLock = threading.Lock()
+
+
+class ScriptStore(object):
+    """
+    Content-addressed store of TFTP scripts.
+
+    Scripts are named after the hash of their content, so identical scripts
+    pushed to many devices are written once. Each device using a script holds
+    a reference, kept as a marker file so that concurrent workflow activities
+    see each other's references. Markers are named after a store ID unique to
+    each ScriptStore, as concurrent activities share the process ID. The
+    script is deleted when the last reference is released.
+    """
+
+    def __init__(self, root, prefix='xiqse'):
+        """
+        Initialize the store.
+
+        Args:
+            root (str): The TFTP root directory.
+            prefix (str, optional): Prefix of the script file names. Defaults to 'xiqse'.
+        """
+        self.root = root
+        self.prefix = prefix
+        self.refDir = os.path.join(root, '.' + prefix + '-refs')
+        self.storeId = uuid.uuid4().hex
+
+    def acquire(self, name, owner):
+        """
+        Add a reference to a script.
+
+        Args:
+            name (str): The script file name.
+            owner (str): The reference owner, e.g. the device IP address.
+        """
+        with StoreLock:
+            self.addRef(name, owner)
+
+    def addRef(self, name, owner):
+        """
+        Create a reference marker, with the store lock held.
+
+        Args:
+            name (str): The script file name.
+            owner (str): The reference owner.
+        """
+        if not os.path.isdir(self.refDir):
+            try:
+                os.makedirs(self.refDir)
+            except OSError:
+                if not os.path.isdir(self.refDir):
+                    raise
+        open(self.refPath(name, owner), 'w').close()
+
+    def put(self, lines, owner):
+        """
+        Store a script and add a reference to it.
+
+        Args:
+            lines (iterable): The script lines, without newlines.
+            owner (str): The reference owner, e.g. the device IP address.
+
+        Returns:
+            str: The script file name, relative to the TFTP root.
+        """
+        digest = hashlib.sha1()
+        tmpPath = os.path.join(self.root, '.{}.{}.{}.tmp'.format(self.prefix, self.storeId, threading.current_thread().name))
+        with open(tmpPath, 'w') as f:
+            for line in lines:
+                data = line + "\n"
+                f.write(data)
+                digest.update(data.encode('utf-8') if not isinstance(data, bytes) else data)
+            f.write("\n")
+        name = '{}.{}.src'.format(self.prefix, digest.hexdigest())
+        with StoreLock:
+            self.addRef(name, owner)
+            path = os.path.join(self.root, name)
+            if os.path.exists(path):
+                os.remove(tmpPath)
+            else:
+                os.rename(tmpPath, path)
+        return name
+
+    def refPath(self, name, owner):
+        """
+        Get the path of a reference marker file.
+
+        Args:
+            name (str): The script file name.
+            owner (str): The reference owner.
+
+        Returns:
+            str: The marker file path.
+        """
+        return os.path.join(self.refDir, '{}.{}.{}'.format(name, re.sub(r'[^\w.-]', '_', str(owner)), self.storeId))
+
+    def refs(self, name):
+        """
+        Get the references held on a script.
+
+        Args:
+            name (str): The script file name.
+
+        Returns:
+            list: The marker file names.
+        """
+        try:
+            return [x for x in os.listdir(self.refDir) if x.startswith(name + '.')]
+        except OSError:
+            return []
+
+    def release(self, name, owner):
+        """
+        Release a reference to a script, deleting the script after the last one.
+
+        Args:
+            name (str): The script file name.
+            owner (str): The reference owner.
+
+        Returns:
+            bool: True if the script was deleted, False otherwise.
+        """
+        with StoreLock:
+            try:
+                os.remove(self.refPath(name, owner))
+            except OSError:
+                pass
+            if self.refs(name):
+                return False
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+            return True
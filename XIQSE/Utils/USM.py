@@ -0,0 +1,203 @@
+"""
+SNMPv3 message format and User-based Security Model (RFC 3414).
+
+Supports the noAuthNoPriv and authNoPriv security levels with HMAC-MD5-96
+and HMAC-SHA-96 authentication. authPriv is not supported: privacy needs
+a DES or AES cipher, which the Python standard library does not provide,
+and the module is kept runnable outside of the Jython JVM.
+"""
+import hashlib
+import hmac
+
+from .BER import (BERError, TagInteger, TagOctetString, TagSequence, decodeInteger, decodeMessage,
+                  decodePdu, decodeTlv, encodeInteger, encodeTlv, formatOid, toBytes)
+
+AuthProtocols = {'MD5': hashlib.md5, 'SHA': hashlib.sha1}
+AuthParamLength = 12
+
+FlagAuth = 0x01
+FlagPriv = 0x02
+FlagReportable = 0x04
+
+SecurityModelUSM = 3
+MaxMessageSize = 65507
+
+OidUnsupportedSecLevels = (1, 3, 6, 1, 6, 3, 15, 1, 1, 1, 0)
+OidNotInTimeWindows = (1, 3, 6, 1, 6, 3, 15, 1, 1, 2, 0)
+OidUnknownUserNames = (1, 3, 6, 1, 6, 3, 15, 1, 1, 3, 0)
+OidUnknownEngineIDs = (1, 3, 6, 1, 6, 3, 15, 1, 1, 4, 0)
+OidWrongDigests = (1, 3, 6, 1, 6, 3, 15, 1, 1, 5, 0)
+
+ReportNames = {
+    OidUnsupportedSecLevels : 'usmStatsUnsupportedSecLevels',
+    OidNotInTimeWindows     : 'usmStatsNotInTimeWindows',
+    OidUnknownUserNames     : 'usmStatsUnknownUserNames',
+    OidUnknownEngineIDs     : 'usmStatsUnknownEngineIDs',
+    OidWrongDigests         : 'usmStatsWrongDigests',
+}
+
+
+def reportName(oid):
+    """
+    Get the name of a USM report counter.
+
+    Args:
+        oid (tuple): The report varbind OID.
+
+    Returns:
+        str: The counter name, or the dotted OID.
+    """
+    return ReportNames.get(oid) or formatOid(oid or ())
+
+
+def localizeKey(password, engineId, protocol):
+    """
+    Derive the localized authentication key of a password (RFC 3414 A.2).
+
+    Args:
+        password (str): The authentication password.
+        engineId (bytes): The authoritative engine ID.
+        protocol (str): The authentication protocol, 'MD5' or 'SHA'.
+
+    Returns:
+        bytes: The localized key.
+    """
+    hashFunc = AuthProtocols[protocol.upper()]
+    password = bytes(toBytes(password))
+    if not password:
+        raise ValueError("SNMPv3 authentication password is empty")
+    key = hashFunc((password * (1048576 // len(password) + 1))[:1048576]).digest()
+    return hashFunc(key + bytes(toBytes(engineId)) + key).digest()
+
+
+def sign(message, key, protocol):
+    """
+    Compute the authentication parameters of a message.
+
+    Args:
+        message (bytearray): The message, with zeroed authentication parameters.
+        key (bytes): The localized key.
+        protocol (str): The authentication protocol, 'MD5' or 'SHA'.
+
+    Returns:
+        bytearray: The 12 octet HMAC.
+    """
+    digest = hmac.new(key, bytes(message), AuthProtocols[protocol.upper()]).digest()
+    return bytearray(digest[:AuthParamLength])
+
+
+def encodeMessageV3(msgId, flags, engineId, engineBoots, engineTime, userName, pdu,
+                    contextName='', authKey=None, authProtocol=None):
+    """
+    Encode an SNMPv3 message, signing it when the authentication flag is set.
+
+    Args:
+        msgId (int): The message ID.
+        flags (int): The message flags (FlagAuth, FlagReportable).
+        engineId (bytes): The authoritative engine ID, empty for discovery.
+        engineBoots (int): The authoritative engine boots.
+        engineTime (int): The authoritative engine time.
+        userName (str): The user name.
+        pdu (bytearray): The encoded PDU.
+        contextName (str, optional): The context name. Defaults to ''.
+        authKey (bytes, optional): The localized authentication key. Defaults to None.
+        authProtocol (str, optional): The authentication protocol. Defaults to None.
+
+    Returns:
+        bytes: The message.
+    """
+    engineId = toBytes(engineId)
+    authParams = bytearray(AuthParamLength) if flags & FlagAuth else bytearray()
+    secBody = encodeTlv(TagOctetString, engineId) + encodeInteger(engineBoots) + encodeInteger(engineTime) + encodeTlv(TagOctetString, toBytes(userName))
+    authOffset = len(secBody) + 2
+    secBody += encodeTlv(TagOctetString, authParams) + encodeTlv(TagOctetString, bytearray())
+    secParams = encodeTlv(TagSequence, secBody)
+    secField = encodeTlv(TagOctetString, secParams)
+    authOffset += len(secField) - len(secBody)
+    header = encodeInteger(3) + encodeTlv(TagSequence, encodeInteger(msgId) + encodeInteger(MaxMessageSize) + encodeTlv(TagOctetString, bytearray((flags,))) + encodeInteger(SecurityModelUSM))
+    scopedPdu = encodeTlv(TagSequence, encodeTlv(TagOctetString, engineId) + encodeTlv(TagOctetString, toBytes(contextName)) + pdu)
+    body = header + secField + scopedPdu
+    message = encodeTlv(TagSequence, body)
+    if flags & FlagAuth:
+        authOffset += len(message) - len(body) + len(header)
+        message[authOffset:authOffset + AuthParamLength] = sign(message, authKey, authProtocol)
+    return bytes(message)
+
+
+def decodeMessageV3(data):
+    """
+    Decode an SNMPv3 message.
+
+    Args:
+        data (bytes or bytearray): The message.
+
+    Returns:
+        dict: The message fields: 'msgId', 'flags', 'engineId', 'engineBoots', 'engineTime',
+              'userName', 'authParams', 'authOffset', 'contextName', 'pdu' (see decodePdu) and 'data'.
+    """
+    version, data, pos, end = decodeMessage(data)
+    if version != 3:
+        raise BERError("not an SNMPv3 message")
+
+    def field(tag, pos, end):
+        fieldTag, start, fieldEnd = decodeTlv(data, pos, end)
+        if fieldTag != tag:
+            raise BERError("unexpected tag 0x{:02x} at {}".format(fieldTag, pos))
+        return start, fieldEnd
+
+    start, pos = field(TagSequence, pos, end)
+    values = []
+    for tag in (TagInteger, TagInteger, TagOctetString, TagInteger):
+        valueStart, start = field(tag, start, pos)
+        values.append((valueStart, start))
+    msgId = decodeInteger(data, *values[0])
+    flags = data[values[2][0]] if values[2][1] > values[2][0] else 0
+    if flags & FlagPriv:
+        raise BERError("encrypted SNMPv3 messages are not supported")
+
+    secStart, pos = field(TagOctetString, pos, end)
+    secStart, secEnd = field(TagSequence, secStart, pos)
+    secValues = []
+    for tag in (TagOctetString, TagInteger, TagInteger, TagOctetString, TagOctetString, TagOctetString):
+        valueStart, secStart = field(tag, secStart, secEnd)
+        secValues.append((valueStart, secStart))
+
+    scopedStart, scopedEnd = field(TagSequence, pos, end)
+    contextEngineStart, scopedStart = field(TagOctetString, scopedStart, scopedEnd)
+    contextNameStart, scopedStart = field(TagOctetString, scopedStart, scopedEnd)
+    return {
+        'msgId'       : msgId,
+        'flags'       : flags,
+        'engineId'    : bytes(data[secValues[0][0]:secValues[0][1]]),
+        'engineBoots' : decodeInteger(data, *secValues[1]),
+        'engineTime'  : decodeInteger(data, *secValues[2]),
+        'userName'    : bytes(data[secValues[3][0]:secValues[3][1]]),
+        'authParams'  : bytes(data[secValues[4][0]:secValues[4][1]]),
+        'authOffset'  : secValues[4][0],
+        'contextName' : bytes(data[contextNameStart:scopedStart]),
+        'pdu'         : decodePdu(data, scopedStart, scopedEnd),
+        'data'        : data,
+    }
+
+
+def verify(message, key, protocol):
+    """
+    Check the authentication parameters of a decoded message.
+
+    Args:
+        message (dict): The message, as returned by decodeMessageV3().
+        key (bytes): The localized authentication key.
+        protocol (str): The authentication protocol, 'MD5' or 'SHA'.
+
+    Returns:
+        bool: True if the message is authentic.
+    """
+    if len(message['authParams']) != AuthParamLength:
+        return False
+    data = bytearray(message['data'])
+    offset = message['authOffset']
+    data[offset:offset + AuthParamLength] = bytearray(AuthParamLength)
+    expected = bytes(sign(data, key, protocol))
+    if hasattr(hmac, 'compare_digest'):
+        return hmac.compare_digest(expected, message['authParams'])
+    return expected == message['authParams']
@@ -0,0 +1,109 @@
+import os
+
+
+class WarpBuffer(object):
+    """
+    Warp buffer streamed to a TFTP script file.
+
+    Commands are written to a temporary file as soon as they are added, so the
+    memory footprint does not depend on the script size. commit() renames the
+    temporary file to its final name, so the TFTP server never serves a
+    partially written script. A buffer closed without commit() deletes its
+    temporary file, e.g. when used as a context manager:
+
+        with WarpBuffer(path, header) as warpBuffer:
+            warpBuffer.add(cmd)
+            warpBuffer.commit()
+    """
+
+    def __init__(self, path, header=None, bufferSize=65536):
+        """
+        Initialize the warp buffer.
+
+        Args:
+            path (str): The final path of the script file.
+            header (list, optional): Lines written at the top of the script. Defaults to None.
+            bufferSize (int, optional): Size of the file write buffer in bytes. Defaults to 65536.
+        """
+        self.path = path
+        self.tmpPath = path + '.tmp'
+        self.header = header or []
+        self.bufferSize = bufferSize
+        self.file = None
+        self.lines = 0
+        self.bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.lines
+
+    def add(self, cmd):
+        """
+        Append a command line to the script.
+
+        Args:
+            cmd (str): The command line.
+        """
+        self.start()
+        self.write(cmd)
+        self.lines += 1
+
+    def close(self):
+        """
+        Release the buffer: the temporary script file is deleted unless commit() was called.
+        """
+        self.discard()
+
+    def commit(self):
+        """
+        Finish the script and move it to its final path.
+
+        Returns:
+            str: The path of the script file.
+        """
+        self.start()
+        self.write('')
+        self.file.close()
+        self.file = None
+        try:
+            os.rename(self.tmpPath, self.path)
+        except OSError:
+            os.remove(self.path)
+            os.rename(self.tmpPath, self.path)
+        return self.path
+
+    def discard(self):
+        """
+        Close and delete the temporary script file.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.tmpPath):
+            os.remove(self.tmpPath)
+        self.lines = 0
+        self.bytes = 0
+
+    def start(self):
+        """
+        Open the temporary script file and write the header, if not done yet.
+        """
+        if self.file is None:
+            self.file = open(self.tmpPath, 'w', self.bufferSize)
+            for line in self.header:
+                self.write(line)
+
+    def write(self, line):
+        """
+        Write a raw line to the script file.
+
+        Args:
+            line (str): The line, without newline.
+        """
+        self.file.write(line + "\n")
+        self.bytes += len(line) + 1
@@ -0,0 +1,235 @@
+import re
+
+from .Regex import RegexContextPatterns, RegexExitInstance, RegexModeExit
+
+PortRangeFamilies = ('Fabric Engine',)
+RegexPortInterface = re.compile('^( *interface +(?:gigabitethernet|fastethernet|ethernet|gig\S*) +)([\d/,\-]+) *$', re.IGNORECASE)
+
+
+class WarpBlock(object):
+    """
+    Context block of a warp script: the context header, its body and, for
+    port interface contexts, the ports it applies to.
+    """
+
+    __slots__ = ('header', 'key', 'body', 'depth', 'prefix', 'ports', 'streaming')
+
+    def __init__(self, header, portRanges):
+        self.header = header
+        self.key = ' '.join(header.split())
+        self.body = []
+        self.depth = 0
+        self.streaming = False
+        self.prefix = self.ports = None
+        portMatch = RegexPortInterface.match(header) if portRanges else None
+        if portMatch:
+            self.ports = parsePorts(portMatch.group(2))
+            if self.ports:
+                self.prefix = portMatch.group(1)
+
+    def bodyKey(self):
+        return [' '.join(x.split()) for x in self.body]
+
+    def lines(self):
+        header = self.header
+        if self.prefix and len(self.ports) > 1:
+            header = self.prefix + formatPorts(self.ports)
+        return [header] + self.body + ['exit']
+
+
+def parsePorts(portStr):
+    """
+    Parse a port list such as '1/1-1/4,2/1' into port tuples.
+
+    Args:
+        portStr (str): The port list.
+
+    Returns:
+        list: The port tuples, or None if the list cannot be parsed.
+    """
+    ports = []
+    for part in portStr.split(','):
+        bounds = part.split('-')
+        try:
+            first = tuple(int(x) for x in bounds[0].split('/'))
+            if len(bounds) == 1:
+                ports.append(first)
+                continue
+            last = tuple(int(x) for x in bounds[1].split('/'))
+        except ValueError:
+            return None
+        if len(bounds) != 2 or len(first) != len(last) or first[:-1] != last[:-1] or first[-1] > last[-1]:
+            return None
+        ports.extend(first[:-1] + (x,) for x in range(first[-1], last[-1] + 1))
+    return ports
+
+
+def formatPorts(ports):
+    """
+    Format port tuples as a compact port list such as '1/1-1/4,2/1'.
+
+    Args:
+        ports (list): The port tuples.
+
+    Returns:
+        str: The port list.
+    """
+    ranges = []
+    for port in sorted(set(ports)):
+        if ranges and ranges[-1][1][:-1] == port[:-1] and ranges[-1][1][-1] + 1 == port[-1]:
+            ranges[-1][1] = port
+        else:
+            ranges.append([port, port])
+    return ','.join(
+        '/'.join(map(str, first)) if first == last else '/'.join(map(str, first)) + '-' + '/'.join(map(str, last))
+        for first, last in ranges
+    )
+
+
+class WarpOptimizer(object):
+    """
+    Streaming optimizer for warp scripts.
+
+    Using the family RegexContextPatterns, the optimizer drops an exit
+    followed by a re-enter of the same context, and folds consecutive port
+    interface contexts with identical bodies into a single port range context.
+    Only one closed and one open context block are held in memory; blocks
+    larger than MaxBlockLines are passed through unchanged.
+    """
+
+    MaxBlockLines = 500
+
+    def __init__(self, family, sink):
+        """
+        Initialize the optimizer.
+
+        Args:
+            family (str): The device family.
+            sink (callable): Function receiving each optimized command line.
+        """
+        self.patterns = RegexContextPatterns.get(family)
+        self.portRanges = family in PortRangeFamilies
+        self.sink = sink
+        self.block = None
+        self.pending = None
+        self.linesIn = 0
+        self.linesOut = 0
+
+    def add(self, cmd):
+        """
+        Feed a command line to the optimizer.
+
+        Args:
+            cmd (str): The command line.
+        """
+        self.linesIn += 1
+        if not self.patterns:
+            self.emit(cmd)
+            return
+        block = self.block
+        if block is None:
+            if self.patterns[0].match(cmd):
+                key = ' '.join(cmd.split())
+                if self.pending and self.pending.key == key and not (self.pending.ports and len(self.pending.ports) > 1):
+                    self.block, self.pending = self.pending, None
+                else:
+                    self.block = WarpBlock(cmd, self.portRanges)
+            else:
+                self.flushPending()
+                self.emit(cmd)
+            return
+
+        if RegexModeExit.match(cmd):
+            if block.depth == 0:
+                self.closeBlock()
+                return
+            block.depth -= 1
+        elif block.depth + 1 < len(self.patterns) and self.patterns[block.depth + 1].match(cmd):
+            block.depth += 1
+        elif RegexExitInstance.match(cmd) or (block.depth == 0 and self.patterns[0].match(cmd)):
+            self.flushPending()
+            self.flushBlock()
+            self.add(cmd)
+            self.linesIn -= 1
+            return
+
+        if block.streaming:
+            self.emit(cmd)
+            return
+        block.body.append(cmd)
+        if len(block.body) > self.MaxBlockLines:
+            self.flushPending()
+            for line in block.lines()[:-1]:
+                self.emit(line)
+            block.streaming = True
+            block.body = []
+
+    def closeBlock(self):
+        """
+        Close the open block, merging it into the pending block when possible.
+        """
+        block, self.block = self.block, None
+        if block.streaming:
+            self.emit('exit')
+            return
+        pending = self.pending
+        if pending and pending.prefix and block.prefix and pending.prefix.lower() == block.prefix.lower() and pending.bodyKey() == block.bodyKey():
+            pending.ports.extend(block.ports)
+            return
+        self.flushPending()
+        self.pending = block
+
+    def emit(self, cmd):
+        """
+        Send a command line to the sink.
+
+        Args:
+            cmd (str): The command line.
+        """
+        self.linesOut += 1
+        self.sink(cmd)
+
+    def finish(self):
+        """
+        Flush the blocks held in memory. Call once after the last command.
+        """
+        self.flushPending()
+        self.flushBlock()
+
+    def flushBlock(self):
+        """
+        Emit the open block as is, without its exit.
+        """
+        block, self.block = self.block, None
+        if block and not block.streaming:
+            for line in block.lines()[:-1]:
+                self.emit(line)
+
+    def flushPending(self):
+        """
+        Emit the pending closed block.
+        """
+        pending, self.pending = self.pending, None
+        if pending:
+            for line in pending.lines():
+                self.emit(line)
+
+    def optimize(self, cmdList):
+        """
+        Optimize a complete list of command lines.
+
+        Args:
+            cmdList (list): The command lines.
+
+        Returns:
+            list: The optimized command lines.
+        """
+        output = []
+        sink, self.sink = self.sink, output.append
+        try:
+            for cmd in cmdList:
+                self.add(cmd)
+            self.finish()
+        finally:
+            self.sink = sink
+        return output
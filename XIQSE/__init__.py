@@ -1,17 +1,24 @@
+import json
 import os
 import re
+import tempfile
 import time
 
 from .CLI import CLI
 from .CSV import CSV
+from .Fleet import Fleet
 from .GraphQL import GraphQL
 from .OS import OS
 from .SNMP import SNMP
 from .Netbox import Netbox
 
+from .Utils.ErrorClassifier import ErrorClassifier
 from .Utils.Family import FamilyChildren
 from .Utils.Logger import Logger
-from .Utils.Regex import RegexError, RegexNoError, RegexPrompt
+from .Utils.Metrics import Metrics
+from .Utils.OutputView import OutputView
+from .Utils.Profiler import Profiler
+from .Utils.Regex import RegexPrompt
 
 __version__ = "25.0.0.0-1"
 
@@ -20,11 +27,11 @@ class XIQSE(object):
     Main class for the XIQSE SDK.
     
     This class initializes and manages the various components of the SDK, including
-    CLI, CSV, GraphQL, OS, SNMP, and Netbox modules. It also provides utility
+    CLI, CSV, Fleet, GraphQL, OS, SNMP, and Netbox modules. It also provides utility
     methods for logging, error handling, and variable management.
     """
 
-    def __init__(self, emc_cli, emc_nbi, emc_results, emc_vars, log_level=None, sanity=False):
+    def __init__(self, emc_cli, emc_nbi, emc_results, emc_vars, log_level=None, sanity=False, metrics=None):
         """
         Initialize the XIQSE SDK context.
 
@@ -35,24 +42,38 @@ class XIQSE(object):
             emc_vars: The EMC Variables dictionary provided by the environment.
             log_level (str, optional): The logging level. Defaults to None (uses workflowLogLevel or "INFO").
             sanity (bool, optional): Whether to run in sanity/debug mode. Defaults to False.
+            metrics (bool, optional): Whether to collect CLI, NBI and Netbox latency metrics. Defaults to None (uses workflowMetrics or False).
+
+        The workflowLogBuffered and workflowLogFormat ('json') variables turn on
+        buffered and JSON-lines logging. Setting the workflowProfile variable ('true' for cProfile, 'sample' for
+        the sampling profiler) profiles the workflow until close() or exitError().
         """
-        self.emc_cli = emc_cli
-        self.emc_nbi = emc_nbi
         self.emc_results = emc_results
         self.emc_vars = emc_vars
 
+        if metrics is None:
+            metrics = str(self.emc_vars.get("workflowMetrics", "")).lower() in ('1', 'true', 'yes', 'on')
+        self.Metrics = Metrics(metrics)
+        self.emc_cli = self.Metrics.wrap(emc_cli, 'cli')
+        self.emc_nbi = self.Metrics.wrap(emc_nbi, 'nbi')
+
         effective_log_level = (
             log_level
             or self.emc_vars.get("workflowLogLevel")
             or "INFO"
         )
 
-        self.logger = Logger(effective_log_level)
+        self.logger = Logger(
+            effective_log_level,
+            buffered=str(self.emc_vars.get("workflowLogBuffered", "")).lower() in ('1', 'true', 'yes', 'on'),
+            jsonLines=str(self.emc_vars.get("workflowLogFormat", "")).lower() == 'json',
+        )
         self.version = __version__
         self.sanity = sanity
 
         self.CLI = CLI(self)
         self.CSV = CSV(self)
+        self.Fleet = Fleet(self)
         self.GraphQL = GraphQL(self)
         self.OS = OS(self)
         self.SNMP = SNMP(self)
@@ -61,6 +82,12 @@ class XIQSE(object):
         self.Family = None
         self.setFamily()
 
+        self.Profiler = None
+        profileMode = str(self.emc_vars.get("workflowProfile", "")).lower()
+        if profileMode and profileMode not in ('0', 'false', 'no', 'off'):
+            self.Profiler = Profiler('sample' if profileMode == 'sample' else 'cprofile')
+            self.Profiler.start()
+
     def abortError(self, cmd, errorOutput):
         """
         Abort the script execution due to an error on a command.
@@ -100,38 +127,54 @@ class XIQSE(object):
         Returns:
             str: The cleaned output string.
         """
-        if re.match(r'Error:', outputStr):
-            return outputStr
-        outputLines = outputStr.splitlines()
-        lastLine = outputLines[-1]
-        if RegexPrompt.match(lastLine):
-            return '\n'.join(outputLines[1:-1])
-        else:
-            return '\n'.join(outputLines[1:])
+        return self.outputView(outputStr).text()
     
-    def cliError(self, outputStr):
+    def cliError(self, outputStr, family=None):
         """
         Check if the output contains CLI errors.
 
         Args:
-            outputStr (str): The output string to check.
+            outputStr (str or OutputView): The output string or view to check.
+            family (str, optional): The device family. Defaults to the context family.
 
         Returns:
             bool: True if an error is detected and not in the ignore list, False otherwise.
         """
-        if not RegexNoError.search(outputStr) and RegexError.search(outputStr):
-            return True
-        else:
-            return False
+        return self.cliErrorCode(outputStr, family) is not None
+    
+    def cliErrorCode(self, outputStr, family=None):
+        """
+        Classify the CLI error of an output, using the rules of the device family.
+
+        Args:
+            outputStr (str or OutputView): The output string or view to check.
+            family (str, optional): The device family. Defaults to the context family.
+
+        Returns:
+            ErrorMatch: The error code and the error line, or None if no error is detected.
+        """
+        return ErrorClassifier.forFamily(family or self.getFamily()).classify(outputStr)
     
     def close(self):
         """
         Close underlying EMC CLI connections and resources.
 
         This should be called at the end of the workflow to ensure that
-        any open CLI sessions are properly terminated.
+        any open CLI sessions are properly terminated. With metrics enabled,
+        the report is put in the workflowMetricsReport result and written to a
+        metrics.json file.
         """
+        self.Fleet.close()
+        self.CLI.warpBufferClose()
         self.emc_cli.close()
+        self.stopProfiler()
+        self.logger.flush()
+        if self.Metrics.enabled:
+            report = self.Metrics.report()
+            self.emc_results.put("workflowMetricsReport", json.dumps(report, sort_keys=True))
+            path = self.outputPath('metrics.json')
+            self.Metrics.write(path)
+            self.debug("Metrics written to %s", path)
     
     def debug(self, msg, *args):
         """
@@ -170,6 +213,9 @@ class XIQSE(object):
             self.emc_results.put("activityMessage", errorOutput)
             self.emc_results.put("workflowMessage", errorOutput)
         self.emc_results.setStatus(self.emc_results.Status.ERROR)
+        self.CLI.warpBufferClose()
+        self.stopProfiler()
+        self.logger.flush()
         raise RuntimeError(errorOutput)
     
     def getFamily(self):
@@ -239,6 +285,63 @@ class XIQSE(object):
         """
         self.logger.info(msg, *args)
     
+    def outputView(self, outputStr):
+        """
+        Get a view of the command output without the echoed command and prompt.
+
+        The view references the raw output and only stores offsets, so no
+        line splitting or copying takes place.
+
+        Args:
+            outputStr (str): The raw output string.
+
+        Returns:
+            OutputView: The cleaned output view.
+        """
+        if outputStr.startswith('Error:'):
+            return OutputView(outputStr)
+        return OutputView(outputStr).trimPrompt(RegexPrompt)
+    
+    def outputPath(self, suffix):
+        """
+        Get the path of a file written by the workflow, next to the script when possible.
+
+        Args:
+            suffix (str): The file name suffix, e.g. 'metrics.json'.
+
+        Returns:
+            str: The file path.
+        """
+        directory = os.path.dirname(self.emc_vars.get('javax.script.filename') or '')
+        if not directory or not os.access(directory, os.W_OK):
+            directory = tempfile.gettempdir()
+        return os.path.join(directory, "{}.{}".format(self.scriptName() or 'xiqse', suffix))
+    
+    def profile(self, func, *args, **kwargs):
+        """
+        Run a function under the profiler and write the profile next to the script.
+
+        The profile mode is read from workflowProfile ('sample' for the
+        sampling profiler only, else cProfile). When the whole workflow is
+        already profiled, the function is simply called.
+
+        Args:
+            func (callable): The function to run, e.g. the workflow main().
+            *args: The function positional arguments.
+            **kwargs: The function keyword arguments.
+
+        Returns:
+            any: The function return value.
+        """
+        if self.Profiler:
+            return func(*args, **kwargs)
+        profiler = Profiler('sample' if str(self.emc_vars.get("workflowProfile", "")).lower() == 'sample' else 'cprofile')
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            paths = profiler.write(self.outputPath('profile.' + getattr(func, '__name__', 'func')))
+            self.log("Profile written to %s", ', '.join(paths))
+    
     def printHeader(self, scriptVersion = '1.0', scriptAuthor = None, fullInfo = False):
         """
         Print the script header information.
@@ -317,6 +420,24 @@ class XIQSE(object):
         """
         self.emc_results.put(key, value)
     
+    def stopProfiler(self):
+        """
+        Stop the workflow profiler, if running, and write the profile next to the script.
+
+        Called by close() and exitError(); only the first call writes the
+        profile. No exit hook is registered, as the XIQ-SE JVM outlives the
+        workflows: a workflow ending otherwise should call it itself.
+        """
+        profiler, self.Profiler = self.Profiler, None
+        if profiler is None:
+            return
+        profiler.stop()
+        try:
+            paths = profiler.write(self.outputPath('profile'))
+            self.log("Profile written to %s", ', '.join(paths))
+        except (IOError, OSError) as e:
+            self.error("Unable to write the profile: %s", e)
+    
     def warning(self, msg, *args):
         """
         Log a warning message.
@@ -345,34 +466,14 @@ class XIQSE(object):
             self.log("Sanity mode enabled: skipping actual ping, returning True")
             return True
 
-        startTime = time.time()
-        remainingTime = timeout
-        
-        while remainingTime >= 0:
-            timeBeforePing = time.time()
-            
-            # Use appropriate ping command based on OS (assuming Linux/XIQ-SE environment based on user snippet)
-            # -c 1: count 1
-            # -W 1: wait 1 second for response (to keep loop responsive)
-            cmd = "ping -c 1 -W 1 {}".format(ip)
-            self.debug("Executing: {}".format(cmd))
-            
-            response = os.system(cmd)
-            
-            pingTime = time.time() - timeBeforePing
-            
-            if response == 0:
-                self.log("Reply from {}".format(ip))
-                return True
-                
-            # Wait consistent delay till next ping
-            sleepTime = interval - pingTime
-            if sleepTime > 0:
-                time.sleep(sleepTime)
-                
-            remainingTime = timeout - (time.time() - startTime)
-            if remainingTime > 0:
-                self.debug("Ping failed, remaining timeout {} secs".format(int(remainingTime)))
-                
+        result = self.OS.sweep([ip], timeout=timeout, interval=interval, methods=('icmp', 'subprocess'))[ip]
+        if result['reachable']:
+            self.log("Reply from {}".format(ip))
+            self.debug("Ping %s: first reply after %.1f secs (%s, %d attempts)", ip, result['firstReply'], result['method'], result['attempts'])
+            return True
+        if result['error']:
+            self.error("Unable to ping IP {}: {}".format(ip, result['error']))
+            return False
+
         self.log("Timeout reached. IP {} did not respond within {} seconds".format(ip, timeout))
         return False
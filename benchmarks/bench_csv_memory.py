@@ -0,0 +1,120 @@
+"""
+Memory benchmark of parsed CSV tables.
+
+Compares the dictionary-per-row storage of CSV.read with the compact
+CSVRow storage on a generated inventory sheet (default: 100,000 rows,
+40 columns, with repeated values as in real inventories).
+
+Memory is measured with tracemalloc when available (CPython 3), otherwise
+estimated with sys.getsizeof over the rows and their values.
+
+Usage:
+    python benchmarks/bench_csv_memory.py [rows] [columns]
+"""
+import csv
+import gc
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'XIQSE'))
+
+from Utils.CSVRow import CSVSchema
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def buildCsv(path, rows, columns):
+    with open(path, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(['serial_number'] + ['column_{}'.format(x) for x in range(1, columns)])
+        for i in range(rows):
+            writer.writerow(['SN{:08d}'.format(i)] + ['value_{}'.format((i + x) % 50 if x % 4 else i) for x in range(1, columns)])
+
+
+def loadDict(path):
+    table = {}
+    with open(path) as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        indexKey, valueKeys = header[0], [x.strip() for x in header[1:]]
+        for row in reader:
+            rowData = dict(zip(valueKeys, [x.strip() for x in row[1:]]))
+            rowData[indexKey] = row[0]
+            table[row[0]] = rowData
+    return table
+
+
+def loadCompact(path):
+    table = {}
+    with open(path) as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        schema = CSVSchema([header[0]] + [x.strip() for x in header[1:]])
+        for row in reader:
+            table[row[0]] = schema.row(row[0], [x.strip() for x in row[1:]])
+    return table
+
+
+def estimate(table):
+    seen = set()
+    total = sys.getsizeof(table)
+
+    def size(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        return sys.getsizeof(obj)
+
+    for key, row in table.items():
+        total += size(key)
+        if isinstance(row, dict):
+            total += size(row)
+            for name, value in row.items():
+                total += size(name) + size(value)
+        else:
+            total += size(row) + size(row.data)
+            for value in row.data:
+                total += size(value)
+    return total
+
+
+def measure(loader, path):
+    gc.collect()
+    startTime = time.time()
+    if tracemalloc:
+        tracemalloc.start()
+        table = loader(path)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    else:
+        table = loader(path)
+        memory = estimate(table)
+    return table, memory, time.time() - startTime
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    path = os.path.join(tempfile.gettempdir(), 'bench_csv_memory.csv')
+    buildCsv(path, rows, columns)
+    try:
+        dictTable, dictMemory, dictTime = measure(loadDict, path)
+        del dictTable
+        compactTable, compactMemory, compactTime = measure(loadCompact, path)
+        del compactTable
+    finally:
+        os.remove(path)
+    print("{} rows x {} columns".format(rows, columns))
+    print("{:<10} {:>12} {:>10}".format("storage", "memory (MB)", "load (s)"))
+    print("{:<10} {:>12.1f} {:>10.2f}".format("dict", dictMemory / 1048576.0, dictTime))
+    print("{:<10} {:>12.1f} {:>10.2f}".format("compact", compactMemory / 1048576.0, compactTime))
+    print("ratio      {:>11.2f}x".format(float(dictMemory) / compactMemory))
+
+
+if __name__ == '__main__':
+    main()
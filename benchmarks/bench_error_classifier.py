@@ -0,0 +1,72 @@
+"""
+Throughput benchmark of the CLI error check.
+
+Compares the legacy RegexError/RegexNoError check with the per-family
+ErrorClassifier on a set of Fabric Engine and Switch Engine output heads,
+and lists the outputs on which both checks disagree.
+
+Usage:
+    python benchmarks/bench_error_classifier.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'XIQSE'))
+
+from Utils.ErrorClassifier import ErrorClassifier
+from Utils.Regex import RegexError, RegexNoError
+
+OUTPUTS = {
+    'Fabric Engine' : [
+        "",
+        "Port     Status   Speed\n1/1      up       1000\n1/2      down     1000",
+        "VLAN 10 created",
+        "% Invalid input detected at '^' marker.",
+        "% Incomplete command.",
+        "% VLAN 4000 does not exist",
+        "% Saving 40562 bytes to flash:startup-config",
+        "Error: Permission denied",
+        "Description : bad cable on port 1/5\nStatus : up",
+        "ISIS adjacency unable to form on port 1/3 (expected)",
+    ],
+    'Switch Engine' : [
+        "",
+        "Port  State  Link\n1     E      A\n2     E      R",
+        "%% Invalid input detected at '^' marker.",
+        "%% Unrecognized command: \"shw\"",
+        "Error: VLAN \"foo\" does not exist.",
+        "Ports          : 1-8 (no failed links)",
+        "Port 3 name set to 'not allowed-guest'",
+    ],
+}
+
+
+def legacyCheck(outputStr):
+    return bool(not RegexNoError.search(outputStr) and RegexError.search(outputStr))
+
+
+def classifierCheck(classifier, outputStr):
+    return classifier.classify(outputStr) is not None
+
+
+def main():
+    print("{:<14} {:>16} {:>16} {:>8}".format("family", "legacy (out/s)", "rules (out/s)", "speedup"))
+    for family, outputs in sorted(OUTPUTS.items()):
+        classifier = ErrorClassifier.forFamily(family)
+        outputs = outputs * 1000
+        number = 5
+        legacy = min(timeit.repeat(lambda: [legacyCheck(x) for x in outputs], number=number, repeat=3)) / number
+        rules = min(timeit.repeat(lambda: [classifierCheck(classifier, x) for x in outputs], number=number, repeat=3)) / number
+        print("{:<14} {:>16.0f} {:>16.0f} {:>7.2f}x".format(family, len(outputs) / legacy, len(outputs) / rules, legacy / rules))
+    print("")
+    for family, outputs in sorted(OUTPUTS.items()):
+        classifier = ErrorClassifier.forFamily(family)
+        for outputStr in outputs:
+            match = classifier.classify(outputStr)
+            if legacyCheck(outputStr) != (match is not None):
+                print("{:<14} legacy={:<5} rules={:<14} {!r}".format(family, str(legacyCheck(outputStr)), str(match.code if match else None), outputStr[:50]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Microbenchmark of the CLI output handling path.
+
+Compares the legacy string path (cleanOutput, head join, re.findall) with the
+OutputView path on 1 KB, 1 MB and 50 MB outputs.
+
+Usage:
+    python benchmarks/bench_output_view.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'XIQSE', 'Utils'))
+
+from OutputView import OutputView
+from Regex import RegexError, RegexNoError, RegexPrompt
+
+SIZES = [
+    ('1 KB', 1024),
+    ('1 MB', 1024 * 1024),
+    ('50 MB', 50 * 1024 * 1024),
+]
+LINE = "1/{0:<5} up      up      1000    full    auto    enable  ISIS adjacency {0}\n"
+REGEX = re.compile(r'^1/(\d+) +up +up', re.MULTILINE)
+
+
+def buildOutput(size):
+    lines = ["show interfaces gigabitEthernet\n"]
+    total = len(lines[0])
+    i = 0
+    while total < size:
+        line = LINE.format(i)
+        lines.append(line)
+        total += len(line)
+        i += 1
+    lines.append("VSP-8284XSQ:1#")
+    return ''.join(lines)
+
+
+def legacyPath(outputStr):
+    outputLines = outputStr.splitlines()
+    if RegexPrompt.match(outputLines[-1]):
+        outputStr = '\n'.join(outputLines[1:-1])
+    else:
+        outputStr = '\n'.join(outputLines[1:])
+    head = "\n".join(outputStr.split("\n")[:4])
+    error = not RegexNoError.search(head) and RegexError.search(head)
+    return error, re.findall(REGEX, outputStr)
+
+
+def viewPath(outputStr):
+    view = OutputView(outputStr).trimPrompt(RegexPrompt)
+    head = view.head(4)
+    error = not head.search(RegexNoError) and head.search(RegexError)
+    return error, view.findall(REGEX)
+
+
+def main():
+    print("{:<8} {:>14} {:>14} {:>8}".format("size", "legacy (ms)", "view (ms)", "speedup"))
+    for label, size in SIZES:
+        outputStr = buildOutput(size)
+        assert legacyPath(outputStr) == viewPath(outputStr)
+        number = max(1, int(2000000 / size))
+        legacy = min(timeit.repeat(lambda: legacyPath(outputStr), number=number, repeat=3)) / number
+        view = min(timeit.repeat(lambda: viewPath(outputStr), number=number, repeat=3)) / number
+        print("{:<8} {:>14.3f} {:>14.3f} {:>7.2f}x".format(label, legacy * 1000, view * 1000, legacy / view))
+
+
+if __name__ == '__main__':
+    main()
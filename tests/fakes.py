@@ -0,0 +1,112 @@
+"""
+Fake XIQ-SE environment objects (emc_cli, emc_results) for the tests.
+
+The XIQSE package needs its runtime dependencies (requests); tests using
+loadXIQSE() are skipped when they are not installed.
+"""
+import os
+import sys
+import unittest
+
+RepoRoot = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for path in (RepoRoot, os.path.join(RepoRoot, 'XIQSE')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+class FakeResult(object):
+    """
+    Result of a fake emc_cli send.
+    """
+
+    def __init__(self, output, error=None):
+        self.output = output
+        self.error = error
+
+    def isSuccess(self):
+        return self.error is None
+
+    def getOutput(self):
+        return self.output
+
+    def getError(self):
+        return self.error
+
+
+class FakeCli(object):
+    """
+    Fake emc_cli session: each command is echoed, followed by the responder output and a prompt.
+    """
+
+    def __init__(self, responder=None, prompt="VSP-8284XSQ:1#"):
+        self.responder = responder or (lambda cmd: "")
+        self.prompt = prompt
+        self.sent = []
+        self.ip = None
+
+    def close(self):
+        pass
+
+    def getUser(self):
+        return 'root'
+
+    def send(self, cmd, waitForPrompt=True):
+        self.sent.append(cmd)
+        output = self.responder(cmd)
+        if isinstance(output, FakeResult):
+            return output
+        return FakeResult(cmd + "\n" + output + "\n" + self.prompt)
+
+    def setIpAddress(self, ip):
+        self.ip = ip
+
+
+class FakeResults(object):
+    """
+    Fake emc_results.
+    """
+
+    class Status(object):
+        ERROR = 'ERROR'
+
+    def __init__(self):
+        self.values = {}
+        self.status = None
+
+    def put(self, key, value):
+        self.values[key] = value
+
+    def setStatus(self, status):
+        self.status = status
+
+
+def loadXIQSE():
+    """
+    Import the XIQSE class, skipping the test when the package dependencies are missing.
+
+    Returns:
+        class: The XIQSE class.
+    """
+    try:
+        from XIQSE import XIQSE
+    except (ImportError, SyntaxError) as e:
+        raise unittest.SkipTest("XIQSE package not importable: {}".format(e))
+    return XIQSE
+
+
+def makeXIQSE(responder=None, **emcVars):
+    """
+    Build a XIQSE context on a fake emc_cli session.
+
+    Args:
+        responder (callable, optional): Function returning the output of a command. Defaults to None.
+        **emcVars: The emc_vars overriding the defaults.
+
+    Returns:
+        XIQSE: The context.
+    """
+    XIQSE = loadXIQSE()
+    variables = {'family': 'Universal Platform Fabric Engine', 'deviceIP': '10.0.0.1', 'serverIP': '10.0.0.9',
+                 'userName': 'root', 'workflowName': 'test'}
+    variables.update(emcVars)
+    return XIQSE(FakeCli(responder), None, FakeResults(), variables)
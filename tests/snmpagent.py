@@ -0,0 +1,286 @@
+"""
+Simulated SNMP agent, the test fixture of the SNMP module.
+"""
+import bisect
+import random
+import socket
+import threading
+import time
+from collections import namedtuple
+
+import fakes  # noqa: F401, puts the XIQSE directory on sys.path
+from Utils import BER
+from Utils import USM
+
+MibValue = namedtuple('MibValue', ['value', 'tag'])
+
+
+class SNMPAgent(object):
+    """
+    Simulated SNMP agent serving a static MIB on a local UDP port.
+
+    Answers GET, GETNEXT and GETBULK for v1, v2c and v3 (noAuthNoPriv and
+    authNoPriv, with engine discovery and time window reports). Meant for
+    testing the SNMP module without devices: it can drop requests to
+    exercise retries and limit the response size to exercise GETBULK
+    truncation.
+
+    Example:
+        mib = {'1.3.6.1.2.1.1.5.0': 'switch1', '1.3.6.1.2.1.2.2.1.10.1': MibValue(1234, BER.TagCounter32)}
+        with SNMPAgent(mib) as agent:
+            XIQSE.SNMP.get('127.0.0.1', ['1.3.6.1.2.1.1.5.0'], port=agent.port)
+    """
+
+    def __init__(self, mib, community='public', users=None, host='127.0.0.1', port=0, engineId=None,
+                 maxResponseSize=65507, dropRate=0.0):
+        """
+        Initialize the agent.
+
+        Args:
+            mib (dict): The OID to value dictionary; use MibValue for typed values such as counters.
+            community (str, optional): The v1/v2c community. Defaults to 'public'.
+            users (dict, optional): The v3 users: name to (authProtocol, authPassword), or None for noAuthNoPriv.
+                                    Defaults to None.
+            host (str, optional): The listening address. Defaults to '127.0.0.1'.
+            port (int, optional): The listening port, 0 for any free port. Defaults to 0.
+            engineId (bytes, optional): The engine ID. Defaults to a fixed test engine ID.
+            maxResponseSize (int, optional): The largest response, in bytes. Defaults to 65507.
+            dropRate (float, optional): The fraction of requests silently dropped. Defaults to 0.0.
+        """
+        self.mib = {}
+        for oid, value in mib.items():
+            if not isinstance(value, MibValue):
+                value = MibValue(value, None)
+            self.mib[BER.parseOid(oid)] = value
+        self.oids = sorted(self.mib)
+        self.community = bytes(BER.toBytes(community))
+        self.engineId = engineId or b'\x80\x00\x1f\x88\x04xiqse-agent'
+        self.engineBoots = 1
+        self.startTime = time.time()
+        self.users = {}
+        for name, auth in (users or {}).items():
+            protocol = auth[0].upper() if auth else None
+            key = USM.localizeKey(auth[1], self.engineId, protocol) if auth else None
+            self.users[bytes(BER.toBytes(name))] = (protocol, key)
+        self.host = host
+        self.port = port
+        self.maxResponseSize = maxResponseSize
+        self.dropRate = dropRate
+        self.requests = 0
+        self.sock = None
+        self.thread = None
+        self.running = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+
+    def get(self, oid):
+        """
+        Get the value of an OID.
+
+        Args:
+            oid (tuple): The OID.
+
+        Returns:
+            tuple: The OID, the value and its tag.
+        """
+        value = self.mib.get(oid)
+        if value is not None:
+            return oid, value.value, value.tag
+        pos = bisect.bisect_left(self.oids, oid[:-1])
+        exists = pos < len(self.oids) and self.oids[pos][:len(oid) - 1] == oid[:-1]
+        return oid, BER.NoSuchInstance if exists else BER.NoSuchObject, None
+
+    def getNext(self, oid):
+        """
+        Get the OID following an OID, and its value.
+
+        Args:
+            oid (tuple): The OID.
+
+        Returns:
+            tuple: The next OID, the value and its tag; endOfMibView past the last OID.
+        """
+        pos = bisect.bisect_right(self.oids, oid)
+        if pos >= len(self.oids):
+            return oid, BER.EndOfMibView, None
+        nextOid = self.oids[pos]
+        value = self.mib[nextOid]
+        return nextOid, value.value, value.tag
+
+    def handle(self, data):
+        """
+        Build the response to a request.
+
+        Args:
+            data (bytes): The request.
+
+        Returns:
+            bytes: The response, or None to stay silent.
+        """
+        version = BER.decodeMessage(data)[0]
+        if version == 3:
+            return self.handleV3(USM.decodeMessageV3(data))
+        version, community, pdu = BER.decodeCommunityMessage(data)
+        if community != self.community:
+            return None
+        response = self.respond(pdu, version)
+        return BER.encodeMessage(version, community, response) if response else None
+
+    def handleV3(self, message):
+        """
+        Build the response to an SNMPv3 request.
+
+        Args:
+            message (dict): The decoded request.
+
+        Returns:
+            bytes: The response, or None to stay silent.
+        """
+        pdu = message['pdu']
+        engineTime = int(time.time() - self.startTime)
+
+        def report(oid, flags=0, userName='', authKey=None, authProtocol=None):
+            reportPdu = BER.encodePdu(BER.PduReport, pdu[1], [(oid, 1, BER.TagCounter32)])
+            return USM.encodeMessageV3(message['msgId'], flags, self.engineId, self.engineBoots, engineTime,
+                                       userName, reportPdu, authKey=authKey, authProtocol=authProtocol)
+
+        if message['engineId'] != self.engineId:
+            return report(USM.OidUnknownEngineIDs)
+        user = self.users.get(message['userName'])
+        if user is None:
+            return report(USM.OidUnknownUserNames)
+        protocol, key = user
+        flags = message['flags'] & USM.FlagAuth
+        if bool(flags) != bool(key):
+            return report(USM.OidUnsupportedSecLevels)
+        if flags:
+            if not USM.verify(message, key, protocol):
+                return report(USM.OidWrongDigests)
+            if message['engineBoots'] != self.engineBoots or abs(message['engineTime'] - engineTime) > 150:
+                return report(USM.OidNotInTimeWindows, flags, message['userName'], key, protocol)
+        response = self.respond(pdu, 3)
+        if not response:
+            return None
+        return USM.encodeMessageV3(message['msgId'], flags, self.engineId, self.engineBoots, engineTime,
+                                   message['userName'], response, message['contextName'], key, protocol)
+
+    def respond(self, pdu, version):
+        """
+        Build the response PDU to a request PDU.
+
+        Args:
+            pdu (tuple): The decoded request PDU.
+            version (int): The message version.
+
+        Returns:
+            bytearray: The response PDU, or None for unsupported PDU types.
+        """
+        pduType, requestId, nonRepeaters, maxRepetitions, varbinds = pdu
+        oids = [x[0] for x in varbinds]
+        if pduType == BER.PduGet:
+            results = [self.get(oid) for oid in oids]
+        elif pduType == BER.PduGetNext:
+            results = [self.getNext(oid) for oid in oids]
+        elif pduType == BER.PduGetBulk and version > 0:
+            return self.respondBulk(requestId, oids, max(0, nonRepeaters), max(0, maxRepetitions))
+        else:
+            return None
+        if version == 0:
+            for index, result in enumerate(results):
+                if isinstance(result[1], BER.VarBindException):
+                    return BER.encodePdu(BER.PduResponse, requestId, varbinds, 2, index + 1)
+        response = BER.encodePdu(BER.PduResponse, requestId, results)
+        if len(response) > self.maxResponseSize:
+            return BER.encodePdu(BER.PduResponse, requestId, varbinds, BER.ErrorTooBig, 0)
+        return response
+
+    def respondBulk(self, requestId, oids, nonRepeaters, maxRepetitions):
+        """
+        Build the response PDU to a GETBULK request, truncated to the maximum response size.
+
+        Args:
+            requestId (int): The request ID.
+            oids (list): The requested OIDs.
+            nonRepeaters (int): The non-repeaters.
+            maxRepetitions (int): The max-repetitions.
+
+        Returns:
+            bytearray: The response PDU.
+        """
+        nonRepeaters = min(nonRepeaters, len(oids))
+        results = [self.getNext(oid) for oid in oids[:nonRepeaters]]
+        columns = list(oids[nonRepeaters:])
+        size = len(BER.encodeVarbinds(results)) + 32
+        for _ in range(maxRepetitions if columns else 0):
+            done = True
+            row = []
+            for i, oid in enumerate(columns):
+                result = self.getNext(oid)
+                columns[i] = result[0]
+                if result[1] is not BER.EndOfMibView:
+                    done = False
+                row.append(result)
+            rowSize = len(BER.encodeVarbinds(row))
+            if size + rowSize > self.maxResponseSize:
+                break
+            results.extend(row)
+            size += rowSize
+            if done:
+                break
+        return BER.encodePdu(BER.PduResponse, requestId, results)
+
+    def serve(self):
+        """
+        Answer requests until the agent is stopped.
+        """
+        while self.running:
+            try:
+                data, address = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except socket.error:
+                if not self.running:
+                    return
+                continue
+            self.requests += 1
+            if self.dropRate and random.random() < self.dropRate:
+                continue
+            try:
+                response = self.handle(data)
+            except BER.BERError:
+                continue
+            if response:
+                self.sock.sendto(response, address)
+
+    def start(self):
+        """
+        Start answering requests in a background thread.
+
+        Returns:
+            SNMPAgent: The agent, with its port set.
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((self.host, self.port))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, name='xiqse-snmp-agent-{}'.format(self.port))
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the agent and close its socket.
+        """
+        self.running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        if self.sock:
+            self.sock.close()
+            self.sock = None
@@ -0,0 +1,84 @@
+"""
+Tests of the command chain compiler and of the CLI mode tracker.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import unittest
+
+import fakes  # noqa: F401, puts the XIQSE directory on sys.path
+from Utils.ChainCompiler import ChainCommand, ChainDirective, compileChain, expandCommand
+from Utils.ModeTracker import ModeTracker
+
+
+def raw(chainStr):
+    return [node.raw for node in compileChain(chainStr)]
+
+
+class ChainCompilerTest(unittest.TestCase):
+
+    def testSeparators(self):
+        self.assertEqual(raw("enable; configure terminal\n vlan create 10 type port-mstprstp 0 ;;\n\nend"),
+                         ["enable", "configure terminal", "vlan create 10 type port-mstprstp 0", "end"])
+
+    def testConfirmationAttached(self):
+        self.assertEqual(raw("reset\ny\nshow sys"), ["reset\ny", "show sys"])
+        self.assertEqual(raw("reset\ny"), ["reset\ny"])
+        self.assertEqual(raw("reset\ny ; show sys"), ["reset\ny", "show sys"])
+        self.assertEqual(raw("show vlan\nab"), ["show vlan", "ab"])
+
+    def testDirectives(self):
+        nodes = compileChain("#error continue\nshow sys\n#error stop\nshow vlan\n#error fail")
+        self.assertEqual([type(x) for x in nodes], [ChainDirective, ChainCommand, ChainDirective, ChainCommand, ChainDirective])
+        self.assertEqual([(x.returnCliError, x.abortOnError) for x in nodes if isinstance(x, ChainDirective)],
+                         [(True, False), (True, True), (False, False)])
+
+    def testCached(self):
+        self.assertIs(compileChain("show sys; show vlan"), compileChain("show sys; show vlan"))
+
+    def testInlineNewlines(self):
+        self.assertEqual(expandCommand("banner motd // Welcome // to the lab"), ("banner motd\nWelcome\nto the lab", "banner motd"))
+        self.assertEqual(expandCommand("copy tftp://10.0.0.9/file.cfg //"), ("copy tftp://10.0.0.9/file.cfg\n", "copy tftp://10.0.0.9/file.cfg\n"))
+        self.assertEqual(expandCommand("show sys"), ("show sys", "show sys"))
+
+
+class ModeTrackerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = ModeTracker('Fabric Engine')
+
+    def plan(self, *cmdList):
+        sent = []
+        for cmd in cmdList:
+            sent.extend(self.tracker.plan(cmd))
+        return sent
+
+    def testRedundantModeCommandsDropped(self):
+        self.assertEqual(self.plan("enable", "terminal more disable", "enable", "terminal more disable"),
+                         ["enable", "terminal more disable"])
+        self.assertEqual(self.plan("configure terminal", "conf t", "end", "end"), ["configure terminal", "end"])
+
+    def testExitReenterSkipped(self):
+        sent = self.plan("configure terminal", "interface gigabitethernet 1/1", "shutdown", "exit",
+                         "interface gigabitethernet 1/1", "no shutdown", "exit", "vlan create 10 type port-mstprstp 0")
+        self.assertEqual(sent, ["configure terminal", "interface gigabitethernet 1/1", "shutdown", "no shutdown", "exit",
+                                "vlan create 10 type port-mstprstp 0"])
+
+    def testHeldExitsFlushed(self):
+        self.plan("configure terminal", "interface gigabitethernet 1/1", "exit")
+        self.assertEqual(self.tracker.flush(), ["exit"])
+        self.assertEqual(self.tracker.flush(), [])
+
+    def testUnknownStateAfterReset(self):
+        self.plan("enable")
+        self.tracker.reset()
+        self.assertEqual(self.plan("enable"), ["enable"])
+
+    def testFamilyWithoutPatterns(self):
+        tracker = ModeTracker('Unknown Family')
+        self.assertEqual(tracker.plan("enable"), ["enable"])
+        self.assertEqual(tracker.plan("enable"), ["enable"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Tests of the command history and of the CLI command summary.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import sys
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import fakes  # noqa: F401, puts the XIQSE directory on sys.path
+from fakes import makeXIQSE
+from Utils.CommandHistory import CommandHistory
+
+
+class CommandHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.history = CommandHistory()
+        self.history.add('enable', '10.0.0.1', 0.0, 0.1, 10, 'ok')
+        self.history.add('enable', '10.0.0.1', 0.1, 0.0, 0, 'skipped')
+        self.history.add('bad command', '10.0.0.1', 0.2, 0.3, 40, 'error', 'invalidInput')
+        self.history.add('show sys', '10.0.0.1', 0.5, 0.2, 500, 'ok', kind='show')
+        self.history.add('vlan create 10', '10.0.0.1', 0.7, 0.0, 0, 'sanity')
+
+    def testCommands(self):
+        self.assertEqual(self.history.commands(), ['enable', 'enable', 'vlan create 10'])
+        self.assertEqual(self.history.commands(None), ['enable', 'enable', 'show sys', 'vlan create 10'])
+        self.assertEqual(self.history.commands(statuses=('ok',)), ['enable'])
+        self.assertEqual(self.history.commands(statuses=('skipped', 'sanity')), ['enable', 'vlan create 10'])
+
+    def testPercentilesOnlySentCommands(self):
+        self.assertEqual(self.history.percentiles(), {50: 0.2, 90: 0.3, 99: 0.3})
+        self.assertEqual(self.history.percentiles(kind='show'), {50: 0.2, 90: 0.2, 99: 0.2})
+        self.assertEqual(CommandHistory().percentiles(), {})
+
+    def testSlowest(self):
+        self.assertEqual([x.command for x in self.history.slowest(2)], ['bad command', 'show sys'])
+
+    def testRingBuffer(self):
+        history = CommandHistory(maxRecords=2)
+        for i in range(5):
+            history.add('cmd {}'.format(i), '10.0.0.1', i, 0.1, 0, 'ok')
+        self.assertEqual(history.commands(), ['cmd 3', 'cmd 4'])
+        self.assertEqual(history.dropped, 3)
+        history.clear()
+        self.assertEqual((len(history), history.dropped), (0, 0))
+
+
+class PrintSummaryTest(unittest.TestCase):
+
+    def summary(self, cli):
+        stdout = sys.stdout
+        sys.stdout = output = StringIO()
+        try:
+            cli.printSummary()
+        finally:
+            sys.stdout = stdout
+        return output.getvalue()
+
+    def testSkippedCommandsNotListedAsPerformed(self):
+        cli = makeXIQSE().CLI
+        cli.setModeTracking(True)
+        cli.sendCommand('enable', True)
+        cli.sendCommand('enable', True)
+        output = self.summary(cli)
+        self.assertEqual(output.count('|-> enable'), 1)
+        self.assertIn('1 command(s) not sent', output)
+
+    def testSanityCommandsNotListedAsPerformed(self):
+        ctx = makeXIQSE()
+        ctx.sanity = True
+        ctx.CLI.sendCommand('vlan create 10 type port-mstprstp 0', True)
+        output = self.summary(ctx.CLI)
+        self.assertIn('No command was performed', output)
+        self.assertNotIn('|-> vlan create 10', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Tests of the configuration delta computed by ConfigTree.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import unittest
+
+from fakes import makeXIQSE
+from Utils.ConfigTree import ConfigTree, normalizeLine
+
+FAMILY = 'Fabric Engine'
+
+
+def delta(intended, running):
+    return ConfigTree(FAMILY, intended.splitlines()).delta(ConfigTree(FAMILY, running.splitlines()))
+
+
+class ConfigTreeDeltaTest(unittest.TestCase):
+
+    def testDependentCommandsKeepOrder(self):
+        intended = "\n".join([
+            "interface gigabitEthernet 1/1",
+            "no shutdown",
+            "exit",
+            "vlan create 20 type port-mstprstp 0",
+            "interface gigabitEthernet 1/1",
+            "default-vlan-id 20",
+            "exit",
+        ])
+        self.assertEqual(delta(intended, ""), [
+            "interface gigabitEthernet 1/1",
+            "no shutdown",
+            "exit",
+            "vlan create 20 type port-mstprstp 0",
+            "interface gigabitEthernet 1/1",
+            "default-vlan-id 20",
+            "exit",
+        ])
+
+    def testOnlyMissingLinesInOrder(self):
+        intended = "\n".join([
+            "vlan create 20 type port-mstprstp 0",
+            "interface gigabitEthernet 1/1",
+            "no shutdown",
+            "default-vlan-id 20",
+            "exit",
+            "vlan create 30 type port-mstprstp 0",
+        ])
+        running = "\n".join([
+            "vlan create 20 type port-mstprstp 0",
+            "interface gigabitEthernet 1/1",
+            "no shutdown",
+            "exit",
+        ])
+        self.assertEqual(delta(intended, running), [
+            "interface gigabitEthernet 1/1",
+            "default-vlan-id 20",
+            "exit",
+            "vlan create 30 type port-mstprstp 0",
+        ])
+
+    def testCaseAndWhitespaceAreNotChanges(self):
+        intended = "\n".join([
+            "interface GigabitEthernet 1/1",
+            "name  \"Uplink\"",
+            "no Shutdown",
+            "exit",
+        ])
+        running = "\n".join([
+            "interface gigabitEthernet 1/1",
+            "name \"Uplink\"",
+            "no shutdown",
+            "exit",
+        ])
+        self.assertEqual(delta(intended, running), [])
+
+    def testValuesKeepCase(self):
+        self.assertNotEqual(normalizeLine('name "Uplink"'), normalizeLine('name "uplink"'))
+        self.assertNotEqual(normalizeLine('vlan name 20 Uplink'), normalizeLine('vlan name 20 uplink'))
+        self.assertEqual(normalizeLine('NAME  "Uplink"'), normalizeLine('name "Uplink"'))
+        self.assertEqual(normalizeLine('create vlan "Data"'), normalizeLine('create vlan Data'))
+        self.assertEqual(normalizeLine('Interface GigabitEthernet 1/1'), normalizeLine('interface gigabitEthernet 1/1'))
+
+    def testValueCaseChangeIsPushed(self):
+        intended = "\n".join([
+            "vlan create 20 name Data type port-mstprstp 0",
+        ])
+        running = "\n".join([
+            "vlan create 20 name data type port-mstprstp 0",
+        ])
+        self.assertEqual(delta(intended, running), ["vlan create 20 name Data type port-mstprstp 0"])
+
+    def testRepeatedLinesPushedOnce(self):
+        intended = "\n".join([
+            "interface gigabitEthernet 1/1",
+            "no shutdown",
+            "exit",
+            "interface gigabitEthernet 1/1",
+            "no shutdown",
+            "exit",
+        ])
+        self.assertEqual(delta(intended, ""), [
+            "interface gigabitEthernet 1/1",
+            "no shutdown",
+            "exit",
+        ])
+
+
+
+class SendConfigDeltaTest(unittest.TestCase):
+
+    def runDelta(self, familyVar, running, chain):
+        xiqse = makeXIQSE(lambda cmd: running if cmd in ('show running-config', 'show configuration') else "", family=familyVar)
+        return xiqse, xiqse.CLI.sendConfigDelta(chain, dryRun=True)
+
+    def testSwitchEngineFamily(self):
+        xiqse, deltaList = self.runDelta(
+            'Universal Platform Switch Engine',
+            "#\n# Module vlan configuration.\n#\ncreate vlan \"Data\"\nconfigure vlan Data tag 20\n",
+            "create vlan Data\nconfigure vlan Data tag 20\nconfigure vlan Data add ports 1 untagged",
+        )
+        self.assertEqual(xiqse.getFamily(), 'Switch Engine')
+        self.assertEqual(deltaList, ["configure vlan Data add ports 1 untagged"])
+        self.assertEqual(xiqse.emc_cli.sent, ['disable clipaging', 'show configuration'])
+
+    def testFabricEngineFamily(self):
+        xiqse, deltaList = self.runDelta(
+            'Universal Platform Fabric Engine',
+            "vlan create 20 type port-mstprstp 0\ninterface gigabitEthernet 1/1\nno shutdown\nexit\n",
+            "vlan create 20 type port-mstprstp 0\ninterface GigabitEthernet 1/1\nno shutdown\ndefault-vlan-id 20\nexit",
+        )
+        self.assertEqual(xiqse.getFamily(), 'Fabric Engine')
+        self.assertEqual(deltaList, ["interface GigabitEthernet 1/1", "default-vlan-id 20", "exit"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+"""
+Tests of the CSV utilities: tables and indexes, templates, the parse cache, compact rows,
+the streaming writer and the CSV module round trip.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+from fakes import makeXIQSE
+from Utils.CSVCache import CSVCache
+from Utils.CSVIndex import CSVIndex
+from Utils.CSVRow import CSVSchema
+from Utils.CSVTable import CSVTable
+from Utils.CSVTemplate import CSVTemplate
+from Utils.CSVWriter import CSVWriter
+
+Header = ['ip', 'name', 'site', 'vlan']
+Rows = [
+    ['10.0.0.1', 'sw1', 'Paris', '20'],
+    ['10.0.0.2', 'sw2', 'Lyon', ''],
+    ['10.0.0.3', 'sw3', 'Paris', '30'],
+]
+
+
+class CSVTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'devices.csv')
+        with open(self.path, 'w') as f:
+            for row in [Header] + Rows:
+                f.write(','.join(row) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def readBack(self, path):
+        with open(path) as f:
+            return [row for row in csv.reader(f)]
+
+
+class CSVTableTest(CSVTestCase):
+
+    def testFindAndCompositeKey(self):
+        for compact in (False, True):
+            table = CSVTable.load(self.path, compact=compact)
+            self.assertEqual(len(table), 3)
+            self.assertEqual([row['name'] for row in table.find('site', 'Paris')], ['sw1', 'sw3'])
+            self.assertEqual(table.first(('site', 'vlan'), ('Paris', '30'))['ip'], '10.0.0.3')
+            self.assertIsNone(table.first('site', 'Nice'))
+
+    def testIpRangeAndPrefix(self):
+        table = CSVTable.load(self.path)
+        self.assertEqual([row['name'] for row in table.ipRange('ip', '10.0.0.2', '10.0.0.9')], ['sw2', 'sw3'])
+        self.assertEqual([row['name'] for row in table.ipRange('ip', '10.0.0.0/31')], ['sw1'])
+        self.assertEqual([row['name'] for row in table.prefix('name', 'sw')], ['sw1', 'sw2', 'sw3'])
+        self.assertRaises(ValueError, table.ipRange, 'ip', 'not an ip')
+
+    def testVarDict(self):
+        table = CSVTable.load(self.path)
+        self.assertEqual(table.varDict()['10.0.0.2']['site'], 'Lyon')
+
+
+class CSVIndexTest(CSVTestCase):
+
+    def testLookupAndRebuild(self):
+        index = CSVIndex.open(self.path)
+        self.assertEqual(index.header, Header)
+        self.assertEqual(index.get('10.0.0.2'), Rows[1])
+        self.assertIsNone(index.get('10.0.0.9'))
+        self.assertTrue(os.path.exists(index.indexPath))
+        with open(self.path, 'a') as f:
+            f.write('10.0.0.9,sw9,"Nice, France",40\n')
+        os.utime(self.path, (0, 0))
+        self.assertEqual(CSVIndex.open(self.path).get('10.0.0.9'), ['10.0.0.9', 'sw9', 'Nice, France', '40'])
+
+    def testSavedIndexReloaded(self):
+        CSVIndex.open(self.path)
+        CSVIndex.Indexes.clear()
+        index = CSVIndex(self.path)
+        self.assertTrue(index.load(os.stat(self.path)))
+        self.assertEqual(index.get('10.0.0.3'), Rows[2])
+
+
+class CSVTemplateTest(unittest.TestCase):
+
+    def testRender(self):
+        template = CSVTemplate.compile("vlan create $<vlan> name $(name) ; # $<name>")
+        self.assertIs(template, CSVTemplate.compile("vlan create $<vlan> name $(name) ; # $<name>"))
+        self.assertEqual(template.variables, ('vlan', 'name'))
+        self.assertEqual(template.render({'vlan': '20', 'name': 'Data'}), "vlan create 20 name Data ; # Data")
+        self.assertEqual(list(template.renderAll([{'vlan': '1', 'name': 'a'}, {'vlan': '2', 'name': 'b'}])),
+                         ["vlan create 1 name a ; # a", "vlan create 2 name b ; # b"])
+
+    def testMissing(self):
+        template = CSVTemplate("$<ip> $<mask>")
+        self.assertEqual(template.missing({'ip': '10.0.0.1'}), ['mask'])
+        self.assertEqual(template.missing(None), ['ip', 'mask'])
+        self.assertRaises(KeyError, template.render, {'ip': '10.0.0.1'})
+        self.assertEqual(CSVTemplate("no variables").render({}), "no variables")
+
+
+class CSVCacheTest(CSVTestCase):
+
+    def testCachedAndInvalidated(self):
+        cacheDir = os.path.join(self.directory, 'cache')
+        header, rows = CSVCache(self.path, directory=cacheDir).get()
+        self.assertEqual((header, rows), (Header, Rows))
+        self.assertTrue(os.path.exists(CSVCache(self.path, directory=cacheDir).cachePath))
+        self.assertEqual(CSVCache(self.path, directory=cacheDir).load(os.stat(self.path)), (Header, Rows))
+        with open(self.path, 'a') as f:
+            f.write('10.0.0.4,sw4,Nice,40\n')
+        self.assertIsNone(CSVCache(self.path, directory=cacheDir).load(os.stat(self.path)))
+        self.assertEqual(CSVCache(self.path, directory=cacheDir).get()[1][-1], ['10.0.0.4', 'sw4', 'Nice', '40'])
+
+    def testLockedEntryStillParsed(self):
+        cache = CSVCache(self.path, directory=os.path.join(self.directory, 'cache'))
+        cache.LockTimeout = 0.1
+        os.makedirs(cache.directory)
+        open(cache.lockPath, 'w').close()
+        self.assertEqual(cache.get(), (Header, Rows))
+        self.assertFalse(os.path.exists(cache.cachePath))
+
+
+class CSVWriterTest(CSVTestCase):
+
+    def testCompactRowsRoundTrip(self):
+        schema = CSVSchema(Header)
+        rows = [schema.row(x[0], x[1:]) for x in Rows]
+        outPath = os.path.join(self.directory, 'out.csv')
+        with CSVWriter(outPath, Header) as writer:
+            self.assertEqual(writer.writeRows(rows), len(Rows))
+        self.assertEqual(self.readBack(outPath), [Header] + Rows)
+
+    def testDottedPathsAndCallables(self):
+        outPath = os.path.join(self.directory, 'out.tsv')
+        rows = [{'name': 'sw1', 'site': {'name': 'Paris'}, 'tags': ['a', 'b']}, {'name': 'sw2'}]
+        columns = ['name', ('site', 'site.name'), 'tags', ('upper', lambda row: row['name'].upper())]
+        with CSVWriter(outPath, columns, '\t') as writer:
+            writer.writeRows(rows)
+        with open(outPath) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, ['name\tsite\ttags\tupper', 'sw1\tParis\ta|b\tSW1', 'sw2\t\t\tSW2'])
+
+    def testSmallBufferWritesEveryRow(self):
+        outPath = os.path.join(self.directory, 'out.csv')
+        with CSVWriter(outPath, ['n'], bufferRows=2) as writer:
+            writer.writeRows({'n': i} for i in range(5))
+        self.assertEqual(self.readBack(outPath), [['n'], ['0'], ['1'], ['2'], ['3'], ['4']])
+
+
+class CSVModuleTest(CSVTestCase):
+
+    def setUp(self):
+        CSVTestCase.setUp(self)
+        self.xiqse = makeXIQSE()
+
+    def testReadCompactWriteRoundTrip(self):
+        data = self.xiqse.CSV.read(self.path, compact=True)
+        rows = [data[x[0]] for x in Rows]
+        outPath = os.path.join(self.directory, 'out.csv')
+        self.assertEqual(self.xiqse.CSV.write(outPath, rows, Header), len(Rows))
+        self.assertEqual(self.readBack(outPath), [Header] + Rows)
+
+    def testCompactRowsEqualDictRows(self):
+        compact = self.xiqse.CSV.read(self.path, compact=True)
+        plain = self.xiqse.CSV.read(self.path)
+        for row in Rows:
+            self.assertEqual(compact[row[0]], plain[row[0]])
+            self.assertEqual(compact[row[0]].get('site'), row[2])
+
+    def testIterRowsWriteRoundTrip(self):
+        outPath = os.path.join(self.directory, 'out.csv.gz')
+        self.assertEqual(self.xiqse.CSV.write(outPath, self.xiqse.CSV.iterRows(self.path), Header), len(Rows))
+        import gzip
+        with gzip.open(outPath, 'rt' if str is not bytes else 'rb') as f:
+            self.assertEqual(list(csv.reader(f)), [Header] + Rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
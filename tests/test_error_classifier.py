@@ -0,0 +1,85 @@
+"""
+Tests of the per-family CLI error classifier, pinned against the generic RegexError check.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import unittest
+
+import fakes  # noqa: F401, puts the XIQSE directory on sys.path
+from Utils.ErrorClassifier import (ErrorAmbiguous, ErrorClassifier, ErrorGeneric, ErrorIncomplete, ErrorInvalidInput,
+                                   ErrorNotFound, ErrorPermission, ErrorRange)
+from Utils.OutputView import OutputView
+from Utils.Regex import RegexError, RegexNoError
+
+Outputs = [
+    "",
+    "Port     Status   Speed\n1/1      up       1000\n1/2      down     1000",
+    "VLAN 10 created",
+    "% Invalid input detected at '^' marker.",
+    "% Incomplete command.",
+    "% Ambiguous command: \"sh\"",
+    "% VLAN 4000 does not exist",
+    "% Saving 40562 bytes to flash:startup-config",
+    "Error: Permission denied",
+    "ERROR: flash full",
+    "Description : bad cable on port 1/5\nStatus : up",
+    "ISIS adjacency unable to form on port 1/3",
+    "Operation failed",
+    "Cannot modify the default VLAN",
+    "Interface not found",
+    "No such file or directory",
+    "Can't open file",
+    "Value out of range",
+    "Port 3 name set to 'not allowed-guest'",
+    "%% Invalid input detected at '^' marker.",
+    "%% Unrecognized command: \"shw\"",
+    "Error: VLAN \"foo\" does not exist.",
+    "Both ends of MACsec link cannot have the same key-parity value",
+    "\x07",
+]
+
+
+def legacyCheck(outputStr):
+    return bool(RegexError.search(outputStr) and not RegexNoError.search(outputStr))
+
+
+class ErrorClassifierTest(unittest.TestCase):
+
+    def testSameDecisionAsGenericCheck(self):
+        for family in ('Fabric Engine', 'Switch Engine', 'Summit Series', 'ERS Series', 'unknown'):
+            classifier = ErrorClassifier.forFamily(family)
+            for outputStr in Outputs:
+                self.assertEqual(classifier.classify(outputStr) is not None, legacyCheck(outputStr), (family, outputStr))
+
+    def testBareWordsFailOnFabricEngine(self):
+        classifier = ErrorClassifier.forFamily('Fabric Engine')
+        for outputStr in ("ISIS adjacency unable to form", "Operation failed", "Cannot modify the default VLAN", "Interface not found"):
+            match = classifier.classify(outputStr)
+            self.assertEqual(match, (ErrorGeneric, outputStr))
+
+    def testCodes(self):
+        fabric = ErrorClassifier.forFamily('Fabric Engine')
+        switch = ErrorClassifier.forFamily('Switch Engine')
+        self.assertEqual(fabric.classify("% Invalid input detected at '^' marker.").code, ErrorInvalidInput)
+        self.assertEqual(fabric.classify("% Incomplete command.").code, ErrorIncomplete)
+        self.assertEqual(fabric.classify("% Ambiguous command").code, ErrorAmbiguous)
+        self.assertEqual(fabric.classify("show vlan 4000\nVLAN 4000 does not exist").code, ErrorNotFound)
+        self.assertEqual(fabric.classify("Value out of range").code, ErrorRange)
+        self.assertEqual(switch.classify("Permission denied for user").code, ErrorPermission)
+        self.assertEqual(switch.classify("%% Unrecognized command: \"shw\"").code, ErrorInvalidInput)
+
+    def testErrorLine(self):
+        match = ErrorClassifier.forFamily('Fabric Engine').classify("vlan create 5000\n% Invalid input detected\nVSP:1#")
+        self.assertEqual(match.message, "% Invalid input detected")
+
+    def testNoErrorExceptions(self):
+        self.assertIsNone(ErrorClassifier.forFamily('Fabric Engine').classify("% Saving 40562 bytes to flash:startup-config"))
+
+    def testOutputView(self):
+        view = OutputView("show vlan\n% Invalid input detected\n")
+        self.assertEqual(ErrorClassifier.forFamily('Fabric Engine').classify(view).code, ErrorInvalidInput)
+
+
+if __name__ == '__main__':
+    unittest.main()
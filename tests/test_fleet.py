@@ -0,0 +1,69 @@
+"""
+Tests of the Fleet runner: per-device error containment and warp push script references.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from fakes import makeXIQSE
+
+ErrorOutput = "% Invalid input detected at '^' marker."
+
+
+def responder(cmd):
+    return ErrorOutput if cmd.startswith('bad') else ""
+
+
+class FleetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = makeXIQSE(responder)
+
+    def testErrorFailDirectiveFailsDeviceOnly(self):
+        results = self.ctx.Fleet.run(['10.0.0.1', '10.0.0.2'], "#error fail; show sys; bad command; show clock")
+        self.assertEqual([result['success'] for result in results], [False, False])
+        self.assertTrue(results[0]['error'].startswith(ErrorOutput))
+        self.assertIsNone(self.ctx.emc_results.status)
+        self.assertNotIn('show clock', self.ctx.emc_cli.sent)
+
+    def testErrorContinueDirective(self):
+        results = self.ctx.Fleet.run(['10.0.0.1'], "#error continue; bad command; show clock")
+        self.assertFalse(results[0]['success'])
+        self.assertIn('show clock', self.ctx.emc_cli.sent)
+
+    def testChainOutsideFleetStillAborts(self):
+        self.assertRaises(RuntimeError, self.ctx.CLI.sendCommandChain, "#error fail; bad command")
+
+
+class WarpPushTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = makeXIQSE(responder)
+        self.root = tempfile.mkdtemp()
+        self.tftpRoot = self.ctx.CLI.TFTPRoot
+        type(self.ctx.CLI).TFTPRoot = self.root
+
+    def tearDown(self):
+        type(self.ctx.CLI).TFTPRoot = self.tftpRoot
+        shutil.rmtree(self.root)
+
+    def scripts(self):
+        return [name for name in os.listdir(self.root) if not name.startswith('.')]
+
+    def testUnknownFamilyReleasesScripts(self):
+        families = {'10.0.0.2': 'Unknown Family'}
+        self.assertRaises(KeyError, self.ctx.Fleet.warpPush, ['10.0.0.1', '10.0.0.2'], "show sys", families)
+        self.assertEqual(self.scripts(), [])
+
+    def testScriptsSharedAndReleased(self):
+        results = self.ctx.Fleet.warpPush(['10.0.0.1', '10.0.0.2'], "show sys")
+        self.assertEqual(results[0]['script'], results[1]['script'])
+        self.assertEqual(self.scripts(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
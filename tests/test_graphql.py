@@ -0,0 +1,65 @@
+"""
+Tests of the NBI POST metrics: the response size is only read when metrics are enabled.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import json
+import sys
+import unittest
+
+from fakes import makeXIQSE
+
+
+class FakeResponse(object):
+
+    def __init__(self, payload):
+        self.text = json.dumps(payload)
+        self.headers = {'server': 'test', 'server-version': '1'}
+        self.contentReads = 0
+
+    @property
+    def content(self):
+        self.contentReads += 1
+        return self.text.encode('utf-8')
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession(object):
+
+    response = None
+
+    def __init__(self):
+        self.headers = {}
+
+    def post(self, url, json=None):
+        return FakeSession.response
+
+
+class GraphQLMetricsTest(unittest.TestCase):
+
+    def post(self, metrics):
+        ctx = makeXIQSE(workflowMetrics=str(metrics))
+        module = sys.modules[type(ctx.GraphQL).__module__]
+        session, module.requests.Session = module.requests.Session, FakeSession
+        FakeSession.response = FakeResponse({'data': {'network': {'devices': []}}})
+        try:
+            self.assertEqual(ctx.GraphQL.nbiSessionPost('{ network { devices { ip } } }'), {'data': {'network': {'devices': []}}})
+        finally:
+            module.requests.Session = session
+        return ctx, FakeSession.response.contentReads
+
+    def testContentNotReadWithoutMetrics(self):
+        ctx, reads = self.post(False)
+        self.assertEqual(reads, 0)
+
+    def testResponseBytesRecorded(self):
+        ctx, reads = self.post(True)
+        self.assertEqual(reads, 1)
+        self.assertIn('nbi.post', json.dumps(ctx.Metrics.report()))
+
+
+if __name__ == '__main__':
+    unittest.main()
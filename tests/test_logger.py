@@ -0,0 +1,74 @@
+"""
+Tests of the logger: level filtering, lazy arguments, JSON lines and buffering.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import json
+import threading
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import fakes  # noqa: F401, puts the XIQSE directory on sys.path
+from Utils.Logger import Lazy, Logger, flushBufferedLoggers
+
+
+class LoggerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = StringIO()
+
+    def lines(self):
+        return self.stream.getvalue().splitlines()
+
+    def testLazyOnlyFormattedWhenEnabled(self):
+        calls = []
+        logger = Logger('INFO', buffered=True, stream=self.stream)
+        logger.debug("value %s", Lazy(calls.append, 'debug'))
+        logger.info("value %s", Lazy(lambda: 42))
+        logger.flush()
+        self.assertEqual(calls, [])
+        self.assertEqual(self.lines(), ["[INFO   ] value 42"])
+
+    def testJsonLines(self):
+        logger = Logger('DEBUG', buffered=True, jsonLines=True, stream=self.stream)
+        logger.warning("%d devices", 3)
+        logger.flush()
+        line = json.loads(self.lines()[0])
+        self.assertEqual((line['level'], line['message']), ('WARNING', '3 devices'))
+
+    def testBufferedUntilFlush(self):
+        logger = Logger('INFO', buffered=True, bufferSize=3, stream=self.stream)
+        logger.info("one")
+        logger.info("two")
+        self.assertEqual(self.lines(), [])
+        logger.info("three")
+        self.assertEqual(len(self.lines()), 3)
+        logger.info("four")
+        flushBufferedLoggers()
+        self.assertEqual(self.lines()[-1], "[INFO   ] four")
+
+    def testConcurrentLogging(self):
+        logger = Logger('INFO', buffered=True, bufferSize=7, stream=self.stream)
+
+        def worker(n):
+            for i in range(200):
+                logger.info("worker %d line %d", n, i)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.flush()
+        lines = self.lines()
+        self.assertEqual(len(lines), 1600)
+        self.assertEqual(len(set(lines)), 1600)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Tests of the offset-based output view, against the line-splitting output cleaning it replaces.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import itertools
+import re
+import unittest
+
+import fakes  # noqa: F401, puts the XIQSE directory on sys.path
+from fakes import makeXIQSE
+from Utils.OutputView import OutputView
+from Utils.Regex import RegexPrompt
+
+Lines = ["show vlan basic", "", "VLAN 1 default", "  VLAN 10 Data ", "VSP-8284XSQ:1#", "X690-48t-2q-4c.1 #"]
+LineEnds = ["\n", "\r\n", "\r"]
+
+
+def cleanOutput(outputStr):
+    """Line-splitting output cleaning, as done before OutputView."""
+    outputLines = outputStr.splitlines()
+    if not outputLines:
+        return ''
+    if RegexPrompt.match(outputLines[-1]):
+        return '\n'.join(outputLines[1:-1])
+    return '\n'.join(outputLines[1:])
+
+
+def outputs():
+    """Outputs made of 0 to 4 lines, with mixed line ends and an optional final line end."""
+    for count in range(5):
+        for lines in itertools.permutations(Lines, count):
+            for ends in itertools.product(LineEnds, repeat=count):
+                output = ''.join(line + end for line, end in zip(lines, ends))
+                yield output
+                yield output[:-len(ends[-1])] if count else output
+
+
+class OutputViewTest(unittest.TestCase):
+
+    def testTrimPromptMatchesLineSplitting(self):
+        for output in outputs():
+            self.assertEqual(OutputView(output).trimPrompt(RegexPrompt).text(), cleanOutput(output), repr(output))
+
+    def testHeadMatchesLineSplitting(self):
+        for output in outputs():
+            for count in (1, 2, 4):
+                expected = '\n'.join(output.replace('\r\n', '\n').replace('\r', '\n').split('\n')[:count])
+                self.assertEqual(OutputView(output).head(count).text(), expected, repr(output))
+
+    def testBufferNotCopied(self):
+        output = "show vlan\r\nVLAN 1\r\nVSP-8284XSQ:1#"
+        view = OutputView(output).trimPrompt(RegexPrompt)
+        self.assertIs(view.buffer, output)
+        self.assertEqual(view.text(), "VLAN 1")
+
+    def testRegexOnCrLfOutput(self):
+        view = OutputView("show vlan\r\nVLAN 1 default\r\nVLAN 10 Data\r\nVSP-8284XSQ:1#").trimPrompt(RegexPrompt)
+        regex = re.compile(r'^VLAN (\d+) (\S+)$', re.MULTILINE)
+        self.assertEqual(view.findall(regex), [('1', 'default'), ('10', 'Data')])
+        self.assertTrue(view.search(regex))
+        self.assertEqual([x.group(1) for x in view.finditer(regex)], ['1', '10'])
+
+    def testAnchorsMatchViewText(self):
+        view = OutputView("show vlan\nVLAN 1 default\nVLAN 10 Data\nVSP-8284XSQ:1#").trimPrompt(RegexPrompt)
+        text = view.text()
+        for pattern, flags in [(r'^VLAN (\d+)', 0), (r'\AVLAN (\d+)', 0), (r'(\d+) \w+$', 0), (r'^VLAN (\d+)', re.MULTILINE),
+                               (r'\w+$', re.MULTILINE), (r'VLAN (\d+)', 0), (r'[^ ]+ (\d+)', 0)]:
+            regex = re.compile(pattern, flags)
+            self.assertEqual(view.findall(regex), regex.findall(text), pattern)
+            self.assertEqual(bool(view.search(regex)), bool(regex.search(text)), pattern)
+
+    def testMultilineAnchorMidLine(self):
+        view = OutputView("prefix VLAN 1", 7)
+        regex = re.compile(r'^VLAN (\d+)', re.MULTILINE)
+        self.assertEqual(view.findall(regex), ['1'])
+
+    def testStartswithAndLength(self):
+        view = OutputView("show sys\nError: bad\nVSP-8284XSQ:1#").trimPrompt(RegexPrompt)
+        self.assertTrue(view.startswith("Error:"))
+        self.assertEqual(len(view), len("Error: bad"))
+        self.assertFalse(OutputView("show sys\nVSP-8284XSQ:1#").trimPrompt(RegexPrompt))
+
+
+class WaitForTest(unittest.TestCase):
+
+    def testAnchoredRegexOnCrLfOutput(self):
+        ctx = makeXIQSE(lambda cmd: "State: UP\r\nAdjacencies: 2\r")
+        self.assertEqual(ctx.CLI.waitFor("show isis", re.compile(r'^State: (\w+)'), timeout=1), ['UP'])
+        self.assertEqual(ctx.CLI.waitFor("show isis", re.compile(r'\AState: (\w+)$', re.MULTILINE), timeout=1), ['UP'])
+        self.assertEqual(ctx.CLI.waitFor("show isis", r'^Adjacencies: (\d+)$', timeout=1), ['2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
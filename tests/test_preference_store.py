@@ -0,0 +1,86 @@
+"""
+Tests of the preference store, including concurrent updates from several processes.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import fakes
+from Utils.PreferenceStore import PreferenceStore
+
+WriterScript = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from Utils.PreferenceStore import PreferenceStore
+store = PreferenceStore(sys.argv[2])
+for i in range(20):
+    assert store.set('{}-{}'.format(sys.argv[3], i), i)
+"""
+
+
+class PreferenceStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'preferences.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testSetGetAndReload(self):
+        store = PreferenceStore(self.path)
+        self.assertIsNone(store.get('key'))
+        self.assertTrue(store.set('key', 'show vlan'))
+        self.assertEqual(store.get('key'), 'show vlan')
+        self.assertEqual(PreferenceStore(self.path).get('key'), 'show vlan')
+        self.assertFalse(os.path.exists(store.lockPath))
+
+    def testOpenSharesStore(self):
+        self.assertIs(PreferenceStore.open(self.path), PreferenceStore.open(self.path))
+
+    def testMergesOtherWriters(self):
+        first, second = PreferenceStore(self.path), PreferenceStore(self.path)
+        first.set('a', 1)
+        second.set('b', 2)
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {'a': 1, 'b': 2})
+
+    def testUnreadableFile(self):
+        with open(self.path, 'w') as f:
+            f.write('not json')
+        self.assertEqual(PreferenceStore(self.path).get('key', 'default'), 'default')
+
+    def testLockedStoreKeepsValueForRun(self):
+        store = PreferenceStore(self.path)
+        store.LockTimeout = 0.1
+        open(store.lockPath, 'w').close()
+        self.assertFalse(store.set('key', 'value'))
+        self.assertEqual(store.get('key'), 'value')
+        self.assertFalse(os.path.exists(self.path))
+
+    def testStaleLockRemoved(self):
+        store = PreferenceStore(self.path)
+        open(store.lockPath, 'w').close()
+        stale = time.time() - store.LockStale - 1
+        os.utime(store.lockPath, (stale, stale))
+        self.assertTrue(store.set('key', 'value'))
+
+    @unittest.skipIf(sys.platform.startswith('java'), "spawns CPython processes")
+    def testConcurrentProcesses(self):
+        xiqseDir = os.path.join(fakes.RepoRoot, 'XIQSE')
+        processes = [subprocess.Popen([sys.executable, '-c', WriterScript, xiqseDir, self.path, str(n)]) for n in range(4)]
+        self.assertEqual([process.wait() for process in processes], [0] * 4)
+        data = PreferenceStore(self.path).load()
+        self.assertEqual(len(data), 80)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests of the workflow profiler modes and of the workflow profile written on exitError().
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import fakes  # noqa: F401, puts the XIQSE directory on sys.path
+from fakes import makeXIQSE
+from Utils import Profiler as ProfilerModule
+from Utils.Profiler import Profiler
+
+
+def busy(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+    return seconds
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.basePath = os.path.join(self.directory, 'profile')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @unittest.skipIf(ProfilerModule.cProfile is None, "cProfile not available")
+    def testCProfileModeRunsNoSampler(self):
+        profiler = Profiler('cprofile')
+        self.assertEqual(profiler.runcall(busy, 0.05), 0.05)
+        self.assertIsNone(profiler.sampler)
+        paths = profiler.write(self.basePath)
+        self.assertEqual(paths, [self.basePath + '.pstats', self.basePath + '.txt'])
+        with open(self.basePath + '.txt') as f:
+            self.assertIn('busy', f.read())
+
+    def testSampleMode(self):
+        profiler = Profiler('sample', interval=0.001)
+        profiler.runcall(busy, 0.1)
+        self.assertIsNone(profiler.profile)
+        self.assertTrue(profiler.sampler.samples > 0)
+        paths = profiler.write(self.basePath)
+        self.assertEqual(paths, [self.basePath + '.txt', self.basePath + '.collapsed'])
+        with open(self.basePath + '.collapsed') as f:
+            self.assertIn('test_profiler.py:busy', f.read())
+
+    def testWorkflowProfileWrittenOnExitError(self):
+        script = os.path.join(self.directory, 'workflow.py')
+        ctx = makeXIQSE(workflowProfile='sample', **{'javax.script.filename': script})
+        self.assertTrue(ctx.Profiler)
+        self.assertRaises(RuntimeError, ctx.exitError, "failed", sleep=0)
+        self.assertIsNone(ctx.Profiler)
+        written = sorted(x for x in os.listdir(self.directory) if x != 'workflow.py')
+        self.assertEqual(len(written), 2)
+        self.assertTrue(written[0].endswith('.collapsed') and written[1].endswith('.txt'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests of the concurrent reachability sweeper.
+
+The 'subprocess' method is tested with a fake ping script put first on
+the PATH, which answers for the addresses listed in FakePingUp.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import os
+import shutil
+import socket
+import stat
+import sys
+import tempfile
+import unittest
+
+import fakes  # noqa: F401, puts the XIQSE directory on sys.path
+from Utils.Reachability import ReachabilitySweeper, icmpChecksum
+
+FakePing = """#!/bin/sh
+for arg in "$@"; do last="$arg"; done
+case " $FAKE_PING_UP " in
+    *" $last "*) exit 0 ;;
+esac
+exit 1
+"""
+
+
+def fakeIcmp(sweeper):
+    """Stands in for openIcmp with a socket that never receives a reply."""
+    sweeper.icmpSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    return True
+
+
+class ReachabilityTest(unittest.TestCase):
+
+    def testIcmpChecksum(self):
+        # Echo request, identifier 1, sequence 1, no payload
+        packet = bytearray(b'\x08\x00\x00\x00\x00\x01\x00\x01')
+        self.assertEqual(icmpChecksum(packet), 0xf7fd)
+        packet[2:4] = bytearray(b'\xf7\xfd')
+        self.assertEqual(icmpChecksum(packet), 0)
+
+    def testTcpListeningPort(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        server.listen(5)
+        try:
+            port = server.getsockname()[1]
+            result = ReachabilitySweeper(('tcp',), ports=(port,)).sweep(['127.0.0.1'], timeout=2.0)['127.0.0.1']
+        finally:
+            server.close()
+        self.assertTrue(result['reachable'])
+        self.assertEqual((result['method'], result['port'], result['error']), ('tcp', port, None))
+
+    def testTcpRefusedCountsAsUp(self):
+        probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+        probe.close()
+        result = ReachabilitySweeper(('tcp',), ports=(port,)).sweep(['127.0.0.1'], timeout=2.0)['127.0.0.1']
+        self.assertTrue(result['reachable'])
+
+    def testDuplicateIpsProbedOnce(self):
+        results = ReachabilitySweeper(('tcp',), ports=(1,)).sweep(['127.0.0.1', '127.0.0.1'], timeout=1.0)
+        self.assertEqual(list(results), ['127.0.0.1'])
+
+    def testNoUsableMethod(self):
+        sweeper = ReachabilitySweeper(('icmp',))
+        sweeper.openIcmp = lambda: False
+        self.assertRaises(RuntimeError, sweeper.sweep, ['127.0.0.1'])
+
+
+@unittest.skipIf(sys.platform.startswith('win'), "fake ping is a shell script")
+class ReachabilitySubprocessTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'ping')
+        with open(path, 'w') as f:
+            f.write(FakePing)
+        os.chmod(path, stat.S_IRWXU)
+        self.environ = dict(os.environ)
+        os.environ['PATH'] = self.directory + os.pathsep + os.environ.get('PATH', '')
+        os.environ['FAKE_PING_UP'] = '192.0.2.1 2001:db8::1'
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.directory)
+
+    def testSubprocessSweep(self):
+        results = ReachabilitySweeper(('subprocess',)).sweep(['192.0.2.1', '192.0.2.2'], timeout=1.5, interval=0.5)
+        self.assertTrue(results['192.0.2.1']['reachable'])
+        self.assertEqual(results['192.0.2.1']['method'], 'subprocess')
+        self.assertFalse(results['192.0.2.2']['reachable'])
+        self.assertIsNone(results['192.0.2.2']['error'])
+        self.assertTrue(results['192.0.2.2']['attempts'] >= 2)
+
+    def testIpv6UsesSubprocessWithIcmp(self):
+        sweeper = ReachabilitySweeper(('icmp', 'subprocess'))
+        sweeper.openIcmp = lambda: fakeIcmp(sweeper)
+        result = sweeper.sweep(['2001:db8::1'], timeout=1.5, interval=0.5)['2001:db8::1']
+        self.assertTrue(result['reachable'])
+        self.assertEqual(result['method'], 'subprocess')
+
+    def testIpv6WithoutFallbackHasError(self):
+        sweeper = ReachabilitySweeper(('icmp',))
+        sweeper.openIcmp = lambda: fakeIcmp(sweeper)
+        result = sweeper.sweep(['2001:db8::1'], timeout=1.0)['2001:db8::1']
+        self.assertFalse(result['reachable'])
+        self.assertTrue(result['error'])
+
+    def testMissingPingHasError(self):
+        os.environ['PATH'] = os.path.join(self.directory, 'missing')
+        result = ReachabilitySweeper(('subprocess',)).sweep(['192.0.2.1'], timeout=1.0)['192.0.2.1']
+        self.assertFalse(result['reachable'])
+        self.assertTrue(result['error'].startswith('Unable to run ping'))
+
+
+if __name__ == '__main__':
+    unittest.main()
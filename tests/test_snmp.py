@@ -0,0 +1,142 @@
+"""
+Tests of the BER codec, the USM key derivation and the SNMP module against the simulated agent.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import binascii
+import unittest
+
+import fakes  # noqa: F401, puts the XIQSE directory on sys.path
+from fakes import makeXIQSE
+from snmpagent import MibValue, SNMPAgent
+from Utils import BER, USM
+from Utils.SNMPEngine import SNMPTarget
+
+SysName = '1.3.6.1.2.1.1.5.0'
+IfDescr = '1.3.6.1.2.1.2.2.1.2'
+IfInOctets = '1.3.6.1.2.1.2.2.1.10'
+
+Mib = {SysName: 'switch1', '1.3.6.1.2.1.1.3.0': MibValue(123456, BER.TagTimeTicks)}
+for index in range(1, 41):
+    Mib['{}.{}'.format(IfDescr, index)] = 'port {}'.format(index)
+    Mib['{}.{}'.format(IfInOctets, index)] = MibValue(index * 1000, BER.TagCounter32)
+
+
+def hexBytes(data):
+    return binascii.hexlify(bytes(data)).decode('ascii')
+
+
+class BERTest(unittest.TestCase):
+
+    def testOid(self):
+        self.assertEqual(BER.parseOid('.' + SysName), (1, 3, 6, 1, 2, 1, 1, 5, 0))
+        self.assertEqual(BER.formatOid((1, 3, 6, 1, 2, 1, 1, 5, 0)), SysName)
+        self.assertEqual(hexBytes(BER.encodeOid(BER.parseOid(SysName))), '06082b06010201010500')
+        self.assertEqual(hexBytes(BER.encodeOid((1, 3, 6, 1, 4, 1, 1916))), '06072b060104018e7c')
+
+    def testIntegers(self):
+        self.assertEqual(hexBytes(BER.encodeInteger(0)), '020100')
+        self.assertEqual(hexBytes(BER.encodeInteger(128)), '02020080')
+        self.assertEqual(hexBytes(BER.encodeInteger(-1)), '0201ff')
+        self.assertEqual(hexBytes(BER.encodeInteger(0xffffffff, BER.TagCounter32)), '410500ffffffff')
+
+    def testLongLength(self):
+        value = 'x' * 300
+        encoded = BER.encodeValue(value)
+        self.assertEqual(hexBytes(encoded[:4]), '0482012c')
+        tag, start, end = BER.decodeTlv(encoded, 0)
+        self.assertEqual((tag, end - start), (BER.TagOctetString, 300))
+
+    def testMessageRoundTrip(self):
+        varbinds = [(BER.parseOid(SysName), None), (BER.parseOid(IfInOctets + '.1'), None)]
+        message = BER.encodeMessage(1, 'public', BER.encodePdu(BER.PduGet, 42, varbinds))
+        version, community, pdu = BER.decodeCommunityMessage(message)
+        self.assertEqual((version, community), (1, b'public'))
+        self.assertEqual(pdu[:4], (BER.PduGet, 42, 0, 0))
+        self.assertEqual([oid for oid, value in pdu[4]], [oid for oid, value in varbinds])
+
+    def testTruncatedMessage(self):
+        message = BER.encodeMessage(1, 'public', BER.encodePdu(BER.PduGet, 1, [(BER.parseOid(SysName), None)]))
+        self.assertRaises(BER.BERError, BER.decodeCommunityMessage, message[:-3])
+
+
+class USMTest(unittest.TestCase):
+
+    EngineId = binascii.unhexlify('000000000000000000000002')
+
+    def testLocalizedKeys(self):
+        # RFC 3414 A.3.1 and A.3.2
+        self.assertEqual(hexBytes(USM.localizeKey('maplesyrup', self.EngineId, 'MD5')), '526f5eed9fcce26f8964c2930787d82b')
+        self.assertEqual(hexBytes(USM.localizeKey('maplesyrup', self.EngineId, 'SHA')), '6695febc9288e36282235fc7151f128497b38f3f')
+
+    def testEmptyPassword(self):
+        self.assertRaises(ValueError, USM.localizeKey, '', self.EngineId, 'MD5')
+
+    def testAuthPrivRejected(self):
+        self.assertRaises(ValueError, SNMPTarget, '127.0.0.1', version='3', user='admin', authProtocol='SHA',
+                          authPassword='authpassword', privProtocol='AES', privPassword='privpassword')
+
+
+class SNMPTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = makeXIQSE()
+        self.agent = SNMPAgent(Mib, users={'admin': ('SHA', 'authpassword'), 'guest': None}).start()
+        self.ctx.SNMP.setDefaults(port=self.agent.port, timeout=0.2, retries=1)
+
+    def tearDown(self):
+        self.agent.stop()
+
+    def testGet(self):
+        result = self.ctx.SNMP.get('127.0.0.1', [SysName])['127.0.0.1']
+        self.assertTrue(result['success'])
+        self.assertEqual(result['varbinds'], [(SysName, b'switch1')])
+
+    def testWrongCommunity(self):
+        result = self.ctx.SNMP.get('127.0.0.1', [SysName], community='private')['127.0.0.1']
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'timeout')
+
+    def testWalk(self):
+        for version in ('1', '2c'):
+            result = self.ctx.SNMP.walk('127.0.0.1', IfInOctets, maxRepetitions=7, version=version)['127.0.0.1']
+            self.assertTrue(result['success'], version)
+            self.assertEqual(len(result['varbinds']), 40)
+            self.assertEqual(result['varbinds'][-1], (IfInOctets + '.40', 40000))
+
+    def testWalkTable(self):
+        rows = list(self.ctx.SNMP.walkTable('127.0.0.1', {'ifDescr': IfDescr, 'ifInOctets': IfInOctets}))
+        self.assertEqual([row.indexStr for row in rows], [str(x) for x in range(1, 41)])
+        self.assertEqual((rows[4]['ifDescr'], rows[4]['ifInOctets']), (b'port 5', 5000))
+        self.assertTrue(self.ctx.SNMP.LastTableResults['127.0.0.1']['success'])
+
+    def testWalkTableTruncatedResponses(self):
+        self.agent.maxResponseSize = 400
+        rows = list(self.ctx.SNMP.walkTable('127.0.0.1', [IfDescr, IfInOctets], maxRepetitions=40))
+        self.assertEqual(len(rows), 40)
+        self.assertTrue(self.ctx.SNMP.LastTableResults['127.0.0.1']['maxRepetitions'] < 40)
+
+    def testV3AuthNoPriv(self):
+        result = self.ctx.SNMP.get('127.0.0.1', [SysName], version='3', user='admin', authProtocol='SHA',
+                                   authPassword='authpassword')['127.0.0.1']
+        self.assertTrue(result['success'], result['error'])
+        self.assertEqual(result['varbinds'], [(SysName, b'switch1')])
+
+    def testV3NoAuthNoPriv(self):
+        result = self.ctx.SNMP.get('127.0.0.1', [SysName], version='3', user='guest')['127.0.0.1']
+        self.assertTrue(result['success'], result['error'])
+
+    def testV3WrongPassword(self):
+        result = self.ctx.SNMP.get('127.0.0.1', [SysName], version='3', user='admin', authProtocol='SHA',
+                                   authPassword='wrongpassword')['127.0.0.1']
+        self.assertFalse(result['success'])
+
+    def testRetriesOnDrops(self):
+        self.agent.dropRate = 0.5
+        results = self.ctx.SNMP.get('127.0.0.1', [SysName], timeout=0.05, retries=20)
+        self.assertTrue(results['127.0.0.1']['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
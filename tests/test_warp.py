@@ -0,0 +1,109 @@
+"""
+Tests of the warp script pipeline: optimizer, streamed buffer and content-addressed script store.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import fakes  # noqa: F401, puts the XIQSE directory on sys.path
+from Utils.ScriptStore import ScriptStore
+from Utils.WarpBuffer import WarpBuffer
+from Utils.WarpOptimizer import WarpOptimizer, formatPorts, parsePorts
+
+
+def optimize(family, cmdList):
+    lines = []
+    optimizer = WarpOptimizer(family, lines.append)
+    for cmd in cmdList:
+        optimizer.add(cmd)
+    optimizer.finish()
+    return lines
+
+
+class WarpOptimizerTest(unittest.TestCase):
+
+    def testPorts(self):
+        self.assertEqual(parsePorts('1/1-1/3,2/1'), [(1, 1), (1, 2), (1, 3), (2, 1)])
+        self.assertIsNone(parsePorts('1/3-1/1'))
+        self.assertIsNone(parsePorts('1/1-2/3'))
+        self.assertEqual(formatPorts([(2, 1), (1, 2), (1, 1), (1, 3)]), '1/1-1/3,2/1')
+
+    def testPortContextsFolded(self):
+        cmdList = []
+        for port in range(1, 5):
+            cmdList += ["interface gigabitethernet 1/{}".format(port), "no shutdown", "exit"]
+        cmdList += ["interface gigabitethernet 2/1", "shutdown", "exit", "vlan create 10 type port-mstprstp 0"]
+        self.assertEqual(optimize('Fabric Engine', cmdList), [
+            "interface gigabitethernet 1/1-1/4", "no shutdown", "exit",
+            "interface gigabitethernet 2/1", "shutdown", "exit",
+            "vlan create 10 type port-mstprstp 0",
+        ])
+
+    def testExitReenterDropped(self):
+        cmdList = ["router isis", "spbm 1 b-vid 4051", "exit", "router isis", "spbm 1 multicast enable", "exit"]
+        self.assertEqual(optimize('Fabric Engine', cmdList), ["router isis", "spbm 1 b-vid 4051", "spbm 1 multicast enable", "exit"])
+
+    def testLargeBlockStreamed(self):
+        body = ["description port{}".format(x) for x in range(WarpOptimizer.MaxBlockLines + 10)]
+        cmdList = ["interface gigabitethernet 1/1"] + body + ["exit"]
+        self.assertEqual(optimize('Fabric Engine', cmdList), cmdList)
+
+    def testFamilyWithoutPatterns(self):
+        cmdList = ["interface gigabitethernet 1/1", "exit", "interface gigabitethernet 1/1", "exit"]
+        self.assertEqual(optimize('Unknown Family', cmdList), cmdList)
+
+
+class WarpFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testBufferCommit(self):
+        path = os.path.join(self.directory, 'warp.src')
+        with WarpBuffer(path, ['# header']) as warpBuffer:
+            warpBuffer.add("show sys")
+            warpBuffer.add("show vlan")
+            self.assertEqual(len(warpBuffer), 2)
+            self.assertFalse(os.path.exists(path))
+            self.assertEqual(warpBuffer.commit(), path)
+        with open(path) as f:
+            self.assertEqual(f.read(), "# header\nshow sys\nshow vlan\n\n")
+
+    def testBufferDiscardedWithoutCommit(self):
+        path = os.path.join(self.directory, 'warp.src')
+        with WarpBuffer(path) as warpBuffer:
+            warpBuffer.add("show sys")
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def testStoreSharesAndReleases(self):
+        store = ScriptStore(self.directory)
+        name = store.put(["show sys", "show vlan"], '10.0.0.1')
+        self.assertEqual(store.put(["show sys", "show vlan"], '10.0.0.2'), name)
+        other = ScriptStore(self.directory)
+        other.acquire(name, '10.0.0.1')
+        self.assertEqual(len(store.refs(name)), 3)
+        self.assertFalse(store.release(name, '10.0.0.1'))
+        self.assertFalse(store.release(name, '10.0.0.2'))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, name)))
+        self.assertTrue(other.release(name, '10.0.0.1'))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, name)))
+
+    def testStoreContentAddressed(self):
+        store = ScriptStore(self.directory)
+        first = store.put(["show sys"], '10.0.0.1')
+        second = store.put(["show vlan"], '10.0.0.1')
+        self.assertNotEqual(first, second)
+        with open(os.path.join(self.directory, first)) as f:
+            self.assertEqual(f.read(), "show sys\n\n")
+        self.assertEqual(sorted(x for x in os.listdir(self.directory) if not x.startswith('.')), sorted([first, second]))
+
+
+if __name__ == '__main__':
+    unittest.main()